@@ -0,0 +1,18 @@
+"""
+ASGI config for API-only workers.
+
+Serves the dashboard API with core.settings_api, e.g.
+``uvicorn core.asgi_api:application``; see core/wsgi_api.py.
+"""
+
+import os
+from importlib import import_module
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings_api")
+
+application = get_asgi_application()
+
+import_module(settings.ROOT_URLCONF)
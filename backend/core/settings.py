@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,10 +47,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "dashboard.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "dashboard.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "dashboard.middleware.TenantMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
@@ -80,19 +87,256 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    # "default": {
-    #     "ENGINE": "django.db.backends.sqlite3",
-    #     "NAME": BASE_DIR / "db.sqlite3",
-    # }
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'envathondb',
-        'USER': 'envathonuser',
-        'PASSWORD': 'envathonuser',
-        'HOST': 'localhost',  # Or your DB host
-        'PORT': '5432',       # Default PostgreSQL port
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return default if value in (None, "") else int(value)
+
+
+def env_list(name, default=""):
+    return [item.strip() for item in os.environ.get(name, default).split(",") if item.strip()]
+
+
+# PostgreSQL unless DB_ENGINE=sqlite is set explicitly (local development);
+# a missing PostgreSQL driver is an error, never a silent switch to SQLite.
+DB_ENGINE = os.environ.get("DB_ENGINE", "postgresql")
+
+if DB_ENGINE not in ("postgresql", "sqlite"):
+    raise ImproperlyConfigured(f'DB_ENGINE must be "postgresql" or "sqlite", not {DB_ENGINE!r}.')
+
+if DB_ENGINE == "postgresql" and not (find_spec("psycopg") or find_spec("psycopg2")):
+    raise ImproperlyConfigured(
+        "DB_ENGINE is postgresql but neither psycopg nor psycopg2 is installed; "
+        "install psycopg, or set DB_ENGINE=sqlite for a local SQLite database."
+    )
+
+if DB_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("DB_NAME", BASE_DIR / "db.sqlite3"),
+            "OPTIONS": {},
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("DB_NAME", 'envathondb'),
+            'USER': os.environ.get("DB_USER", 'envathonuser'),
+            'PASSWORD': os.environ.get("DB_PASSWORD", 'envathonuser'),
+            'HOST': os.environ.get("DB_HOST", 'localhost'),  # Or your DB host
+            'PORT': os.environ.get("DB_PORT", '5432'),       # Default PostgreSQL port
+            'OPTIONS': {},
+        }
+    }
+
+# Keep connections open between requests (seconds; empty or "none" for no
+# limit) and ping a reused connection before handing it to a request.
+DB_CONN_MAX_AGE = os.environ.get("DB_CONN_MAX_AGE", "60")
+DATABASES["default"]["CONN_MAX_AGE"] = (
+    None if DB_CONN_MAX_AGE.strip().lower() in ("", "none") else int(DB_CONN_MAX_AGE)
+)
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = env_bool("DB_CONN_HEALTH_CHECKS", True)
+
+# psycopg 3 connection pool (Django 5.1+, needs psycopg[pool]). The pool
+# replaces persistent connections, so CONN_MAX_AGE must be 0 with it.
+if DB_ENGINE == "postgresql" and env_bool("DB_POOL", False):
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": env_int("DB_POOL_MIN_SIZE", 2),
+        "max_size": env_int("DB_POOL_MAX_SIZE", 10),
+        "timeout": env_int("DB_POOL_TIMEOUT", 10),
+        "max_idle": env_int("DB_POOL_MAX_IDLE", 300),
+    }
+    if env_bool("DB_POOL_CHECK", True):
+        from psycopg_pool import ConnectionPool
+
+        DATABASES["default"]["OPTIONS"]["pool"]["check"] = ConnectionPool.check_connection
+
+
+# Read replicas for the dashboard app. DB_REPLICAS is a comma-separated list
+# of replica hosts ("host" or "host:port", PostgreSQL) or database files
+# (SQLite), each optionally weighted with "=N", e.g. "db-r1=2,db-r2".
+DASHBOARD_READ_REPLICAS = {}
+
+for index, spec in enumerate(filter(None, os.environ.get("DB_REPLICAS", "").split(",")), start=1):
+    target, _, weight = spec.strip().partition("=")
+    alias = f"replica{index}"
+    DATABASES[alias] = dict(
+        DATABASES["default"],
+        OPTIONS=dict(DATABASES["default"]["OPTIONS"]),
+        TEST={"MIRROR": "default"},
+    )
+    if DB_ENGINE == "sqlite":
+        DATABASES[alias]["NAME"] = target
+    else:
+        host, _, port = target.partition(":")
+        DATABASES[alias].update(HOST=host, PORT=port or DATABASES["default"]["PORT"])
+    DASHBOARD_READ_REPLICAS[alias] = int(weight or 1)
+
+DATABASE_ROUTERS = ["dashboard.db_router.ReplicaRouter"]
+
+# Seconds a client reads from the primary after it writes (read-your-writes).
+DASHBOARD_REPLICA_PIN_SECONDS = env_int("DB_REPLICA_PIN_SECONDS", 5)
+
+# Seconds between replica health checks, and the replication lag at which a
+# PostgreSQL replica is skipped.
+DASHBOARD_REPLICA_HEALTH_TTL = env_int("DB_REPLICA_HEALTH_TTL", 5)
+
+DASHBOARD_REPLICA_MAX_LAG = env_int("DB_REPLICA_MAX_LAG", 30)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Alias and TTL for the dashboard's versioned response cache. Local memory is
+# per process; point the alias at a shared backend when running several workers.
+DASHBOARD_CACHE_ALIAS = "default"
+
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Days of secrets hygiene and anomaly rows in the dashboard snapshot (at
+# most one keyset page of the newest); their list endpoints have the rest.
+DASHBOARD_SNAPSHOT_DAYS = 30
+
+# Seconds in all a cache miss waits for an identical request already
+# building the same response (see dashboard.coalescing) before building it
+# itself; 0 turns coalescing off. Sync views under ASGI never wait on
+# another process.
+DASHBOARD_COALESCE_TIMEOUT = 10
+
+# Per-client token buckets per route (dashboard.throttling): URL names or
+# fnmatch patterns to (rate, burst), first match wins. Set
+# DASHBOARD_THROTTLE_STORE to "dashboard.throttling.RedisBucketStore" and a
+# Redis URL to share buckets between workers.
+DASHBOARD_THROTTLE_RATES = {
+    "dashboard-snapshot": ("2/s", 10),
+    "search": ("5/s", 20),
+    "changes": ("2/s", 10),
+    "*-export": ("6/m", 3),
+    "*-bulk": ("2/s", 10),
+    "*": ("20/s", 100),
+}
+
+DASHBOARD_THROTTLE_STORE = "dashboard.throttling.LocalBucketStore"
+
+DASHBOARD_THROTTLE_REDIS_URL = None
+
+# Rows written per bulk_create/bulk_update batch by the bulk ingestion
+# endpoints; overridable per request with ?batch_size=.
+DASHBOARD_BULK_BATCH_SIZE = 1000
+
+# Snapshot sections queried concurrently (one connection each) by the async
+# views in dashboard.async_views.
+DASHBOARD_ASYNC_FANOUT = 4
+
+# Live event feed (/api/events/). Without a Redis URL the broker is
+# in-process and only sees writes made by the same worker.
+DASHBOARD_EVENTS_REDIS_URL = None
+
+DASHBOARD_EVENTS_COALESCE_WINDOW = 0.25
+
+DASHBOARD_EVENTS_HEARTBEAT = 15
+
+# Under WSGI /api/events/ can't stay open; EventSource polls it this often.
+DASHBOARD_EVENTS_POLL_INTERVAL = 5
+
+# Background jobs (dashboard.jobs, run by manage.py run_jobs). Failed jobs are
+# retried after BACKOFF_BASE * 2**(attempt - 1) seconds, capped at
+# BACKOFF_MAX; a job running longer than LEASE_SECONDS is presumed lost and
+# requeued.
+DASHBOARD_JOBS_MAX_ATTEMPTS = 5
+
+DASHBOARD_JOBS_BACKOFF_BASE = 2
+
+DASHBOARD_JOBS_BACKOFF_MAX = 600
+
+DASHBOARD_JOBS_LEASE_SECONDS = 900
+
+DASHBOARD_JOBS_POLL_INTERVAL = 1.0
+
+# compact_compliance_history snapshots the compliance scores as of this many
+# seconds ago, so writes still in flight then are already in the history.
+DASHBOARD_COMPLIANCE_SNAPSHOT_LAG = 300
+
+# compact_timeseries folds secrets hygiene and anomaly rows older than these
+# many days into weekly, then monthly rollups. With
+# DASHBOARD_TIMESERIES_RETAIN_DAYS set, rollups older than that are deleted.
+DASHBOARD_TIMESERIES_WEEKLY_AFTER_DAYS = 90
+DASHBOARD_TIMESERIES_MONTHLY_AFTER_DAYS = 365
+DASHBOARD_TIMESERIES_RETAIN_DAYS = None
+
+# /api/changes/ reaches back this many seconds before each token, for
+# writes stamped before it that committed after it. Tombstones of deleted
+# rows are kept RETENTION_DAYS; older tokens get a 410.
+DASHBOARD_CHANGES_SAFETY_WINDOW = 5
+
+DASHBOARD_CHANGES_RETENTION_DAYS = 7
+
+# Rows and deleted ids per /api/changes/ poll; a poll that fills up sets
+# has_more and the client polls again from its token.
+DASHBOARD_CHANGES_LIMIT = 1000
+
+# Per-request timings (Server-Timing header, dashboard.performance log and
+# /api/_metrics). Requests slower than DASHBOARD_SLOW_REQUEST_MS log at
+# WARNING, the rest at INFO.
+DASHBOARD_PERFORMANCE_METRICS = env_bool("DASHBOARD_PERFORMANCE_METRICS", True)
+
+DASHBOARD_SLOW_REQUEST_MS = env_int("DASHBOARD_SLOW_REQUEST_MS", 500)
+
+# /api/_metrics answers only peers in DASHBOARD_METRICS_ALLOWED_IPS (IPs or
+# CIDR networks, comma-separated) and requests carrying
+# "Authorization: Bearer <DASHBOARD_METRICS_TOKEN>"; anyone else gets a 404.
+# With neither set the endpoint is off. Behind a reverse proxy every peer
+# is the proxy, so prefer the token there.
+DASHBOARD_METRICS_ALLOWED_IPS = env_list("DASHBOARD_METRICS_ALLOWED_IPS")
+
+DASHBOARD_METRICS_TOKEN = os.environ.get("DASHBOARD_METRICS_TOKEN") or None
+
+# Peers (IPs or CIDR networks, comma-separated) allowed to choose the tenant
+# with the X-Tenant header: the authenticating proxy in front of the API,
+# which must drop any X-Tenant the client sent. The header from anyone else
+# gets a 403; requests without it get the default tenant.
+DASHBOARD_TENANT_TRUSTED_PROXIES = env_list("DASHBOARD_TENANT_TRUSTED_PROXIES")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "dashboard.performance": {
+            "handlers": ["console"],
+            "level": os.environ.get("DASHBOARD_PERFORMANCE_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
+# Response formats, negotiated from the Accept header; the first is the
+# default. MessagePack is only offered when msgpack is installed.
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "dashboard.renderers.FastJSONRenderer",
+        "dashboard.renderers.ColumnarJSONRenderer",
+        *(["dashboard.renderers.MessagePackRenderer"] if find_spec("msgpack") else []),
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_THROTTLE_CLASSES": ["dashboard.throttling.TokenBucketThrottle"],
 }
 
 
@@ -0,0 +1,51 @@
+"""
+Settings for API-only workers, used by core/wsgi_api.py and core/asgi_api.py.
+
+The dashboard endpoints need neither the admin, sessions, messages, auth
+nor templates: DRF views are CSRF-exempt and the API has no login. This
+profile keeps core.settings and drops those apps, their middleware and
+the browsable API, so a worker imports and initializes less before it
+serves its first request. Run migrations and management commands with
+core.settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import MIDDLEWARE, REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    "dashboard",
+    "corsheaders",
+]
+
+MIDDLEWARE = [
+    name
+    for name in MIDDLEWARE
+    if name not in (
+        "django.contrib.sessions.middleware.SessionMiddleware",
+        "django.middleware.csrf.CsrfViewMiddleware",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+        "django.contrib.messages.middleware.MessageMiddleware",
+        "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    )
+]
+
+ROOT_URLCONF = "core.urls_api"
+
+TEMPLATES = []
+
+WSGI_APPLICATION = "core.wsgi_api.application"
+
+# Without django.contrib.auth, requests are anonymous with no user object.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": [
+        renderer
+        for renderer in REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"]
+        if renderer != "rest_framework.renderers.BrowsableAPIRenderer"
+    ],
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_PERMISSION_CLASSES": [],
+    "UNAUTHENTICATED_USER": None,
+}
+
+AUTH_PASSWORD_VALIDATORS = []
@@ -0,0 +1,10 @@
+"""
+URL configuration for API-only workers (core.settings_api): the dashboard
+API without the admin.
+"""
+
+from django.urls import path, include
+
+urlpatterns = [
+    path("api/", include("dashboard.urls")),
+]
@@ -0,0 +1,21 @@
+"""
+WSGI config for API-only workers.
+
+Serves the dashboard API with core.settings_api, e.g.
+``gunicorn core.wsgi_api``. The URLconf, and with it every dashboard view,
+is imported here rather than on the first request, so a worker is fully
+loaded by the time it reports ready (and a preloading server shares the
+imports between its workers).
+"""
+
+import os
+from importlib import import_module
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings_api")
+
+application = get_wsgi_application()
+
+import_module(settings.ROOT_URLCONF)
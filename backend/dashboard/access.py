@@ -0,0 +1,34 @@
+"""
+Checks on who is calling, for the endpoints and headers that only the
+deployment's own infrastructure may use.
+
+Addresses are the connection's ``REMOTE_ADDR``: the peer Django sees,
+which behind a reverse proxy is the proxy, never ``X-Forwarded-For``
+(clients can write that themselves).
+"""
+import hmac
+import ipaddress
+from functools import lru_cache
+
+
+@lru_cache(maxsize=32)
+def parse_networks(specs):
+    """``specs``, a tuple of addresses and CIDR networks, as networks."""
+    return tuple(ipaddress.ip_network(spec.strip(), strict=False) for spec in specs)
+
+
+def address_in(request, specs):
+    """True when the request's peer address is in one of ``specs``."""
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in network for network in parse_networks(tuple(specs)))
+
+
+def bearer_token_matches(request, token):
+    """True when ``token`` is set and the request carries it as ``Authorization: Bearer``."""
+    if not token:
+        return False
+    scheme, _, value = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(value.strip().encode(), token.encode())
@@ -0,0 +1,272 @@
+"""
+Async-native read views for serving the dashboard under ASGI.
+
+These mirror the list endpoints and the snapshot with plain Django async
+views, because DRF viewsets are synchronous and pin a thread for the whole
+request. Filters, pagination and encoding are shared with the sync path, so
+payloads are identical; so is the versioned cache, reached through the
+cache's async API.
+
+The async ORM runs every query on one shared thread, so ``aiterator`` alone
+would still run the snapshot sections one after another. Instead the
+snapshot gives each section its own worker thread and database connection,
+bounded by ``DASHBOARD_ASYNC_FANOUT``.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from . import caching, tenancy
+from .encoders import get_encoder
+from .events import STREAMS, SubscriptionLost, get_broker
+from .renderers import FastJSONRenderer
+from .views import DashboardSnapshotView
+
+RESOURCES = dict(DashboardSnapshotView.sections)
+CHUNK_SIZE = 2000
+
+
+async def cached_json(request, name, models, build):
+    versions = await caching.aget_versions(models)
+    key = caching.response_key(name, versions, request.get_full_path())
+    cache = caching.get_cache()
+    entry = await cache.aget(key)
+    if entry is None:
+        # Rendered as the DRF endpoints render JSON, so the bytes match theirs.
+        content = FastJSONRenderer().render(await build())
+        entry = (caching.entity_tag(content), content)
+        await cache.aset(key, entry, caching.get_timeout())
+
+    etag, content = entry
+    if caching.etag_matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+async def resource_list(request, resource):
+    viewset_class = RESOURCES.get(resource)
+    if viewset_class is None or request.method not in ('GET', 'HEAD'):
+        raise Http404(f'No async resource named {resource!r}.')
+
+    drf_request = Request(request)
+    view = viewset_class(request=drf_request, format_kwarg=None, action='list', args=(), kwargs={})
+    paginator = view.paginator
+    try:
+        queryset = view.filter_queryset(view.get_queryset())
+        encoder = get_encoder(queryset.model)
+        queryset = encoder.values(queryset)
+        if paginator is not None:
+            queryset = paginator.get_page_queryset(queryset, drf_request, view)
+    except APIException as exc:
+        # Same body shape as DRF's exception handler.
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return JsonResponse(detail, status=exc.status_code, safe=False)
+
+    async def build():
+        if paginator is None:
+            return encoder.encode([row async for row in queryset.aiterator(chunk_size=CHUNK_SIZE)])
+        page = paginator.set_page([row async for row in queryset])
+        return {'next': paginator.get_next_link(), 'results': encoder.encode(page)}
+
+    return await cached_json(request, f'async-{resource}', (queryset.model,), build)
+
+
+def fetch_section(viewset):
+    try:
+        return DashboardSnapshotView.section(viewset)
+    finally:
+        # Runs on a pool thread with its own connection: keep it only if
+        # CONN_MAX_AGE allows, exactly as the request cycle would.
+        connection.close_if_unusable_or_obsolete()
+
+
+async def dashboard_snapshot(request):
+    fanout = asyncio.Semaphore(getattr(settings, 'DASHBOARD_ASYNC_FANOUT', 4))
+
+    async def section(viewset):
+        async with fanout:
+            return await sync_to_async(fetch_section, thread_sensitive=False)(viewset)
+
+    async def build():
+        payloads = await asyncio.gather(*(section(viewset) for viewset in RESOURCES.values()))
+        return dict(zip(RESOURCES, payloads))
+
+    models = tuple(viewset.queryset.model for viewset in RESOURCES.values())
+    return await cached_json(request, 'async-dashboard-snapshot', models, build)
+
+
+MAX_EVENTS_PER_MESSAGE = 500
+REPLAY_PAGE_SIZE = 500
+REPLAY_LIMIT = 10000
+
+
+def encode_cursor(cursor):
+    return '.'.join(str(cursor[name]) for name in STREAMS.values())
+
+
+def decode_cursor(value):
+    parts = value.split('.')
+    if len(parts) != len(STREAMS):
+        raise ValueError(value)
+    return {name: int(part) for name, part in zip(STREAMS.values(), parts)}
+
+
+def sse_message(event, cursor, data):
+    return f'id: {encode_cursor(cursor)}\nevent: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+def advance(cursor, events):
+    cursor = dict(cursor)
+    for event in events:
+        cursor[event['stream']] = max(cursor[event['stream']], event['id'])
+    return cursor
+
+
+async def current_cursor(tenant_id):
+    cursor = {}
+    for model, name in STREAMS.items():
+        last = await model._base_manager.filter(tenant_id=tenant_id).aaggregate(last=Max('pk'))
+        cursor[name] = last['last'] or 0
+    return cursor
+
+
+async def replay(tenant_id, cursor, streams):
+    """Rows written after ``cursor``, oldest first; ``None`` past ``REPLAY_LIMIT``."""
+    backlog = []
+    for model, name in STREAMS.items():
+        if name not in streams:
+            continue
+        encoder = get_encoder(model)
+        after = cursor[name]
+        while True:
+            page = [
+                row async for row in encoder.values(
+                    model._base_manager.filter(tenant_id=tenant_id, pk__gt=after).order_by('pk')
+                )[:REPLAY_PAGE_SIZE]
+            ]
+            if not page:
+                break
+            for row, data in zip(page, encoder.encode(page)):
+                backlog.append({'stream': name, 'id': row['id'], 'data': data})
+            if len(backlog) > REPLAY_LIMIT:
+                return None
+            after = page[-1]['id']
+    return backlog
+
+
+async def catch_up(tenant_id, streams, cursor):
+    """
+    ``(messages, cursor, replayed)``: what a client gets before live events,
+    the cursor after it, and the ``(stream, id)`` keys it already holds.
+    """
+    backlog = await replay(tenant_id, cursor, streams) if cursor is not None else []
+    if backlog is None:
+        cursor = await current_cursor(tenant_id)
+        return [sse_message('reset', cursor, {})], cursor, set()
+    if not backlog:
+        if cursor is None:
+            cursor = await current_cursor(tenant_id)
+        return [sse_message('ready', cursor, {})], cursor, set()
+    messages = []
+    for start in range(0, len(backlog), MAX_EVENTS_PER_MESSAGE):
+        chunk = backlog[start:start + MAX_EVENTS_PER_MESSAGE]
+        cursor = advance(cursor, chunk)
+        messages.append(sse_message('events', cursor, {'events': chunk}))
+    return messages, cursor, {(event['stream'], event['id']) for event in backlog}
+
+
+async def sse_events(tenant_id, streams, cursor, window, heartbeat):
+    # Runs after the middleware has finished with the request, so the
+    # tenant is passed in rather than read from tenancy.current.
+    loop = asyncio.get_running_loop()
+    async with get_broker().subscribe() as subscription:
+        # Subscribed before replaying, so nothing written in between is lost;
+        # the replayed keys filter out the live copies of the same rows.
+        messages, cursor, replayed = await catch_up(tenant_id, streams, cursor)
+        for message in messages:
+            yield message
+
+        while True:
+            try:
+                event = await subscription.get(heartbeat)
+                if event is None:
+                    yield ': keepalive\n\n'
+                    continue
+                # Coalesce a burst into one message.
+                batch = [event]
+                deadline = loop.time() + window
+                while len(batch) < MAX_EVENTS_PER_MESSAGE and (remaining := deadline - loop.time()) > 0:
+                    event = await subscription.get(remaining)
+                    if event is None:
+                        break
+                    batch.append(event)
+            except SubscriptionLost:
+                # The client reconnects with Last-Event-ID and replays the gap.
+                return
+            batch = [
+                {'stream': event['stream'], 'id': event['id'], 'data': event['data']}
+                for event in batch
+                if event['tenant'] == tenant_id and event['stream'] in streams
+                and (event['stream'], event['id']) not in replayed
+            ]
+            if batch:
+                cursor = advance(cursor, batch)
+                yield sse_message('events', cursor, {'events': batch})
+
+
+async def event_stream(request):
+    """
+    Server-sent events for newly written anomalies and shadow-IT findings.
+
+    ``?streams=`` narrows the feed to some of ``STREAMS``. Reconnecting
+    clients send ``Last-Event-ID`` (or ``?last_event_id=``) and first receive
+    every row written since. Events arriving within
+    ``DASHBOARD_EVENTS_COALESCE_WINDOW`` seconds go out as one message.
+
+    Only ASGI can hold the stream open. Under WSGI the response ends after
+    the rows the client missed, and tells ``EventSource`` to reconnect after
+    ``DASHBOARD_EVENTS_POLL_INTERVAL`` seconds, which makes it a poll.
+    """
+    names = request.GET.get('streams')
+    streams = set(names.split(',')) if names else set(STREAMS.values())
+    unknown = streams - set(STREAMS.values())
+    if unknown:
+        return JsonResponse({'streams': f"Unknown streams: {', '.join(sorted(unknown))}."}, status=400)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        cursor = decode_cursor(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({'last_event_id': 'Malformed event id.'}, status=400)
+
+    if not isinstance(request, ASGIRequest):
+        messages, _, _ = await catch_up(tenancy.current_tenant_id(), streams, cursor)
+        retry = int(getattr(settings, 'DASHBOARD_EVENTS_POLL_INTERVAL', 5) * 1000)
+        response = HttpResponse(f'retry: {retry}\n\n' + ''.join(messages), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    response = StreamingHttpResponse(
+        sse_events(
+            tenancy.current_tenant_id(),
+            streams,
+            cursor,
+            window=getattr(settings, 'DASHBOARD_EVENTS_COALESCE_WINDOW', 0.25),
+            heartbeat=getattr(settings, 'DASHBOARD_EVENTS_HEARTBEAT', 15),
+        ),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,141 @@
+"""
+Bulk upsert ingestion for scanner output.
+
+Items are validated with the viewset's serializer in list mode and written
+one batch at a time with a single ``INSERT ... ON CONFLICT DO UPDATE`` on
+the current tenant and the viewset's ``natural_key``, so a key another
+request inserts concurrently is updated rather than failing. Each batch
+commits on its own, so a request that fails part-way leaves the earlier
+batches applied; because writes are upserts, resending the whole payload
+is safe.
+"""
+from collections.abc import Iterator
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.validators import UniqueValidator
+
+from . import tenancy
+from .parsers import NDJSONParser
+from .signals import bulk_written
+from .tasks import bulk_upsert
+
+MAX_BATCH_SIZE = 10000
+
+
+def get_batch_size(query_params):
+    default = getattr(settings, 'DASHBOARD_BULK_BATCH_SIZE', 1000)
+    try:
+        size = int(query_params.get('batch_size', default))
+    except ValueError:
+        raise ValidationError({'batch_size': 'Expected an integer.'})
+    return max(1, min(size, MAX_BATCH_SIZE))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def upsert(model, rows, natural_key, batch_size):
+    """Insert or update ``rows`` (validated dicts) keyed on ``natural_key``."""
+    pending = {row[natural_key]: model(**row) for row in rows}
+    fields = [
+        field.name for field in tenancy.public_fields(model) if not field.primary_key and field.name != natural_key
+    ]
+    created, updated = [], []
+
+    with transaction.atomic():
+        # The rows as they were, for the receivers' deltas; the upsert itself
+        # doesn't depend on them.
+        previous = list(
+            model._default_manager.select_for_update().filter(**{f'{natural_key}__in': list(pending)})
+        )
+        existing = {getattr(instance, natural_key) for instance in previous}
+        for key, instance in pending.items():
+            (updated if key in existing else created).append(instance)
+
+        model._default_manager.bulk_create(
+            list(pending.values()),
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['tenant', natural_key],
+            update_fields=fields,
+        )
+        bulk_written.send(sender=model, created=created, updated=updated, previous=previous)
+    return len(created), len(updated)
+
+
+class BulkUpsertMixin:
+    """
+    Adds ``POST <prefix>/bulk/`` accepting a JSON array or an NDJSON stream.
+
+    With ``?background=1`` the items are queued as a job for
+    ``manage.py run_jobs`` and the response is ``202`` with the job.
+    """
+
+    natural_key = None
+
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        items = request.data
+        # A JSON array, or the lazy iterator NDJSONParser returns.
+        if not isinstance(items, (list, Iterator)):
+            raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+
+        batch_size = get_batch_size(request.query_params)
+        if request.query_params.get('background'):
+            job = bulk_upsert.enqueue(
+                viewset=f'{type(self).__module__}.{type(self).__qualname__}',
+                items=list(items),
+                batch_size=batch_size,
+                tenant=tenancy.current_tenant_id(),
+            )
+            return Response(
+                {'job': job.pk, 'status': job.status, 'url': reverse('job-detail', args=[job.pk], request=request)},
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        result = self.ingest(items, batch_size)
+        if 'errors' in result:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+    def ingest(self, items, batch_size):
+        """Upsert ``items`` batch by batch, stopping at the first invalid batch."""
+        model = self.queryset.model
+        created = updated = 0
+        for offset, batch in enumerate(batched(items, batch_size)):
+            serializer = self.get_bulk_serializer(batch)
+            if not serializer.is_valid():
+                start = offset * batch_size
+                item_errors = serializer.errors
+                # Newer DRF reports list errors as {index: errors}, older
+                # releases as a list with an entry per item.
+                if not isinstance(item_errors, dict):
+                    item_errors = dict(enumerate(item_errors))
+                errors = {start + index: error for index, error in item_errors.items() if error}
+                return {'created': created, 'updated': updated, 'errors': errors}
+            batch_created, batch_updated = upsert(
+                model, serializer.validated_data, self.natural_key, batch_size
+            )
+            created += batch_created
+            updated += batch_updated
+        return {'created': created, 'updated': updated}
+
+    def get_bulk_serializer(self, batch):
+        serializer = self.get_serializer(data=batch, many=True)
+        # An item whose natural key exists is an update here, not a conflict.
+        key_field = serializer.child.fields[self.natural_key]
+        key_field.validators = [
+            validator for validator in key_field.validators if not isinstance(validator, UniqueValidator)
+        ]
+        return serializer
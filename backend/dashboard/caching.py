@@ -0,0 +1,159 @@
+"""
+Versioned response cache for the dashboard read endpoints.
+
+Each model has a version counter in the cache that is bumped after every
+committed write. Cached responses are keyed by the versions of the models
+they were built from, so a write makes stale entries unreachable instead of
+having to find and delete them. Versions are shared by all tenants, but
+every response key includes the current tenant. The cache alias is configurable through
+``DASHBOARD_CACHE_ALIAS``; the default local-memory backend is per process,
+so deployments with several workers should point it at a shared backend.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import coalescing, tenancy
+
+
+def get_cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def version_key(model):
+    return f'dashboard:version:{model._meta.label_lower}'
+
+
+def get_versions(models):
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Seed from the clock so a counter that was evicted can never
+            # come back with a value an old entry was stored under.
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(models):
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    cache = get_cache()
+    key = version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_version_on_commit(model):
+    transaction.on_commit(lambda: bump_version(model))
+
+
+def response_key(name, versions, path):
+    versions = '.'.join(str(version) for version in versions)
+    fingerprint = hashlib.sha1(f'{tenancy.current_tenant_id()}:{versions}:{path}'.encode()).hexdigest()
+    return f'dashboard:response:{name}:{fingerprint}'
+
+
+def etag_key(key, media_type):
+    return f'{key}:etag:{media_type}'
+
+
+def entity_tag(content):
+    # A strong validator: the hash of the exact bytes sent.
+    return '"%s"' % hashlib.sha256(content).hexdigest()[:40]
+
+
+def etag_matches(if_none_match, etag):
+    tags = parse_etags(if_none_match or '')
+    return etag in tags or '*' in tags
+
+
+class VersionedCacheMixin:
+    """
+    Serve ``list`` and ``retrieve`` from the versioned cache with strong ETags.
+
+    ``cache_models`` lists every model the response is built from and
+    defaults to the queryset's model.
+    """
+
+    cache_models = None
+
+    def get_cache_models(self):
+        return self.cache_models or (self.queryset.model,)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        versions = get_versions(self.get_cache_models())
+        key = response_key(type(self).__name__, versions, request.get_full_path())
+        # The same URL renders differently per Accept (see dashboard.renderers),
+        # so each media type has its own ETag, taken from the rendered bytes.
+        tag_key = etag_key(key, getattr(request, 'accepted_media_type', ''))
+        if_none_match = request.headers.get('If-None-Match')
+
+        cache = get_cache()
+        entry = cache.get_many([key, tag_key])
+        data, etag = entry.get(key), entry.get(tag_key)
+        if data is None:
+            response = None
+
+            def build():
+                nonlocal response
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return None
+                cache.set(key, response.data, get_timeout())
+                return response.data
+
+            # Concurrent identical misses share one build (see dashboard.coalescing).
+            # Under ASGI sync views share one thread, which must not sit polling.
+            data = coalescing.fill(cache, key, build, wait=not isinstance(request._request, ASGIRequest))
+            if data is None:
+                return response
+            etag = None
+        elif etag is not None and etag_matches(if_none_match, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag, 'Vary': 'Accept'})
+
+        response = Response(data, headers={'Vary': 'Accept'})
+        if etag is not None:
+            response['ETag'] = etag
+            return response
+
+        def tag(rendered):
+            etag = entity_tag(rendered.content)
+            cache.set(tag_key, etag, get_timeout())
+            if etag_matches(if_none_match, etag):
+                return HttpResponseNotModified(headers={'ETag': etag, 'Vary': 'Accept'})
+            rendered['ETag'] = etag
+
+        response.add_post_render_callback(tag)
+        return response
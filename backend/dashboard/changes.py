@@ -0,0 +1,251 @@
+"""
+Change tracking for delta sync (``/api/changes/``).
+
+Every tracked model stamps ``updated_at`` on each write, and deleting a row
+leaves a ``Tombstone``. ``collect()`` returns the current tenant's rows
+updated, and ids deleted, after a moment. It reads only the recent end of
+each ``(tenant, updated_at)`` index, so a poll costs what changed since the
+last one, not what is stored. The endpoint hands the moment out in an
+opaque token.
+
+A poll returns at most ``DASHBOARD_CHANGES_LIMIT`` rows and ids. It reads
+the tables one after another, each in ``(updated_at, id)`` order, and
+when it fills up its token records where it stopped, so the next poll
+carries on from there. A sync is the run of polls from one moment until
+a poll comes back without ``has_more``; its last token holds the moment
+the sync began, which the next sync reads from. A row written during a
+sync is returned by that sync (it sorts after the position) or by the
+next (its stamp is after the sync began), and tombstones are only read
+once a first full sync has given the client rows to delete.
+
+Writes that skip ``save()`` must keep this up: ``bulk_update`` and
+``QuerySet.update`` callers set ``updated_at`` themselves (``bulk_create``
+applies ``auto_now``, and raw inserts get the column's database default),
+and raw deletes call ``bury()`` or ``bury_table()``.
+
+``updated_at`` is stamped before the writing transaction commits, so a row
+can become visible after a token later than its stamp was handed out. Each
+sync therefore reaches back ``DASHBOARD_CHANGES_SAFETY_WINDOW`` seconds
+before its moment and may repeat recent changes, which clients apply again
+harmlessly; a transaction open longer than the window can be missed.
+Tombstones are purged after ``DASHBOARD_CHANGES_RETENTION_DAYS``, so older
+tokens are refused and the client syncs from scratch.
+"""
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import tenancy
+from .encoders import get_encoder
+from .models import (
+    CloudMisconfiguration,
+    ComplianceScore,
+    IamRisk,
+    PackageHealth,
+    PackageVetting,
+    RiskOverview,
+    SecretsHygiene,
+    SecurityAnomaly,
+    ShadowIT,
+    Tombstone,
+)
+
+# Model: resource name, as in the API's URLs.
+TRACKED = {
+    RiskOverview: 'risk-overview',
+    CloudMisconfiguration: 'cloud-misconfigurations',
+    PackageVetting: 'package-vetting',
+    PackageHealth: 'package-health',
+    SecretsHygiene: 'secrets-hygiene',
+    IamRisk: 'iam-risk-analyzer',
+    SecurityAnomaly: 'security-anomalies',
+    ComplianceScore: 'compliance-score',
+    ShadowIT: 'shadow-it',
+}
+
+BATCH_SIZE = 2000
+
+
+def safety_window():
+    return datetime.timedelta(seconds=getattr(settings, 'DASHBOARD_CHANGES_SAFETY_WINDOW', 5))
+
+
+def retention():
+    return datetime.timedelta(days=getattr(settings, 'DASHBOARD_CHANGES_RETENTION_DAYS', 7))
+
+
+def get_limit():
+    return getattr(settings, 'DASHBOARD_CHANGES_LIMIT', 1000)
+
+
+class Cursor:
+    """
+    Where a client's sync stands. ``since`` is the moment the previous sync
+    began (None before the first full sync) and ``started`` the moment this
+    one did (None until its first poll). ``stream`` and ``after`` are the
+    table being read and the ``(timestamp, id)`` of the last row returned
+    from it.
+    """
+
+    def __init__(self, since=None, started=None, stream=0, after=None):
+        self.since = since
+        self.started = started
+        self.stream = stream
+        self.after = after
+
+
+def _moment(value):
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None or timezone.is_naive(moment):
+        raise ValueError('Invalid token.')
+    return moment
+
+
+def _optional_moment(value):
+    return None if value is None else _moment(value)
+
+
+def encode_token(cursor):
+    payload = {
+        'since': cursor.since and cursor.since.isoformat(),
+        'started': cursor.started and cursor.started.isoformat(),
+        'stream': cursor.stream,
+        'after': cursor.after and [cursor.after[0].isoformat(), cursor.after[1]],
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    """The cursor in ``token``; ValueError if it holds none."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        cursor = Cursor(
+            since=_optional_moment(payload['since']),
+            started=_optional_moment(payload['started']),
+            stream=payload['stream'],
+        )
+        if payload['after'] is not None:
+            moment, pk = payload['after']
+            if not isinstance(pk, int):
+                raise ValueError('Invalid token.')
+            cursor.after = (_moment(moment), pk)
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise ValueError('Invalid token.')
+    if not isinstance(cursor.stream, int) or not 0 <= cursor.stream < len(streams(cursor)):
+        raise ValueError('Invalid token.')
+    if cursor.started is None and (cursor.stream or cursor.after):
+        raise ValueError('Invalid token.')
+    return cursor
+
+
+def is_expired(cursor, now):
+    """True when tombstones from after the cursor's sync may already be purged."""
+    return cursor.since is not None and cursor.since < now - retention()
+
+
+def streams(cursor):
+    """The models a sync reads, in order; tombstones only after a first full sync."""
+    return [*TRACKED, Tombstone] if cursor.since is not None else list(TRACKED)
+
+
+def stamp_field(model):
+    return 'deleted_at' if model is Tombstone else 'updated_at'
+
+
+def read(model, after, position, count):
+    """Up to ``count`` of ``model``'s rows stamped after ``after`` and past ``position``, in order."""
+    field = stamp_field(model)
+    queryset = model._default_manager.order_by(field, 'id')
+    if after is not None:
+        queryset = queryset.filter(**{f'{field}__gt': after})
+    if position is not None:
+        moment, pk = position
+        # As in KeysetPagination: the range bound lets the index seek.
+        queryset = queryset.filter(**{f'{field}__gte': moment}).filter(
+            Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk})
+        )
+    if model is Tombstone:
+        return list(queryset.values('id', 'resource', 'object_id', 'deleted_at')[:count])
+    return list(get_encoder(model).values(queryset)[:count])
+
+
+def collect(cursor, now, limit=None):
+    """
+    ``(changes, next cursor, has_more)`` for the poll at ``now`` with
+    ``cursor``. ``changes`` is ``{resource: {'upserted': rows, 'deleted':
+    ids}}`` for at most ``limit`` rows and ids; resources without changes
+    are left out.
+    """
+    remaining = limit or get_limit()
+    started = cursor.started or now
+    after = None if cursor.since is None else cursor.since - safety_window()
+    models = streams(cursor)
+    result = {}
+    for index in range(cursor.stream, len(models)):
+        model = models[index]
+        position = cursor.after if index == cursor.stream else None
+        # One row past the limit tells whether the table has more.
+        rows = read(model, after, position, remaining + 1)
+        more = len(rows) > remaining
+        rows = rows[:remaining]
+        if model is Tombstone:
+            for row in rows:
+                result.setdefault(row['resource'], {'upserted': [], 'deleted': []})['deleted'].append(row['object_id'])
+        elif rows:
+            result[TRACKED[model]] = {'upserted': get_encoder(model).encode(rows), 'deleted': []}
+        if more:
+            if rows:
+                position = (rows[-1][stamp_field(model)], rows[-1]['id'])
+            return result, Cursor(cursor.since, started, index, position), True
+        remaining -= len(rows)
+    return result, Cursor(since=started), False
+
+
+def bury(model, instances):
+    """Record the deletion of ``instances``, rows of ``model``."""
+    now = timezone.now()
+    Tombstone._base_manager.bulk_create(
+        [
+            Tombstone(tenant_id=instance.tenant_id, resource=TRACKED[model], object_id=instance.pk, deleted_at=now)
+            for instance in instances
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def bury_table(cursor, table, model):
+    """Record the deletion of every row in ``table``, a partition of ``model``'s table about to be dropped."""
+    cursor.execute(
+        f'INSERT INTO "{Tombstone._meta.db_table}" (tenant_id, resource, object_id, deleted_at) '
+        f'SELECT tenant_id, %s, id, %s FROM "{table}"',
+        [TRACKED[model], timezone.now()],
+    )
+
+
+def purge(now=None):
+    """Delete tombstones past the retention period; returns how many."""
+    cutoff = (now or timezone.now()) - retention()
+    purged = 0
+    for tenant_id in tenancy.tenant_ids():
+        while True:
+            with transaction.atomic():
+                pks = list(
+                    Tombstone._base_manager.filter(tenant_id=tenant_id, deleted_at__lt=cutoff)
+                    .order_by('deleted_at').values_list('pk', flat=True)[:BATCH_SIZE]
+                )
+                # _raw_delete skips the collector, which would load every row to
+                # send it to the dashboard-wide post_delete receivers.
+                doomed = Tombstone._base_manager.filter(pk__in=pks)
+                doomed._raw_delete(doomed.db)
+            purged += len(pks)
+            if len(pks) < BATCH_SIZE:
+                break
+    return purged
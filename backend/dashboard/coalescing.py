@@ -0,0 +1,103 @@
+"""
+Single-flight coalescing of identical cache misses.
+
+When many clients ask for the same uncached response at once (a shift
+change opening the dashboard on every screen), only the first of them, the
+leader, runs the queries and serialization; the others wait and answer from
+the entry it stores. Within a process followers wait on the leader's call;
+across processes the leader holds a short lock in the dashboard cache and
+followers poll the cache for its entry, which needs a shared cache backend
+(see ``DASHBOARD_CACHE_ALIAS``). A follower that has waited
+``DASHBOARD_COALESCE_TIMEOUT`` seconds in all, or whose leader stored
+nothing (an error or a non-200 response), builds the response itself; a
+timeout of 0 turns coalescing off. Callers that must not block, such as
+sync views under ASGI, which all share one thread, skip the cross-process
+wait and build at once.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+POLL_INTERVAL = 0.05
+
+
+def get_timeout():
+    return getattr(settings, 'DASHBOARD_COALESCE_TIMEOUT', 10)
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time in this process; concurrent callers share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout=None):
+        """
+        ``func()``'s result, computed once for the callers that ask for
+        ``key`` while it runs. A caller calls ``func()`` itself when the
+        shared call raised or returned None, or when ``timeout`` expires.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+        if not leader:
+            if call.done.wait(timeout) and call.result is not None:
+                return call.result
+            return func()
+        try:
+            call.result = func()
+            return call.result
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+flight = SingleFlight()
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def fill(cache, key, build, wait=True):
+    """
+    The entry for ``key``: stored in ``cache`` by a concurrent leader, or
+    what ``build()`` returns. ``build`` must store its entry in ``cache``
+    before returning it, and return None for a response not to share.
+    Without ``wait``, a leader in another process is not waited for.
+    """
+    timeout = get_timeout()
+    if timeout <= 0:
+        return build()
+    # One deadline for the in-process wait and the cross-process poll.
+    deadline = time.monotonic() + timeout if wait else 0
+    return flight.do(key, lambda: _fill(cache, key, build, timeout, deadline), timeout)
+
+
+def _fill(cache, key, build, timeout, deadline):
+    lock = lock_key(key)
+    # The lock expires on its own if the leader dies holding it.
+    if cache.add(lock, 1, timeout):
+        try:
+            return build()
+        finally:
+            cache.delete(lock)
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(lock) is None:
+            break
+    return build()
@@ -0,0 +1,242 @@
+"""
+Downsampling of the time-series tables.
+
+Raw ``SecretsHygiene`` and ``SecurityAnomaly`` rows older than the weekly
+horizon are folded into weekly rollup rows, those older than the monthly
+horizon into monthly ones, and weekly rollups that age past the monthly
+horizon are folded again. A weekly row never crosses a month boundary (a
+week that does is split in two), so week and month rollups over it stay
+exact; monthly rows answer month rollups exactly and finer ones at their
+start date.
+
+Each step locks at most ``batch_size`` rows of one tenant, adds them into
+the rollup rows and deletes them, in one transaction. Sums add and maxima
+take the larger value, so a bucket can be filled over any number of
+batches and runs: the work can stop at any point and the next run
+carries on, and rows ingested late for an old date are folded in by the
+next run. The rollups keep each row's contribution to the risk overview,
+so compaction leaves it unchanged; expiring rollups past the retention
+horizon does not, and is followed by an overview rebuild.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+
+from . import caching, changes, tenancy
+from .models import (
+    SecretsHygiene,
+    SecretsHygieneRollup,
+    SecurityAnomaly,
+    SecurityAnomalyRollup,
+    TimeSeriesRollup,
+)
+
+WEEK = TimeSeriesRollup.WEEK
+MONTH = TimeSeriesRollup.MONTH
+BATCH_SIZE = 5000
+
+
+class Series:
+    def __init__(self, rollup, keys, values, derived=None):
+        self.rollup = rollup
+        # Fields that tell series apart within a tenant.
+        self.keys = keys
+        self.values = values
+        # Extra summed fields, computed from each raw row.
+        self.derived = derived or {}
+
+    @property
+    def sums(self):
+        return ('samples', *self.values, *self.derived)
+
+    @property
+    def maxima(self):
+        return tuple(f'{field}_max' for field in self.values)
+
+    def raw(self, row):
+        totals = {'samples': 1}
+        for field in self.values:
+            totals[field] = totals[f'{field}_max'] = getattr(row, field)
+        for field, compute in self.derived.items():
+            totals[field] = compute(row)
+        return totals
+
+    def folded(self, row):
+        return {field: getattr(row, field) for field in (*self.sums, *self.maxima)}
+
+
+SERIES = {
+    SecretsHygiene: Series(
+        SecretsHygieneRollup, (), ('secrets_found', 'secrets_rotated'),
+        {'exposed': lambda row: max(row.secrets_found - row.secrets_rotated, 0)},
+    ),
+    SecurityAnomaly: Series(SecurityAnomalyRollup, ('anomaly_type',), ('count',)),
+}
+
+
+def bucket_start(period, day):
+    month = day.replace(day=1)
+    if period == MONTH:
+        return month
+    return max(day - datetime.timedelta(days=day.weekday()), month)
+
+
+def horizons(today=None, weekly_days=None, monthly_days=None):
+    """``(weekly_before, monthly_before)``: raw rows before these dates are folded."""
+    today = today or datetime.date.today()
+    if weekly_days is None:
+        weekly_days = getattr(settings, 'DASHBOARD_TIMESERIES_WEEKLY_AFTER_DAYS', 90)
+    if monthly_days is None:
+        monthly_days = getattr(settings, 'DASHBOARD_TIMESERIES_MONTHLY_AFTER_DAYS', 365)
+    if monthly_days < weekly_days:
+        raise ValueError('The monthly horizon must not be shorter than the weekly one.')
+    weekly_before = today - datetime.timedelta(days=weekly_days)
+    # Whole months only, so a month is never split between week and month rows.
+    monthly_before = bucket_start(MONTH, today - datetime.timedelta(days=monthly_days))
+    return weekly_before, monthly_before
+
+
+def retention_horizon(today=None, retain_days=None):
+    """Rollups that start before this date are deleted; None keeps them all."""
+    if retain_days is None:
+        retain_days = getattr(settings, 'DASHBOARD_TIMESERIES_RETAIN_DAYS', None)
+    if retain_days is None:
+        return None
+    today = today or datetime.date.today()
+    return bucket_start(MONTH, today - datetime.timedelta(days=retain_days))
+
+
+def merge(series, tenant_id, buckets):
+    """Add ``{(period, start, *keys): totals}`` into ``tenant_id``'s rollup rows."""
+    rollup = series.rollup
+    existing = {
+        (row.period, row.start, *(getattr(row, key) for key in series.keys)): row
+        for row in rollup._base_manager.select_for_update().filter(
+            tenant_id=tenant_id,
+            start__in={start for _, start, *_ in buckets},
+            period__in={period for period, *_ in buckets},
+        )
+    }
+    created, updated = [], []
+    for bucket, totals in buckets.items():
+        row = existing.get(bucket)
+        if row is None:
+            period, start, *keys = bucket
+            created.append(rollup(
+                tenant_id=tenant_id, period=period, start=start, **dict(zip(series.keys, keys)), **totals,
+            ))
+            continue
+        for field in series.sums:
+            setattr(row, field, getattr(row, field) + totals[field])
+        for field in series.maxima:
+            setattr(row, field, max(getattr(row, field), totals[field]))
+        updated.append(row)
+    rollup._base_manager.bulk_create(created)
+    rollup._base_manager.bulk_update(updated, [*series.sums, *series.maxima])
+
+
+def fold(series, tenant_id, rows, period_of, date_of, totals_of):
+    buckets = {}
+    for row in rows:
+        period = period_of(row)
+        bucket = (period, bucket_start(period, date_of(row)), *(getattr(row, key) for key in series.keys))
+        totals = totals_of(row)
+        current = buckets.get(bucket)
+        if current is None:
+            buckets[bucket] = totals
+            continue
+        for field in series.sums:
+            current[field] += totals[field]
+        for field in series.maxima:
+            current[field] = max(current[field], totals[field])
+    merge(series, tenant_id, buckets)
+
+
+def compact_step(model, tenant_id, weekly_before, monthly_before, batch_size=BATCH_SIZE):
+    """Fold one batch of ``tenant_id``'s raw rows; returns how many were folded."""
+    series = SERIES[model]
+    with transaction.atomic():
+        rows = list(
+            model._base_manager.select_for_update()
+            .filter(tenant_id=tenant_id, date__lt=weekly_before)
+            .order_by('date', 'id')[:batch_size]
+        )
+        if rows:
+            fold(
+                series, tenant_id, rows,
+                period_of=lambda row: MONTH if row.date < monthly_before else WEEK,
+                date_of=lambda row: row.date,
+                totals_of=series.raw,
+            )
+            # _raw_delete: no per-row signals; the rollups took over the
+            # rows' overview contribution.
+            changes.bury(model, rows)
+            doomed = model._base_manager.filter(pk__in=[row.pk for row in rows])
+            doomed._raw_delete(doomed.db)
+    return len(rows)
+
+
+def promote_step(model, tenant_id, monthly_before, batch_size=BATCH_SIZE):
+    """Fold one batch of ``tenant_id``'s weekly rollups into monthly ones; returns how many."""
+    series = SERIES[model]
+    rollup = series.rollup
+    with transaction.atomic():
+        rows = list(
+            rollup._base_manager.select_for_update()
+            .filter(tenant_id=tenant_id, period=WEEK, start__lt=monthly_before)
+            .order_by('start', 'id')[:batch_size]
+        )
+        if rows:
+            doomed = rollup._base_manager.filter(pk__in=[row.pk for row in rows])
+            doomed._raw_delete(doomed.db)
+            fold(
+                series, tenant_id, rows,
+                period_of=lambda row: MONTH,
+                date_of=lambda row: row.start,
+                totals_of=series.folded,
+            )
+    return len(rows)
+
+
+def expire_step(model, tenant_id, before, batch_size=BATCH_SIZE):
+    """Delete one batch of ``tenant_id``'s rollups that start before ``before``; returns how many."""
+    rollup = SERIES[model].rollup
+    with transaction.atomic():
+        pks = list(
+            rollup._base_manager.filter(tenant_id=tenant_id, start__lt=before)
+            .order_by('start', 'id').values_list('pk', flat=True)[:batch_size]
+        )
+        doomed = rollup._base_manager.filter(pk__in=pks)
+        doomed._raw_delete(doomed.db)
+    return len(pks)
+
+
+def drain(step, *args, batch_size):
+    total = 0
+    while True:
+        count = step(*args, batch_size=batch_size)
+        total += count
+        if count < batch_size:
+            return total
+
+
+def compact(weekly_before, monthly_before, expire_before=None, batch_size=BATCH_SIZE):
+    """
+    Fold every tenant's old rows, and delete rollups that start before
+    ``expire_before`` when it is given. Returns ``{model: (raw rows folded,
+    weekly rollups folded, rollups deleted)}``.
+    """
+    result = {}
+    for model in SERIES:
+        compacted = promoted = expired = 0
+        for tenant_id in tenancy.tenant_ids():
+            compacted += drain(compact_step, model, tenant_id, weekly_before, monthly_before, batch_size=batch_size)
+            promoted += drain(promote_step, model, tenant_id, monthly_before, batch_size=batch_size)
+            if expire_before is not None:
+                expired += drain(expire_step, model, tenant_id, expire_before, batch_size=batch_size)
+        if compacted or promoted or expired:
+            caching.bump_version(model)
+            caching.bump_version(SERIES[model].rollup)
+        result[model] = (compacted, promoted, expired)
+    return result
@@ -0,0 +1,131 @@
+"""
+Read/write splitting for the dashboard app.
+
+Reads made while serving a safe request (see
+``middleware.ReplicaRoutingMiddleware``) go to the replica aliases in
+``DASHBOARD_READ_REPLICAS``, in smooth weighted round-robin. Everything else
+goes to ``default``: writes, reads outside a request, reads later in a
+request that already wrote, and reads from clients still pinned after a
+recent write. A replica that fails its health check, lags by more than
+``DASHBOARD_REPLICA_MAX_LAG`` seconds on PostgreSQL, or whose connection
+fails while serving a request, is skipped until the check is retried
+``DASHBOARD_REPLICA_HEALTH_TTL`` seconds later.
+"""
+import contextvars
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+APP_LABEL = 'dashboard'
+
+# True while handling a request whose reads may use a replica.
+read_from_replica = contextvars.ContextVar('dashboard_read_from_replica', default=False)
+
+# Set once the current request has written, so its later reads see the write.
+wrote_in_request = contextvars.ContextVar('dashboard_wrote_in_request', default=False)
+
+
+class ReplicaPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = {}
+        self._health = {}
+
+    def get_weights(self):
+        return getattr(settings, 'DASHBOARD_READ_REPLICAS', {})
+
+    def choose(self):
+        """Pick a healthy replica alias, or ``None`` when there is none."""
+        weights = {alias: weight for alias, weight in self.get_weights().items() if self.is_healthy(alias)}
+        if not weights:
+            return None
+        # Smooth weighted round-robin: spreads picks evenly instead of in
+        # runs of the heaviest alias.
+        with self._lock:
+            total = sum(weights.values())
+            for alias, weight in weights.items():
+                self._current[alias] = self._current.get(alias, 0) + weight
+            chosen = max(weights, key=lambda alias: self._current[alias])
+            self._current[chosen] -= total
+        return chosen
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            checked_at, healthy = self._health.get(alias, (None, True))
+        if checked_at is not None and now - checked_at < getattr(settings, 'DASHBOARD_REPLICA_HEALTH_TTL', 5):
+            return healthy
+        healthy = self.check(alias)
+        with self._lock:
+            # A failure reported while the check ran is newer than its result.
+            if self._health.get(alias, (None, True))[0] == checked_at:
+                self._health[alias] = (now, healthy)
+            else:
+                healthy = self._health[alias][1]
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(
+                        'SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)'
+                    )
+                    lag = cursor.fetchone()[0]
+                    max_lag = getattr(settings, 'DASHBOARD_REPLICA_MAX_LAG', 30)
+                    if lag > max_lag:
+                        logger.warning('Replica %s is %.1fs behind; reading from primary.', alias, lag)
+                        return False
+                else:
+                    cursor.execute('SELECT 1')
+        except Exception:
+            logger.warning('Replica %s failed its health check; reading from primary.', alias, exc_info=True)
+            connection.close()
+            return False
+        return True
+
+    def mark_unhealthy(self, alias):
+        with self._lock:
+            self._health[alias] = (time.monotonic(), False)
+
+    def report_failures(self):
+        """Mark unhealthy the replicas whose connection failed on this thread."""
+        weights = self.get_weights()
+        for connection in connections.all(initialized_only=True):
+            if connection.alias not in weights or not connection.errors_occurred:
+                continue
+            # errors_occurred is also set by ordinary query errors; those
+            # leave the connection usable. A failed connect leaves none.
+            if connection.connection is None or not connection.is_usable():
+                logger.warning('Replica %s failed while serving a request; reading from primary.', connection.alias)
+                self.mark_unhealthy(connection.alias)
+
+
+replicas = ReplicaPool()
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        if not read_from_replica.get() or wrote_in_request.get():
+            return DEFAULT_DB_ALIAS
+        return replicas.choose() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        wrote_in_request.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        databases = {DEFAULT_DB_ALIAS, *replicas.get_weights()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,151 @@
+"""
+Publish/subscribe of newly written security events for the SSE feed.
+
+Rows inserted into the streamed models are published after their
+transaction commits. Without ``DASHBOARD_EVENTS_REDIS_URL`` the broker is
+in-process: subscribers in the same process receive events through
+per-connection asyncio queues. With it, events fan out over a Redis
+pub/sub channel, so every worker sees writes from every other worker.
+Each event names its tenant, and a subscriber only forwards its own.
+"""
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+from .encoders import get_encoder
+from .models import SecurityAnomaly, ShadowIT
+
+STREAMS = {
+    SecurityAnomaly: 'security-anomalies',
+    ShadowIT: 'shadow-it',
+}
+
+
+class SubscriptionLost(Exception):
+    """The subscriber fell too far behind and missed events."""
+
+
+class InProcessSubscription:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        if self.overflowed:
+            raise SubscriptionLost()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            # Publishers run on request threads; hand over to the loop that
+            # owns the subscriber's queue.
+            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+    @asynccontextmanager
+    async def subscribe(self):
+        subscription = InProcessSubscription(asyncio.get_running_loop(), self.maxsize)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscriptions.discard(subscription)
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return json.loads(message['data']) if message else None
+
+
+class RedisBroker:
+    channel = 'dashboard:events'
+
+    def __init__(self, url):
+        import redis
+
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, event):
+        self.client.publish(self.channel, json.dumps(event))
+
+    @asynccontextmanager
+    async def subscribe(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            yield RedisSubscription(pubsub)
+        finally:
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, 'DASHBOARD_EVENTS_REDIS_URL', None)
+                _broker = RedisBroker(url) if url else InProcessBroker()
+    return _broker
+
+
+def make_event(instance):
+    encoder = get_encoder(type(instance))
+    row = {column: getattr(instance, column) for column in encoder.columns}
+    return {
+        'stream': STREAMS[type(instance)],
+        'tenant': instance.tenant_id,
+        'id': instance.pk,
+        'data': encoder.encode([row])[0],
+    }
+
+
+def publish_on_commit(instances):
+    events = [make_event(instance) for instance in instances]
+    if not events:
+        return
+
+    def publish():
+        broker = get_broker()
+        for event in events:
+            broker.publish(event)
+
+    # robust: a broker outage must not fail a write that already committed.
+    transaction.on_commit(publish, robust=True)
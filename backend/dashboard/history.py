@@ -0,0 +1,116 @@
+"""
+Point-in-time history of ``ComplianceScore``.
+
+Every change to a score appends a ``ComplianceScoreEvent`` (``score`` None
+when the owner is removed); rows are never updated, so the table only
+grows at its time end and can be range-partitioned or archived by
+``recorded_at``. ``compact()`` periodically folds the events into a
+``ComplianceScoreSnapshot``: the previous snapshot plus the events since
+it, stored as the full set of scores at ``taken_at``.
+
+``as_of(moment)`` starts from the latest snapshot at or before ``moment``
+and replays only the events between the two, so its cost is one snapshot
+plus one compaction interval of changes, however long the history is.
+Events and snapshots belong to a tenant like the scores; the queries see
+the current tenant's, and ``compact()`` snapshots each tenant in turn.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import tenancy
+from .models import ComplianceScoreEvent, ComplianceScoreSnapshot
+
+BATCH_SIZE = 2000
+
+
+def record(changes):
+    """Append one event per ``(tenant_id, owner, score)`` change, stamped now."""
+    now = timezone.now()
+    ComplianceScoreEvent.objects.bulk_create(
+        [
+            ComplianceScoreEvent(tenant_id=tenant_id, owner=owner, score=score, recorded_at=now)
+            for tenant_id, owner, score in changes
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def latest_snapshot(moment):
+    return (
+        ComplianceScoreSnapshot.objects.filter(taken_at__lte=moment)
+        .order_by('-taken_at')
+        .values_list('taken_at', flat=True)
+        .first()
+    )
+
+
+def replay(moment):
+    """``(scores, snapshot_at)``: every owner's score as of ``moment``."""
+    snapshot_at = latest_snapshot(moment)
+    scores = {}
+    events = ComplianceScoreEvent.objects.filter(recorded_at__lte=moment)
+    if snapshot_at is not None:
+        scores = dict(
+            ComplianceScoreSnapshot.objects.filter(taken_at=snapshot_at).values_list('owner', 'score')
+        )
+        events = events.filter(recorded_at__gt=snapshot_at)
+    for owner, score in events.order_by('recorded_at', 'id').values_list('owner', 'score').iterator():
+        if score is None:
+            scores.pop(owner, None)
+        else:
+            scores[owner] = score
+    return scores, snapshot_at
+
+
+def as_of(moment):
+    scores, _ = replay(moment)
+    return [{'owner': owner, 'score': score} for owner, score in sorted(scores.items())]
+
+
+def compact(until=None):
+    """
+    Snapshot every tenant's scores as of ``until`` (default: now minus
+    ``DASHBOARD_COMPLIANCE_SNAPSHOT_LAG`` seconds, so transactions still
+    open at that moment have committed their events). Returns the snapshot
+    time, or None when no tenant's scores changed since its previous
+    snapshot.
+    """
+    if until is None:
+        lag = getattr(settings, 'DASHBOARD_COMPLIANCE_SNAPSHOT_LAG', 300)
+        until = timezone.now() - datetime.timedelta(seconds=lag)
+    taken = False
+    for tenant_id in tenancy.tenant_ids():
+        with tenancy.use_tenant(tenant_id):
+            taken = compact_tenant(until) or taken
+    return until if taken else None
+
+
+def compact_tenant(until):
+    """Snapshot the current tenant's scores as of ``until``; False when unchanged."""
+    with transaction.atomic():
+        previous = latest_snapshot(until)
+        changes = ComplianceScoreEvent.objects.filter(recorded_at__lte=until)
+        if previous is not None:
+            changes = changes.filter(recorded_at__gt=previous)
+        if not changes.exists():
+            return False
+        scores, _ = replay(until)
+        ComplianceScoreSnapshot.objects.bulk_create(
+            [ComplianceScoreSnapshot(taken_at=until, owner=owner, score=score) for owner, score in scores.items()],
+            batch_size=BATCH_SIZE,
+        )
+    return True
+
+
+def owner_history(owner, since=None):
+    events = ComplianceScoreEvent.objects.filter(owner=owner)
+    if since is not None:
+        events = events.filter(recorded_at__gte=since)
+    return [
+        {'recorded_at': recorded_at, 'score': score}
+        for recorded_at, score in events.order_by('recorded_at', 'id').values_list('recorded_at', 'score')
+    ]
+
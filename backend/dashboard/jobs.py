@@ -0,0 +1,199 @@
+"""
+A database-backed job queue for work that shouldn't run on a request thread.
+
+Functions registered with ``@task`` are queued with ``enqueue()``, which
+inserts a ``Job`` row inside the caller's transaction, so a job exists
+exactly when the write that asked for it commits. ``manage.py run_jobs``
+claims and runs them:
+
+* Claims use ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database has
+  it (PostgreSQL), so concurrent workers never wait on each other's rows.
+  Elsewhere a worker marks its candidate running with a conditional
+  ``UPDATE`` and moves on if another worker got there first; SQLite
+  serializes writers, so that is enough.
+* A failing job is retried with exponential backoff and jitter until it
+  has used its ``max_attempts``, then left ``failed`` with the traceback.
+* Queuing a job identical (same tenant, task and arguments) to one still
+  queued returns the queued one instead of adding another.
+* A job still running ``DASHBOARD_JOBS_LEASE_SECONDS`` after it was
+  claimed is assumed lost with its worker and requeued, so the lease must
+  exceed the longest job.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import traceback
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import tenancy
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+ENQUEUE_ATTEMPTS = 3
+
+tasks = {}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, delay=0, **kwargs):
+        return enqueue(self.name, kwargs, delay=delay)
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """Register ``func`` as a task; call ``func.enqueue(**kwargs)`` to queue it."""
+    def register(func):
+        registered = Task(
+            func,
+            name or f'{func.__module__}.{func.__qualname__}',
+            max_attempts or getattr(settings, 'DASHBOARD_JOBS_MAX_ATTEMPTS', 5),
+        )
+        tasks[registered.name] = registered
+        return registered
+    return register(func) if func is not None else register
+
+
+def dedup_key(tenant_id, name, args):
+    payload = json.dumps([tenant_id, name, args], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def enqueue(name, args=None, delay=0):
+    """Queue task ``name`` with keyword ``args``, or return the identical queued job."""
+    args = json.loads(json.dumps(args or {}, cls=DjangoJSONEncoder))
+    tenant_id = tenancy.current_tenant_id()
+    key = dedup_key(tenant_id, name, args)
+    for _ in range(ENQUEUE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return Job.objects.create(
+                    tenant_id=tenant_id,
+                    name=name,
+                    args=args,
+                    dedup_key=key,
+                    max_attempts=tasks[name].max_attempts,
+                    run_at=timezone.now() + datetime.timedelta(seconds=delay),
+                )
+        except IntegrityError:
+            job = Job._base_manager.filter(dedup_key=key, status=Job.QUEUED).first()
+            if job is not None:
+                return job
+            # Claimed between the insert and the lookup; try to queue a fresh one.
+    raise IntegrityError(f'Could not queue {name}: its queued duplicate kept changing.')
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """Mark the next due job running for ``worker`` and return it, or None."""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    claimed = {'status': Job.RUNNING, 'locked_by': worker, 'locked_at': now, 'attempts': F('attempts') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = due.select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            Job.objects.filter(pk=pk).update(**claimed)
+    else:
+        for pk in due.values_list('pk', flat=True)[:10]:
+            if Job.objects.filter(pk=pk, status=Job.QUEUED).update(**claimed):
+                break
+        else:
+            return None
+    return Job.objects.get(pk=pk)
+
+
+def backoff(attempts):
+    base = getattr(settings, 'DASHBOARD_JOBS_BACKOFF_BASE', 2)
+    ceiling = getattr(settings, 'DASHBOARD_JOBS_BACKOFF_MAX', 600)
+    delay = min(ceiling, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def requeue(job, run_at, **fields):
+    """Put ``job`` back in the queue, unless an identical job is already queued."""
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job.pk).update(status=Job.QUEUED, run_at=run_at, **fields)
+    except IntegrityError:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED, finished_at=timezone.now(),
+            last_error=fields.get('last_error', '') + '\nSuperseded by an identical queued job.',
+        )
+
+
+def run(job):
+    """Run a claimed job and record the outcome; returns the final status."""
+    registered = tasks.get(job.name)
+    try:
+        if registered is None:
+            raise LookupError(f'No task is registered as {job.name!r}.')
+        result = registered(**job.args)
+    except Exception:
+        error = traceback.format_exc()
+        if registered is not None and job.attempts < job.max_attempts:
+            delay = backoff(job.attempts)
+            logger.warning('Job %s (%s) failed, retrying in %.0fs:\n%s', job.pk, job.name, delay, error)
+            requeue(job, timezone.now() + datetime.timedelta(seconds=delay), last_error=error)
+            return Job.QUEUED
+        logger.error('Job %s (%s) failed permanently:\n%s', job.pk, job.name, error)
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, last_error=error, finished_at=timezone.now())
+        return Job.FAILED
+
+    result = json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, result=result, finished_at=timezone.now())
+    return Job.DONE
+
+
+def recover_stale():
+    """Requeue jobs claimed longer ago than the lease; returns how many."""
+    lease = getattr(settings, 'DASHBOARD_JOBS_LEASE_SECONDS', 900)
+    stale = Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=timezone.now() - datetime.timedelta(seconds=lease),
+    )
+    count = 0
+    for job in stale:
+        requeue(job, timezone.now(), last_error=f'Lease expired while running on {job.locked_by}.')
+        count += 1
+    return count
+
+
+def purge(days):
+    """Delete finished jobs older than ``days``; returns how many."""
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(
+                Job._base_manager.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff)
+                .values_list('pk', flat=True)[:BATCH_SIZE]
+            )
+            # _raw_delete skips the collector, which would load every job to
+            # send it to the dashboard-wide post_delete receivers.
+            doomed = Job._base_manager.filter(pk__in=pks)
+            doomed._raw_delete(doomed.db)
+        deleted += len(pks)
+        if len(pks) < BATCH_SIZE:
+            return deleted
@@ -0,0 +1,223 @@
+import io
+import json
+import re
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import URLPattern, reverse
+
+from dashboard import caching
+from dashboard.urls import router, urlpatterns
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+# Long-lived streams never complete, so they can't be timed per request;
+# the metrics page grows with every request measured.
+EXCLUDED_ROUTES = {'event-stream', 'metrics'}
+
+# The query count PerformanceMiddleware reports. Unlike CaptureQueriesContext
+# it includes queries on worker threads (the async snapshot's sections), but
+# not those a streaming response makes after the headers are sent.
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+# Query strings for routes that need parameters.
+ROUTE_QUERIES = {'search': '?q=repo', 'compliance-score history': '?owner=Team+A'}
+
+
+def get_routes():
+    """Every GET route in dashboard/urls.py, as (name, path-or-callable) pairs."""
+    routes = []
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name and not pattern.pattern.converters:
+            if pattern.name in EXCLUDED_ROUTES:
+                continue
+            routes.append((pattern.name, reverse(pattern.name) + ROUTE_QUERIES.get(pattern.name, '')))
+    for prefix, viewset, basename in router.registry:
+        routes.append((f'{prefix} list', reverse(f'{basename}-list')))
+        routes.append((f'{prefix} detail', _detail_path(viewset, basename)))
+        for extra in viewset.get_extra_actions():
+            if extra.detail or 'get' not in extra.mapping:
+                continue
+            name = f'{prefix} {extra.url_path}'
+            routes.append((name, reverse(f'{basename}-{extra.url_name}') + ROUTE_QUERIES.get(name, '')))
+    return routes
+
+
+def _detail_path(viewset, basename):
+    def resolve():
+        pk = viewset.queryset.model._default_manager.order_by('pk').values_list('pk', flat=True).first()
+        return reverse(f'{basename}-detail', kwargs={'pk': pk}) if pk is not None else None
+    return resolve
+
+
+def baseline_of(results, latency=False):
+    """
+    The parts of ``results`` worth committing: query counts, which are the
+    same on every machine, and p95s only when asked for.
+    """
+    fields = ('path', 'queries', 'p95_ms') if latency else ('path', 'queries')
+    return {
+        'scales': {
+            scale: {name: {field: route[field] for field in fields} for name, route in routes.items()}
+            for scale, routes in results['scales'].items()
+        },
+    }
+
+
+def count_queries(response, captured):
+    match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+    return max(len(captured), int(match[1]) if match else 0)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks every dashboard API route against a throwaway test database seeded at '
+        'several scales, and fails if query counts or latency regress against a JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', default='0,1,5',
+            help='Comma-separated populate_db --scale values to seed; 0 means the default fixtures.',
+        )
+        parser.add_argument('--days', type=int, default=90, help='Days of history for scaled seeds.')
+        parser.add_argument('--requests', type=int, default=20, help='Measured requests per route.')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per route.')
+        parser.add_argument('--warm-cache', action='store_true', help='Keep the response cache between requests.')
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Write the query counts as the new baseline; --latency also records p95s.',
+        )
+        parser.add_argument(
+            '--latency', action='store_true',
+            help='Record p95s in the baseline. Latency is only compared for baselines that have them.',
+        )
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=1.5,
+            help='Fail when a p95 exceeds the baseline p95 times this factor (plus the slack).',
+        )
+        parser.add_argument('--latency-slack-ms', type=float, default=2.0)
+        parser.add_argument('--output', type=Path, help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        scales = [int(scale) for scale in options['scales'].split(',') if scale.strip()]
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            results = {'scales': {}}
+            for scale in scales:
+                self.seed(scale, options['days'])
+                results['scales'][str(scale)] = self.measure(options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if options['output']:
+            self.write(options['output'], results)
+        if options['update_baseline']:
+            self.write(options['baseline'], baseline_of(results, options['latency']))
+        else:
+            self.compare(results, options)
+
+    def write(self, path, results):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+        self.stdout.write(f'Wrote {path}')
+
+    def seed(self, scale, days):
+        self.stdout.write(f'Seeding scale {scale}...')
+        arguments = {'seed': 0, 'scale': scale, 'days': days} if scale else {}
+        call_command('populate_db', stdout=io.StringIO(), **arguments)
+
+    # Measured requests come faster than any client's rate limit allows.
+    @override_settings(DASHBOARD_THROTTLE_RATES={})
+    def measure(self, options):
+        client = Client()
+        cache = caching.get_cache()
+        measured = {}
+        for name, path in get_routes():
+            if callable(path):
+                path = path()
+                if path is None:
+                    continue
+            latencies, queries, sizes = [], [], []
+            for attempt in range(options['warmup'] + options['requests']):
+                if not options['warm_cache']:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    # Streaming responses do their work while being consumed.
+                    size = len(response.getvalue())
+                    elapsed = (time.perf_counter() - started) * 1000
+                if response.status_code != 200:
+                    raise CommandError(f'{name} ({path}) returned {response.status_code}')
+                if attempt < options['warmup']:
+                    continue
+                latencies.append(elapsed)
+                queries.append(count_queries(response, captured))
+                sizes.append(size)
+            measured[name] = {
+                'path': path,
+                'p50_ms': round(statistics.median(latencies), 3),
+                'p95_ms': round(percentile(latencies, 0.95), 3),
+                'p99_ms': round(percentile(latencies, 0.99), 3),
+                'queries': max(queries),
+                'bytes': max(sizes),
+            }
+            self.stdout.write(
+                f"  {name:<40} p50 {measured[name]['p50_ms']:>8.2f}ms  p95 {measured[name]['p95_ms']:>8.2f}ms  "
+                f"{measured[name]['queries']:>3} queries  {measured[name]['bytes']:>9} bytes"
+            )
+        return measured
+
+    def compare(self, results, options):
+        if not options['baseline'].exists():
+            raise CommandError(f"No baseline at {options['baseline']}; run with --update-baseline to record one.")
+
+        baseline = json.loads(options['baseline'].read_text())
+        failures = []
+        for scale, routes in results['scales'].items():
+            for name, current in routes.items():
+                previous = baseline.get('scales', {}).get(scale, {}).get(name)
+                if previous is None:
+                    self.stdout.write(f'  new route at scale {scale}: {name}')
+                    continue
+                if current['queries'] > previous['queries']:
+                    failures.append(
+                        f"scale {scale} {name}: {current['queries']} queries (baseline {previous['queries']})"
+                    )
+                if 'p95_ms' not in previous:
+                    continue
+                limit = previous['p95_ms'] * options['latency_tolerance'] + options['latency_slack_ms']
+                if current['p95_ms'] > limit:
+                    failures.append(
+                        f"scale {scale} {name}: p95 {current['p95_ms']:.2f}ms exceeds {limit:.2f}ms "
+                        f"(baseline {previous['p95_ms']:.2f}ms)"
+                    )
+
+        if failures:
+            raise CommandError('Performance regression:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures per-request database overhead with fresh connections (CONN_MAX_AGE=0) against '
+        'the configured persistent/pooled setup, by replaying the request signal cycle around a '
+        'trivial query'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        configured = dict(connection.settings_dict)
+        label = 'pool' if configured['OPTIONS'].get('pool') else f"CONN_MAX_AGE={configured['CONN_MAX_AGE']}"
+
+        self.stdout.write(f"{connection.vendor} {configured['NAME']}, {options['requests']} requests each")
+        try:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = 0
+            connection.settings_dict['OPTIONS'] = {
+                key: value for key, value in configured['OPTIONS'].items() if key != 'pool'
+            }
+            self.report('fresh connection per request', self.run(options['requests']))
+        finally:
+            connection.close()
+            connection.settings_dict.update(configured)
+        self.report(f'configured ({label})', self.run(options['requests']))
+        connection.close()
+
+    def run(self, requests):
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count)
+        latencies = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                request_finished.send(sender=self.__class__)
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection_created.disconnect(count)
+        return latencies, len(opened)
+
+    def report(self, label, result):
+        latencies, opened = result
+        ordered = sorted(latencies)
+        self.stdout.write(
+            f'  {label:<32} p50 {statistics.median(ordered):7.3f}ms  '
+            f'p95 {ordered[int(0.95 * (len(ordered) - 1))]:7.3f}ms  {opened} connects'
+        )
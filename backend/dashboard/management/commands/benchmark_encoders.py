@@ -0,0 +1,59 @@
+import io
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from dashboard.encoders import get_encoder
+from dashboard.views import DashboardSnapshotView
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares list throughput of the ModelSerializer path with the compiled .values() '
+        'encoders, query included, on a throwaway database seeded by populate_db'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=5)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the fastest is reported.')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            call_command(
+                'populate_db', scale=options['scale'], days=options['days'], seed=0, stdout=io.StringIO(),
+            )
+            self.compare(options['repeat'])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def compare(self, repeat):
+        self.stdout.write(f"{'resource':<26}{'rows':>9}{'serializer rows/s':>20}{'encoder rows/s':>17}{'speedup':>9}")
+        for key, viewset in DashboardSnapshotView.sections:
+            queryset = viewset.queryset.order_by('pk')
+            rows = queryset.count()
+            if not rows:
+                continue
+            encoder = get_encoder(queryset.model)
+            serializer_time = best_of(repeat, lambda: viewset.serializer_class(queryset.all(), many=True).data)
+            encoder_time = best_of(repeat, lambda: encoder.encode(encoder.values(queryset.all())))
+            self.stdout.write(
+                f'{key:<26}{rows:>9}{rows / serializer_time:>20,.0f}{rows / encoder_time:>17,.0f}'
+                f'{serializer_time / encoder_time:>8.1f}x'
+            )
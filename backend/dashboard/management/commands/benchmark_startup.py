@@ -0,0 +1,85 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: load the WSGI entry point, then send it one
+# request in-process, timing both.
+PROBE = '''
+import io, json, sys, time
+started = time.perf_counter()
+from importlib import import_module
+application = import_module(sys.argv[1]).application
+ready = time.perf_counter()
+statuses = []
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[2], 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+    'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr, 'wsgi.multithread': False, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+}
+response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+b''.join(response)
+getattr(response, 'close', lambda: None)()
+done = time.perf_counter()
+print(json.dumps({
+    'ready_ms': (ready - started) * 1000,
+    'first_request_ms': (done - ready) * 1000,
+    'modules': len(sys.modules),
+    'status': statuses[0],
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures how fast fresh worker processes load each WSGI entry point and serve their first '
+        'request, to compare core.wsgi with the API-only core.wsgi_api. Uses the configured database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entry-points', default='core.wsgi,core.wsgi_api', help='Comma-separated WSGI modules to compare.',
+        )
+        parser.add_argument('--runs', type=int, default=5, help='Fresh processes per entry point.')
+        parser.add_argument('--path', default='/api/risk-overview/', help='Path of the first request.')
+
+    def handle(self, *args, **options):
+        # Each entry point picks its own settings module.
+        env = {key: value for key, value in os.environ.items() if key != 'DJANGO_SETTINGS_MODULE'}
+        baseline = None
+        for entry_point in filter(None, (name.strip() for name in options['entry_points'].split(','))):
+            samples = [self.probe(entry_point, options['path'], env) for _ in range(max(1, options['runs']))]
+            result = {
+                key: statistics.median(sample[key] for sample in samples)
+                for key in ('process_ms', 'ready_ms', 'first_request_ms', 'modules')
+            }
+            if baseline is None:
+                baseline = result
+            self.stdout.write(
+                f"  {entry_point:<20} ready {result['ready_ms']:>7.1f}ms  "
+                f"first request {result['first_request_ms']:>7.1f}ms  "
+                f"process {result['process_ms']:>7.1f}ms ({result['process_ms'] / baseline['process_ms']:.0%})  "
+                f"{result['modules']:>5.0f} modules"
+            )
+        self.stdout.write(self.style.SUCCESS('Medians; "process" includes interpreter startup and exit.'))
+
+    def probe(self, entry_point, path, env):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE, entry_point, path],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        if completed.returncode != 0:
+            raise CommandError(f'{entry_point} failed:\n{completed.stderr}')
+        sample = json.loads(completed.stdout.strip().splitlines()[-1])
+        if not sample['status'].startswith('200'):
+            raise CommandError(f"{entry_point} answered {path} with {sample['status']}:\n{completed.stderr}")
+        sample['process_ms'] = elapsed
+        return sample
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import history, tasks
+
+
+class Command(BaseCommand):
+    help = (
+        'Folds recent compliance score changes into a snapshot, which ?as_of= queries start from; '
+        'run it daily (from cron, or --background for run_jobs)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help='Queue it for run_jobs instead.')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = tasks.compact_compliance_history.enqueue()
+            self.stdout.write(self.style.SUCCESS(f'Queued job {job.pk}.'))
+            return
+        taken_at = history.compact()
+        if taken_at is None:
+            self.stdout.write('No compliance score changes since the last snapshot.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Snapshot taken as of {taken_at.isoformat()}.'))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import compaction, overview, tasks
+
+
+class Command(BaseCommand):
+    help = (
+        'Folds old secrets hygiene and anomaly rows into weekly and monthly rollups in bounded batches, '
+        'so the tables stop growing; safe to interrupt and rerun, and to run alongside ingestion. '
+        'Run it daily (from cron, or --background for run_jobs)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weekly-after-days', type=int,
+            help='Fold rows older than this into weekly rollups (default: DASHBOARD_TIMESERIES_WEEKLY_AFTER_DAYS).',
+        )
+        parser.add_argument(
+            '--monthly-after-days', type=int,
+            help='Fold rows older than this into monthly rollups (default: DASHBOARD_TIMESERIES_MONTHLY_AFTER_DAYS).',
+        )
+        parser.add_argument(
+            '--retain-days', type=int,
+            help='Delete rollups older than this (default: DASHBOARD_TIMESERIES_RETAIN_DAYS, or keep all).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=compaction.BATCH_SIZE, help='Rows locked and folded per transaction.',
+        )
+        parser.add_argument('--background', action='store_true', help='Queue it for run_jobs instead.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        try:
+            weekly_before, monthly_before = compaction.horizons(
+                weekly_days=options['weekly_after_days'], monthly_days=options['monthly_after_days'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        expire_before = compaction.retention_horizon(retain_days=options['retain_days'])
+        if expire_before is not None and expire_before > monthly_before:
+            raise CommandError('Rollups must be kept at least as long as the monthly horizon.')
+
+        if options['background']:
+            # The job recomputes the horizons from the day counts when it runs.
+            job = tasks.compact_timeseries.enqueue(
+                batch_size=options['batch_size'],
+                weekly_days=options['weekly_after_days'],
+                monthly_days=options['monthly_after_days'],
+                retain_days=options['retain_days'],
+            )
+            self.stdout.write(self.style.SUCCESS(f'Queued job {job.pk}.'))
+            return
+
+        result = compaction.compact(weekly_before, monthly_before, expire_before, options['batch_size'])
+        for model, (compacted, promoted, expired) in result.items():
+            self.stdout.write(
+                f'  {model.__name__}: {compacted} row(s) folded, {promoted} weekly rollup(s) folded, '
+                f'{expired} rollup(s) deleted'
+            )
+        if any(expired for _, _, expired in result.values()):
+            # Deleted rollups never went through the model signals.
+            overview.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Weekly rollups before {weekly_before.isoformat()}, monthly before {monthly_before.isoformat()}.'
+        ))
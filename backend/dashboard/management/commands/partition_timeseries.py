@@ -0,0 +1,57 @@
+import datetime
+import functools
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import caching, changes, overview, partitions
+from dashboard.models import RiskOverview, SecretsHygiene, SecurityAnomaly
+
+MODELS = (SecretsHygiene, SecurityAnomaly)
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates the monthly partitions of the time-series tables ahead of time and, with --keep-months, '
+        'drops the oldest ones (PostgreSQL only); run it monthly'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=partitions.MONTHS_AHEAD, help='Months to create past the current one.',
+        )
+        parser.add_argument(
+            '--keep-months', type=int,
+            help='Drop partitions older than this many months before the current one (default: keep all).',
+        )
+
+    def handle(self, *args, **options):
+        tables = [model._meta.db_table for model in MODELS]
+        if not all(partitions.is_partitioned(table) for table in tables):
+            raise CommandError('The time-series tables are only partitioned on PostgreSQL (migration 0008).')
+        if options['ahead'] < 0 or (options['keep_months'] is not None and options['keep_months'] < 0):
+            raise CommandError('--ahead and --keep-months must not be negative.')
+
+        this_month = partitions.month_start(datetime.date.today())
+        last = this_month
+        for _ in range(options['ahead']):
+            last = partitions.next_month(last)
+
+        dropped = []
+        for model, table in zip(MODELS, tables):
+            for name in partitions.ensure(table, this_month, last):
+                self.stdout.write(f'  created {name}')
+            if options['keep_months'] is not None:
+                cutoff = this_month
+                for _ in range(options['keep_months']):
+                    cutoff = (cutoff - datetime.timedelta(days=1)).replace(day=1)
+                bury = functools.partial(changes.bury_table, model=model)
+                for name in partitions.drop_before(table, cutoff, before_drop=bury):
+                    self.stdout.write(f'  dropped {name}')
+                    dropped.append(name)
+
+        if dropped:
+            # Dropped rows never went through the model signals.
+            overview.rebuild()
+            for model in (*MODELS, RiskOverview):
+                caching.bump_version(model)
+        self.stdout.write(self.style.SUCCESS(f'Partitions cover {this_month:%Y-%m} to {last:%Y-%m}.'))
@@ -1,37 +1,115 @@
 import datetime
-from django.core.management.base import BaseCommand
+import random
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from dashboard import caching, history, overview, partitions, search, tenancy
 from dashboard.models import (
+    Tenant,
+    RiskOverview,
+    CloudMisconfiguration,
+    PackageVetting,
+    PackageHealth,
+    SecretsHygiene,
+    SecretsHygieneRollup,
+    IamRisk,
+    SecurityAnomaly,
+    SecurityAnomalyRollup,
+    ComplianceScore,
+    ShadowIT,
+    ComplianceScoreEvent,
+    ComplianceScoreSnapshot,
+    Tombstone,
+)
+
+MODELS = (
     RiskOverview,
     CloudMisconfiguration,
     PackageVetting,
     PackageHealth,
     SecretsHygiene,
+    SecretsHygieneRollup,
     IamRisk,
     SecurityAnomaly,
+    SecurityAnomalyRollup,
     ComplianceScore,
     ShadowIT,
+    ComplianceScoreEvent,
+    ComplianceScoreSnapshot,
+    Tombstone,
 )
 
+MISCONFIGURATION_CATEGORIES = (
+    'Public S3 Buckets', 'Open Ports', 'Admin IAM Roles', 'Unencrypted Volumes',
+    'Disabled Logging', 'Public Snapshots', 'Stale Access Keys', 'Open Security Groups',
+)
+ANOMALY_TYPES = (
+    'impossible-travel', 'off-hours-access', 'mass-download', 'privilege-escalation',
+    'brute-force', 'new-country-login', 'token-reuse', 'dormant-account-use',
+)
+PRIVILEGES = ('all', 'read-write', 'read-only', 'billing', 'deploy')
+SHADOW_IT_ITEMS = (
+    'Slack', 'Trello', 'Dropbox', 'Notion', 'Airtable', 'Zapier', 'WeTransfer',
+    'Miro', 'Figma', 'Calendly', 'Loom', 'Grammarly',
+)
+PACKAGE_HEALTH = (('Healthy', 80), ('Vulnerable', 15), ('At Risk', 5))
+
+
 class Command(BaseCommand):
     help = 'Populates the database with mock data'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=int,
+            help='Generate synthetic data instead of the fixtures; entity counts grow linearly with it.',
+        )
+        parser.add_argument('--days', type=int, help='Days of time-series history to generate (default 365).')
+        parser.add_argument(
+            '--tenants', type=int,
+            help='Number of tenants to generate: the default tenant plus business units bu001... (default 1).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same rows.')
+        parser.add_argument(
+            '--end-date', type=datetime.date.fromisoformat,
+            help='Last day of generated history (default today); fix it for byte-identical runs.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert batch.')
+
     def handle(self, *args, **options):
         self.stdout.write('Populating database...')
 
         # Clean up existing data
-        RiskOverview.objects.all().delete()
-        CloudMisconfiguration.objects.all().delete()
-        PackageVetting.objects.all().delete()
-        PackageHealth.objects.all().delete()
-        SecretsHygiene.objects.all().delete()
-        IamRisk.objects.all().delete()
-        SecurityAnomaly.objects.all().delete()
-        ComplianceScore.objects.all().delete()
-        ShadowIT.objects.all().delete()
-
-        # Risk Overview
-        RiskOverview.objects.create(total_issues=12, high_risk_roles=3, exposed_secrets=5)
+        self.clear()
 
+        synthetic = any(options[name] is not None for name in ('scale', 'days', 'tenants'))
+        if synthetic:
+            self.populate_synthetic(options)
+        else:
+            self.populate_fixtures()
+
+        # Risk Overview and the search entries are derived from the rows
+        # above; rebuild them so the fixture starts out exact.
+        overview.rebuild()
+        search.rebuild()
+        for model in MODELS:
+            caching.bump_version(model)
+
+        self.stdout.write(self.style.SUCCESS('Successfully populated database.'))
+
+    def clear(self):
+        # Raw table deletes: going through the ORM would load and signal
+        # every row, which is unusable after a large synthetic run.
+        tables = [connection.ops.quote_name(model._meta.db_table) for model in MODELS]
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'TRUNCATE {", ".join(tables)} RESTART IDENTITY')
+            else:
+                for table in tables:
+                    cursor.execute(f'DELETE FROM {table}')
+        Tenant.objects.exclude(pk=tenancy.DEFAULT_TENANT_ID).delete()
+
+    def populate_fixtures(self):
         # Cloud Misconfigurations
         CloudMisconfiguration.objects.create(category='Public S3 Buckets', value=5)
         CloudMisconfiguration.objects.create(category='Open Ports', value=12)
@@ -72,4 +150,182 @@ class Command(BaseCommand):
         ShadowIT.objects.create(item='Slack', detected_on=datetime.date.today())
         ShadowIT.objects.create(item='Trello', detected_on=datetime.date.today())
 
-        self.stdout.write(self.style.SUCCESS('Successfully populated database.'))
+    def populate_synthetic(self, options):
+        scale = options['scale'] or 1
+        days = options['days'] or 365
+        tenants = options['tenants'] or 1
+        batch_size = options['batch_size']
+        if min(scale, days, tenants, batch_size) < 1:
+            raise CommandError('--scale, --days, --tenants and --batch-size must be positive.')
+
+        units = Tenant.objects.bulk_create(
+            [Tenant(slug=f'bu{index:03d}', name=f'Business unit {index}') for index in range(1, tenants)]
+        )
+        generator = SyntheticData(
+            seed=options['seed'],
+            scale=scale,
+            days=days,
+            tenants=[tenancy.DEFAULT_TENANT_ID, *(unit.pk for unit in units)],
+            end_date=options['end_date'] or datetime.date.today(),
+        )
+        for table in partitions.PARTITIONED:
+            if partitions.is_partitioned(table):
+                partitions.ensure(table, min(generator.dates()), generator.end_date)
+        for model, columns, rows in generator.tables():
+            written = self.write(model, columns, rows, batch_size)
+            self.stdout.write(f'  {model.__name__}: {written} rows')
+
+        # Weekly snapshots, as a daily compaction job would leave behind.
+        for date in generator.dates():
+            if date.weekday() == 6:
+                history.compact(until=_end_of_day(date))
+
+    def write(self, model, columns, rows, batch_size):
+        if connection.vendor == 'postgresql' and _supports_copy():
+            return self.copy(model, columns, rows)
+        written = 0
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            model.objects.bulk_create(
+                [model(**dict(zip(columns, row))) for row in batch], batch_size=batch_size,
+            )
+            written += len(batch)
+        return written
+
+    def copy(self, model, columns, rows):
+        quote = connection.ops.quote_name
+        sql = 'COPY {} ({}) FROM STDIN'.format(
+            quote(model._meta.db_table), ', '.join(quote(column) for column in columns),
+        )
+        written = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            with cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    written += 1
+        return written
+
+
+def _end_of_day(date):
+    return datetime.datetime.combine(date, datetime.time.max, tzinfo=datetime.timezone.utc)
+
+
+def _supports_copy():
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+class SyntheticData:
+    """
+    Reproducible synthetic rows shaped like production scanner output.
+
+    Each table draws from its own ``random.Random`` derived from the seed, so
+    the rows of one table don't change when another table's volume does.
+    Every table gets its rows for each tenant id in ``tenants`` in turn,
+    drawn from the table's one stream.
+    """
+
+    def __init__(self, seed, scale, days, tenants, end_date):
+        self.seed = seed
+        self.scale = scale
+        self.days = days
+        self.tenants = tenants
+        self.end_date = end_date
+
+    def rng(self, name):
+        return random.Random(f'{self.seed}:{name}')
+
+    def dates(self):
+        for offset in range(self.days - 1, -1, -1):
+            yield self.end_date - datetime.timedelta(days=offset)
+
+    def tables(self):
+        yield CloudMisconfiguration, ('tenant_id', 'category', 'value'), self.cloud_misconfigurations()
+        yield PackageVetting, (
+            'tenant_id', 'repository', 'vulnerable_packages', 'license_violations',
+        ), self.package_vetting()
+        yield PackageHealth, ('tenant_id', 'label', 'value'), self.package_health()
+        yield SecretsHygiene, ('tenant_id', 'date', 'secrets_found', 'secrets_rotated'), self.secrets_hygiene()
+        yield IamRisk, ('tenant_id', 'role', 'privileges', 'mfa_enabled'), self.iam_risk()
+        yield SecurityAnomaly, ('tenant_id', 'date', 'anomaly_type', 'count'), self.security_anomalies()
+        yield ComplianceScore, ('tenant_id', 'owner', 'score'), self.compliance_scores()
+        yield ComplianceScoreEvent, ('tenant_id', 'owner', 'score', 'recorded_at'), self.compliance_history()
+        yield ShadowIT, ('tenant_id', 'item', 'detected_on'), self.shadow_it()
+
+    def cloud_misconfigurations(self):
+        rng = self.rng('cloud')
+        for tenant in self.tenants:
+            for account in range(1, self.scale + 1):
+                for category in MISCONFIGURATION_CATEGORIES:
+                    yield tenant, f'{category} (account {account})', int(rng.expovariate(1 / 6))
+
+    def package_vetting(self):
+        rng = self.rng('packages')
+        for tenant in self.tenants:
+            for index in range(1, 1000 * self.scale + 1):
+                # Most repositories are clean; a long tail carries most findings.
+                vulnerable = int(rng.paretovariate(2.5)) - 1 if rng.random() < 0.4 else 0
+                violations = 1 if rng.random() < 0.08 else 0
+                yield tenant, f'repo-{index:06d}', vulnerable, violations
+
+    def package_health(self):
+        for tenant in self.tenants:
+            for label, value in PACKAGE_HEALTH:
+                yield tenant, label, value
+
+    def secrets_hygiene(self):
+        rng = self.rng('secrets')
+        for tenant in self.tenants:
+            for date in self.dates():
+                found = rng.randint(0, 5 * self.scale)
+                yield tenant, date, found, rng.randint(0, found)
+
+    def iam_risk(self):
+        rng = self.rng('iam')
+        for tenant in self.tenants:
+            for index in range(1, 200 * self.scale + 1):
+                privileges = rng.choices(PRIVILEGES, weights=(1, 6, 10, 1, 3))[0]
+                yield tenant, f'role-{index:05d}', privileges, rng.random() < 0.85
+
+    def security_anomalies(self):
+        rng = self.rng('anomalies')
+        for tenant in self.tenants:
+            series = [
+                (anomaly_type + (f'#{variant}' if variant else ''), rng.uniform(0.5, 20))
+                for anomaly_type in ANOMALY_TYPES
+                for variant in range(self.scale)
+            ]
+            for date in self.dates():
+                weekend = date.weekday() >= 5
+                for anomaly_type, rate in series:
+                    yield tenant, date, anomaly_type, int(rng.expovariate(1 / (rate * (0.4 if weekend else 1))))
+
+    def compliance_scores(self):
+        rng = self.rng('compliance')
+        for tenant in self.tenants:
+            for index in range(1, 50 * self.scale + 1):
+                yield tenant, f'Team {index:04d}', max(0, min(100, int(rng.gauss(82, 9))))
+
+    def compliance_history(self):
+        # Walk each team's score back from its current value; a team's score
+        # changes on about one day in five.
+        rng = self.rng('compliance-history')
+        dates = list(self.dates())
+        for tenant, owner, score in self.compliance_scores():
+            changes = []
+            for index, date in enumerate(reversed(dates)):
+                if index == 0 or rng.random() < 0.2:
+                    changes.append((date, score))
+                    score = max(0, min(100, score + rng.randint(-4, 4)))
+            for date, value in reversed(changes):
+                recorded_at = datetime.datetime.combine(date, datetime.time(12), tzinfo=datetime.timezone.utc)
+                yield tenant, owner, value, recorded_at
+
+    def shadow_it(self):
+        rng = self.rng('shadow-it')
+        for tenant in self.tenants:
+            for index in range(100 * self.scale):
+                item = SHADOW_IT_ITEMS[index % len(SHADOW_IT_ITEMS)]
+                suffix = f' ({index // len(SHADOW_IT_ITEMS)})' if index >= len(SHADOW_IT_ITEMS) else ''
+                detected = self.end_date - datetime.timedelta(days=rng.randrange(self.days))
+                yield tenant, f'{item}{suffix}', detected
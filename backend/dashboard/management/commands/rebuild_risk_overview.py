@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import overview, tasks
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the materialized risk overview from its source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help='Queue it for run_jobs instead.')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = tasks.rebuild_risk_overview.enqueue()
+            self.stdout.write(self.style.SUCCESS(f'Queued job {job.pk}.'))
+            return
+        rows = overview.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Risk overview rebuilt for {len(rows)} tenant(s): {sum(row.total_issues for row in rows)} issues, '
+            f'{sum(row.high_risk_roles for row in rows)} high-risk roles, '
+            f'{sum(row.exposed_secrets for row in rows)} exposed secrets.'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import search, tasks
+
+
+class Command(BaseCommand):
+    help = 'Recreates the search entries from their source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help='Queue it for run_jobs instead.')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = tasks.rebuild_search_index.enqueue()
+            self.stdout.write(self.style.SUCCESS(f'Queued job {job.pk}.'))
+            return
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt: {count} entries.'))
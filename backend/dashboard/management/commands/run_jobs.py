@@ -0,0 +1,77 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from dashboard import changes, jobs
+
+HOUSEKEEPING_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs queued dashboard jobs until stopped. Start as many workers as needed, '
+        'on one host or several; SIGINT/SIGTERM finish the current job and exit.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Jobs run at once, one thread each.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=getattr(settings, 'DASHBOARD_JOBS_POLL_INTERVAL', 1.0),
+            help='Seconds to wait before polling an empty queue again.',
+        )
+        parser.add_argument('--keep-days', type=int, default=7, help='Days to keep finished jobs.')
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self.stop.set())
+
+        self.housekeeping(options['keep_days'])
+        workers = [
+            threading.Thread(target=self.work, args=(f'{jobs.worker_name()}:{index}', options), daemon=True)
+            for index in range(max(1, options['concurrency']))
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Running jobs with {len(workers)} worker thread(s).')
+
+        last_housekeeping = time.monotonic()
+        while any(worker.is_alive() for worker in workers):
+            self.stop.wait(1)
+            if time.monotonic() - last_housekeeping >= HOUSEKEEPING_INTERVAL:
+                self.housekeeping(options['keep_days'])
+                last_housekeeping = time.monotonic()
+        connection.close()
+
+    def housekeeping(self, keep_days):
+        close_old_connections()
+        recovered = jobs.recover_stale()
+        if recovered:
+            self.stdout.write(self.style.WARNING(f'Requeued {recovered} job(s) with expired leases.'))
+        jobs.purge(keep_days)
+        changes.purge()
+
+    def work(self, worker, options):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = jobs.claim(worker)
+                if job is None:
+                    if options['burst']:
+                        return
+                    self.stop.wait(options['poll_interval'])
+                    continue
+                started = time.perf_counter()
+                outcome = jobs.run(job)
+                self.stdout.write(
+                    f'{job.name} #{job.pk} attempt {job.attempts}: {outcome} '
+                    f'in {time.perf_counter() - started:.2f}s'
+                )
+        finally:
+            connection.close()
@@ -0,0 +1,153 @@
+"""
+Per-request timings and the process-wide metrics behind ``/api/_metrics``.
+
+``PerformanceMiddleware`` opens a ``RequestTimings`` for each request and
+makes it current. Every database query run while it is current is timed
+by ``time_query``, which is installed on each connection as it is created;
+it times ``execute()``, so rows that SQLite produces lazily while they are
+fetched count towards the view instead. Code can add its own phases with
+``measure()``. When there is no current request both cost one
+context-variable lookup.
+
+The registry keeps cumulative counters and latency histograms per route,
+in Prometheus' text format; rates and rolling quantiles come from the
+scraper (``rate()``/``histogram_quantile()``). Each worker process has its
+own registry.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current = ContextVar('dashboard_request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        # Appends are atomic, so queries from fan-out threads can land here.
+        self.queries = []
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def query_seconds(self):
+        return sum(self.queries)
+
+
+@contextmanager
+def measure(phase):
+    timings = current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def time_query(execute, sql, params, many, context):
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries.append(time.perf_counter() - started)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.latency = {}
+        self.counters = {}
+
+    def record(self, route, method, status, timings, total, size):
+        with self.lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get((route, method))
+            if histogram is None:
+                histogram = self.latency[(route, method)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(total)
+            self.increment('dashboard_db_queries_total', route, timings.query_count)
+            self.increment('dashboard_db_seconds_total', route, timings.query_seconds)
+            for phase, seconds in timings.phases.items():
+                self.increment('dashboard_phase_seconds_total', route, seconds, phase=phase)
+            if size is not None:
+                self.increment('dashboard_response_bytes_total', route, size)
+
+    def increment(self, name, route, value, **labels):
+        key = (name, route, *sorted(labels.items()))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def render(self):
+        with self.lock:
+            lines = [
+                '# HELP dashboard_requests_total Requests served, by route, method and status.',
+                '# TYPE dashboard_requests_total counter',
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'dashboard_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+            lines += [
+                '# HELP dashboard_request_duration_seconds Request latency, by route and method.',
+                '# TYPE dashboard_request_duration_seconds histogram',
+            ]
+            for (route, method), histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip((*histogram.buckets, '+Inf'), histogram.counts):
+                    cumulative += count
+                    labels = _labels(route=route, method=method, le=bound)
+                    lines.append(f'dashboard_request_duration_seconds_bucket{labels} {cumulative}')
+                labels = _labels(route=route, method=method)
+                lines.append(f'dashboard_request_duration_seconds_sum{labels} {histogram.sum}')
+                lines.append(f'dashboard_request_duration_seconds_count{labels} {cumulative}')
+
+            previous = None
+            for (name, route, *labels), value in sorted(self.counters.items()):
+                if name != previous:
+                    lines.append(f'# TYPE {name} counter')
+                    previous = name
+                lines.append(f'{name}{_labels(route=route, **dict(labels))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+registry = Registry()
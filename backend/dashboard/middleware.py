@@ -0,0 +1,157 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from . import access, db_router, metrics, tenancy
+from .db_router import read_from_replica, wrote_in_request
+
+logger = logging.getLogger('dashboard.performance')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Lets safe requests read from replicas, and pins a client to the primary
+    for ``DASHBOARD_REPLICA_PIN_SECONDS`` after it writes, so it reads its
+    own writes even while replicas catch up.
+    """
+
+    cookie_name = 'dashboard_pin_primary'
+
+    def process_request(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            pinned_until = 0
+        read_from_replica.set(request.method in SAFE_METHODS and pinned_until < time.time())
+        wrote_in_request.set(False)
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = getattr(settings, 'DASHBOARD_REPLICA_PIN_SECONDS', 5)
+            response.set_cookie(
+                self.cookie_name, str(time.time() + seconds), max_age=seconds, httponly=True, samesite='Lax',
+            )
+        db_router.replicas.report_failures()
+        # Plain sets rather than token resets: under ASGI the two hooks may
+        # run in different contexts.
+        read_from_replica.set(False)
+        wrote_in_request.set(False)
+        return response
+
+
+class TenantMiddleware(MiddlewareMixin):
+    """
+    Makes the tenant named by the ``X-Tenant`` header (by slug; the default
+    tenant without one) current for the request, so the dashboard's
+    managers only see its rows. Unknown tenants get a 404.
+
+    The API has no login of its own, so the header is only believed from
+    the peers in ``DASHBOARD_TENANT_TRUSTED_PROXIES``: the authenticating
+    proxy that sets it after stripping any copy the client sent. From
+    anyone else it gets a 403, rather than letting callers pick a tenant.
+    """
+
+    def process_request(self, request):
+        slug = request.headers.get(tenancy.HEADER)
+        if slug and not access.address_in(request, getattr(settings, 'DASHBOARD_TENANT_TRUSTED_PROXIES', ())):
+            return JsonResponse({'detail': f'{tenancy.HEADER} is only accepted from a trusted proxy.'}, status=403)
+        slug = slug or tenancy.DEFAULT_TENANT_SLUG
+        tenant_id = tenancy.resolve(slug)
+        if tenant_id is None:
+            return JsonResponse({'detail': f'Unknown tenant {slug!r}.'}, status=404)
+        tenancy.current.set(tenant_id)
+
+    def process_response(self, request, response):
+        # A plain set, as in ReplicaRoutingMiddleware.
+        tenancy.current.set(None)
+        return response
+
+
+class PerformanceMiddleware(MiddlewareMixin):
+    """
+    Times each request by phase and reports it three ways: a
+    ``Server-Timing`` header, a structured ``dashboard.performance`` log
+    line (WARNING above ``DASHBOARD_SLOW_REQUEST_MS``, INFO otherwise) and
+    the ``/api/_metrics`` registry.
+
+    Phases: ``resolve`` (earlier middleware and URL resolution), ``view``,
+    ``db`` (all queries, also counted inside ``view``), ``serialize`` where
+    the view measures it, ``render`` and ``total``. Put it first in
+    ``MIDDLEWARE`` so ``total`` covers every other middleware.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DASHBOARD_PERFORMANCE_METRICS', True):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_request(self, request):
+        request._timings = timings = metrics.RequestTimings()
+        metrics.current.set(timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = request._timings
+        timings.view_started = time.perf_counter()
+        timings.add('resolve', timings.view_started - timings.started)
+
+    def process_template_response(self, request, response):
+        timings = request._timings
+        timings.render_started = time.perf_counter()
+        timings.add('view', timings.render_started - timings.view_started)
+        return response
+
+    def process_response(self, request, response):
+        timings = getattr(request, '_timings', None)
+        if timings is None:
+            return response
+        metrics.current.set(None)
+
+        finished = time.perf_counter()
+        if hasattr(timings, 'render_started'):
+            timings.add('render', finished - timings.render_started)
+        elif hasattr(timings, 'view_started'):
+            timings.add('view', finished - timings.view_started)
+        total = finished - timings.started
+        size = None if response.streaming else len(response.content)
+
+        response['Server-Timing'] = self.server_timing(timings, total, size)
+        route = self.route(request)
+        metrics.registry.record(route, request.method, response.status_code, timings, total, size)
+        self.log(request, response, route, timings, total, size)
+        return response
+
+    def route(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else 'unmatched'
+
+    def server_timing(self, timings, total, size):
+        entries = [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in timings.phases.items()]
+        entries.append(f'db;dur={timings.query_seconds * 1000:.2f};desc="{timings.query_count} queries"')
+        if size is not None:
+            entries.append(f'bytes;desc="{size}"')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+    def log(self, request, response, route, timings, total, size):
+        slow = total * 1000 >= getattr(settings, 'DASHBOARD_SLOW_REQUEST_MS', 500)
+        level = logging.WARNING if slow else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            **{f'{phase}_ms': round(seconds * 1000, 2) for phase, seconds in timings.phases.items()},
+            'db_ms': round(timings.query_seconds * 1000, 2),
+            'queries': timings.query_count,
+            'bytes': size,
+        }
+        logger.log(level, ' '.join(f'{name}={value}' for name, value in fields.items()), extra={'performance': fields})
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='secretshygiene',
+            index=models.Index(fields=['date', 'id'], name='secretshygiene_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='securityanomaly',
+            index=models.Index(fields=['date', 'id'], name='anomaly_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='securityanomaly',
+            index=models.Index(fields=['anomaly_type', 'date', 'id'], name='anomaly_type_date_id_idx'),
+        ),
+    ]
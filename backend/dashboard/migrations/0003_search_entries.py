@@ -0,0 +1,112 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:52
+
+import re
+from itertools import islice
+
+from django.db import migrations, models
+
+# Frozen copies of dashboard.search's helpers as of this migration, so
+# later changes to the live tokenizer don't change what it writes.
+BATCH_SIZE = 2000
+
+WORD = re.compile(r'[^\W_]+')
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def terms(text):
+    """``(position, term)`` for the whole value and every later word start."""
+    value = normalize(text)
+    if not value:
+        return
+    yield 0, value
+    starts = [match.start() for match in WORD.finditer(value) if match.start()]
+    for position, start in enumerate(starts, start=1):
+        yield position, value[start:]
+
+
+def stored_terms(text, vendor):
+    """The ``(position, term)`` entries stored for ``text`` on ``vendor``."""
+    if vendor == 'postgresql':
+        # The trigram index reads whole values only.
+        return islice(terms(text), 1)
+    return terms(text)
+
+
+def chunks(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# The indexed fields as of this migration, by model name.
+INDEXED = (
+    ('PackageVetting', 'package-vetting', ('repository',)),
+    ('IamRisk', 'iam-risk-analyzer', ('role', 'privileges')),
+    ('ShadowIT', 'shadow-it', ('item',)),
+    ('ComplianceScore', 'compliance-score', ('owner',)),
+    ('CloudMisconfiguration', 'cloud-misconfigurations', ('category',)),
+)
+
+
+def create_term_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX searchentry_term_trgm_idx ON dashboard_searchentry '
+            'USING gist (term gist_trgm_ops) WHERE position = 0'
+        )
+    else:
+        schema_editor.execute('CREATE INDEX searchentry_term_idx ON dashboard_searchentry (term)')
+
+
+def drop_term_index(apps, schema_editor):
+    name = 'searchentry_term_trgm_idx' if schema_editor.connection.vendor == 'postgresql' else 'searchentry_term_idx'
+    schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def index_existing_rows(apps, schema_editor):
+    SearchEntry = apps.get_model('dashboard', 'SearchEntry')
+    vendor = schema_editor.connection.vendor
+    for model_name, resource, fields in INDEXED:
+        model = apps.get_model('dashboard', model_name)
+        entries = (
+            SearchEntry(
+                resource=resource, object_id=instance.pk, field=field,
+                text=getattr(instance, field), term=term, position=position,
+            )
+            for instance in model.objects.only('pk', *fields).iterator()
+            for field in fields
+            for position, term in stored_terms(getattr(instance, field), vendor)
+        )
+        for chunk in chunks(entries):
+            SearchEntry.objects.bulk_create(chunk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_timeseries_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('field', models.CharField(max_length=100)),
+                ('text', models.CharField(max_length=100)),
+                ('term', models.CharField(max_length=100)),
+                ('position', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resource', 'object_id'], name='searchentry_object_idx')],
+            },
+        ),
+        migrations.RunPython(create_term_index, drop_term_index),
+        migrations.RunPython(index_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:54
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+# The natural keys made unique below, with the search resource (migration
+# 0003) of the models whose rows are indexed.
+NATURAL_KEYS = (
+    ('CloudMisconfiguration', 'category', 'cloud-misconfigurations'),
+    ('ComplianceScore', 'owner', 'compliance-score'),
+    ('IamRisk', 'role', 'iam-risk-analyzer'),
+    ('PackageHealth', 'label', None),
+    ('PackageVetting', 'repository', 'package-vetting'),
+    ('ShadowIT', 'item', 'shadow-it'),
+)
+
+
+def drop_duplicates(apps, schema_editor):
+    """Keep only the newest row (the highest id) of each natural key."""
+    SearchEntry = apps.get_model('dashboard', 'SearchEntry')
+    for model_name, field, resource in NATURAL_KEYS:
+        model = apps.get_model('dashboard', model_name)
+        duplicated = (
+            model.objects.values(field).annotate(copies=Count('pk'), newest=Max('pk'))
+            .filter(copies__gt=1).values_list(field, 'newest')
+        )
+        for value, newest in list(duplicated):
+            pks = list(model.objects.filter(**{field: value}).exclude(pk=newest).values_list('pk', flat=True))
+            # _raw_delete skips the collector and the dashboard's delete receivers.
+            doomed = model.objects.filter(pk__in=pks)
+            doomed._raw_delete(doomed.db)
+            if resource:
+                entries = SearchEntry.objects.filter(resource=resource, object_id__in=pks)
+                entries._raw_delete(entries.db)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_search_entries'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cloudmisconfiguration',
+            name='category',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='compliancescore',
+            name='owner',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='iamrisk',
+            name='role',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='packagehealth',
+            name='label',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='packagevetting',
+            name='repository',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='shadowit',
+            name='item',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='shadowit',
+            index=models.Index(fields=['detected_on', 'id'], name='shadowit_detected_on_id_idx'),
+        ),
+    ]
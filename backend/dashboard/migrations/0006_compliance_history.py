@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:01
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def record_current_scores(apps, schema_editor):
+    ComplianceScore = apps.get_model('dashboard', 'ComplianceScore')
+    ComplianceScoreEvent = apps.get_model('dashboard', 'ComplianceScoreEvent')
+    now = timezone.now()
+    ComplianceScoreEvent.objects.bulk_create(
+        (
+            ComplianceScoreEvent(owner=owner, score=score, recorded_at=now)
+            for owner, score in ComplianceScore.objects.values_list('owner', 'score').iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceScoreEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=100)),
+                ('score', models.IntegerField(null=True)),
+                ('recorded_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recorded_at', 'id'], name='compliance_event_time_idx'), models.Index(fields=['owner', 'recorded_at'], name='compliance_event_owner_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ComplianceScoreSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('owner', models.CharField(max_length=100)),
+                ('score', models.IntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('taken_at', 'owner'), name='compliance_snapshot_owner')],
+            },
+        ),
+        migrations.RunPython(record_current_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,259 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:13
+
+import dashboard.tenancy
+import django.db.models.deletion
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def create_default_tenant(apps, schema_editor):
+    # Existing rows are assigned to it by the column default below.
+    Tenant = apps.get_model('dashboard', 'Tenant')
+    Tenant.objects.create(
+        pk=dashboard.tenancy.DEFAULT_TENANT_ID, slug=dashboard.tenancy.DEFAULT_TENANT_SLUG, name='Default',
+    )
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Tenant]):
+            cursor.execute(sql)
+
+
+def drop_term_index(apps, schema_editor):
+    # Migration 0003's term index, replaced by one led by the tenant at the
+    # end. SQLite would drop it anyway while rebuilding the table below.
+    name = 'searchentry_term_trgm_idx' if schema_editor.connection.vendor == 'postgresql' else 'searchentry_term_idx'
+    schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def restore_term_index(apps, schema_editor):
+    # Runs once the tenant column is gone, so SQLite's rebuild can't drop it.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX searchentry_term_trgm_idx ON dashboard_searchentry '
+            'USING gist (term gist_trgm_ops) WHERE position = 0'
+        )
+    else:
+        schema_editor.execute('CREATE INDEX searchentry_term_idx ON dashboard_searchentry (term)')
+
+
+def create_tenant_term_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        schema_editor.execute(
+            'CREATE INDEX searchentry_tenant_term_trgm_idx ON dashboard_searchentry '
+            'USING gist (tenant_id, term gist_trgm_ops) WHERE position = 0'
+        )
+    else:
+        schema_editor.execute('CREATE INDEX searchentry_tenant_term_idx ON dashboard_searchentry (tenant_id, term)')
+
+
+def drop_tenant_term_index(apps, schema_editor):
+    name = (
+        'searchentry_tenant_term_trgm_idx' if schema_editor.connection.vendor == 'postgresql'
+        else 'searchentry_tenant_term_idx'
+    )
+    schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_compliance_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.RunPython(create_default_tenant, migrations.RunPython.noop),
+        migrations.RunPython(drop_term_index, restore_term_index),
+        migrations.RemoveConstraint(
+            model_name='compliancescoresnapshot',
+            name='compliance_snapshot_owner',
+        ),
+        migrations.RemoveIndex(
+            model_name='compliancescoreevent',
+            name='compliance_event_time_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='compliancescoreevent',
+            name='compliance_event_owner_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='secretshygiene',
+            name='secretshygiene_date_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='securityanomaly',
+            name='anomaly_date_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='securityanomaly',
+            name='anomaly_type_date_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='shadowit',
+            name='shadowit_detected_on_id_idx',
+        ),
+        migrations.AlterField(
+            model_name='cloudmisconfiguration',
+            name='category',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='compliancescore',
+            name='owner',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='iamrisk',
+            name='role',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='packagehealth',
+            name='label',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='packagevetting',
+            name='repository',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='shadowit',
+            name='item',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddField(
+            model_name='cloudmisconfiguration',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='compliancescore',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='compliancescoreevent',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='compliancescoresnapshot',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='iamrisk',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='packagehealth',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='packagevetting',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='riskoverview',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='searchentry',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='secretshygiene',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='securityanomaly',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddField(
+            model_name='shadowit',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='compliancescoreevent',
+            index=models.Index(fields=['tenant', 'recorded_at', 'id'], name='compliance_tenant_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compliancescoreevent',
+            index=models.Index(fields=['tenant', 'owner', 'recorded_at'], name='compliance_tenant_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['tenant', 'id'], name='job_tenant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='secretshygiene',
+            index=models.Index(fields=['tenant', 'date', 'id'], name='secretshygiene_tenant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='securityanomaly',
+            index=models.Index(fields=['tenant', 'date', 'id'], name='anomaly_tenant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='securityanomaly',
+            index=models.Index(fields=['tenant', 'anomaly_type', 'date', 'id'], name='anomaly_tenant_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shadowit',
+            index=models.Index(fields=['tenant', 'detected_on', 'id'], name='shadowit_tenant_detected_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cloudmisconfiguration',
+            constraint=models.UniqueConstraint(fields=('tenant', 'category'), name='cloudmisconfiguration_tenant_category'),
+        ),
+        migrations.AddConstraint(
+            model_name='compliancescore',
+            constraint=models.UniqueConstraint(fields=('tenant', 'owner'), name='compliancescore_tenant_owner'),
+        ),
+        migrations.AddConstraint(
+            model_name='compliancescoresnapshot',
+            constraint=models.UniqueConstraint(fields=('tenant', 'taken_at', 'owner'), name='compliance_snapshot_tenant_owner'),
+        ),
+        migrations.AddConstraint(
+            model_name='iamrisk',
+            constraint=models.UniqueConstraint(fields=('tenant', 'role'), name='iamrisk_tenant_role'),
+        ),
+        migrations.AddConstraint(
+            model_name='packagehealth',
+            constraint=models.UniqueConstraint(fields=('tenant', 'label'), name='packagehealth_tenant_label'),
+        ),
+        migrations.AddConstraint(
+            model_name='packagevetting',
+            constraint=models.UniqueConstraint(fields=('tenant', 'repository'), name='packagevetting_tenant_repository'),
+        ),
+        migrations.AddConstraint(
+            model_name='riskoverview',
+            constraint=models.UniqueConstraint(fields=('tenant',), name='riskoverview_tenant'),
+        ),
+        migrations.AddConstraint(
+            model_name='shadowit',
+            constraint=models.UniqueConstraint(fields=('tenant', 'item'), name='shadowit_tenant_item'),
+        ),
+        migrations.RunPython(create_tenant_term_index, drop_tenant_term_index),
+    ]
@@ -0,0 +1,154 @@
+"""
+Partitions the time-series tables by month on PostgreSQL; a no-op elsewhere.
+
+Each table is renamed aside, recreated as a partitioned table and its rows
+copied over in one statement, inside the migration's transaction. The
+table stays locked (ACCESS EXCLUSIVE, from the rename) until the migration
+commits, so reads and writes of the secrets hygiene and anomaly endpoints
+wait for the whole copy: roughly the time of a full table rewrite plus
+rebuilding its indexes. On large tables run it in a maintenance window,
+or compact (``compact_timeseries``) first to shrink what is copied.
+
+The helpers are frozen copies of what ``dashboard.partitions`` had when
+this migration was written, so later changes there can't change it.
+"""
+import datetime
+
+from django.db import migrations
+
+# Table name: partition column. Their primary keys become (id, column),
+# since PostgreSQL requires unique constraints to include the partition key.
+PARTITIONED = {
+    'dashboard_secretshygiene': 'date',
+    'dashboard_securityanomaly': 'date',
+}
+MONTHS_AHEAD = 3
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(month):
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def months(first, last):
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def _indexes(cursor, table):
+    cursor.execute(
+        'SELECT pg_get_indexdef(indexrelid), indexrelid::regclass::text FROM pg_index '
+        'WHERE indrelid = %s::regclass AND NOT indisprimary',
+        [table],
+    )
+    # A partitioned parent's indexes read back as "ON ONLY"; recreate them
+    # as ordinary definitions.
+    return [(definition.replace(' ON ONLY ', ' ON '), name) for definition, name in cursor.fetchall()]
+
+
+def _foreign_keys(cursor, table):
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def rebuild(cursor, table, partitioned):
+    """
+    Recreate ``table`` as a partitioned (or, reversing, a plain) table with
+    the same columns, indexes and foreign keys, and copy its rows over.
+    """
+    column = PARTITIONED[table]
+    old = f'{table}_old'
+    indexes = _indexes(cursor, table)
+    foreign_keys = _foreign_keys(cursor, table)
+    cursor.execute(
+        "SELECT attidentity <> '' FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'", [table],
+    )
+    identity = cursor.fetchone()[0]
+    cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, 'id'])
+    sequence = cursor.fetchone()[0]
+
+    cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [old],
+    )
+    (primary_key,) = cursor.fetchone()
+    cursor.execute(f'ALTER TABLE "{old}" RENAME CONSTRAINT "{primary_key}" TO "{primary_key}_old"')
+    for _, name in indexes:
+        cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name}_old"')
+
+    including = 'INCLUDING DEFAULTS INCLUDING CONSTRAINTS' + (' INCLUDING IDENTITY' if identity else '')
+    if partitioned:
+        cursor.execute(f'CREATE TABLE "{table}" (LIKE "{old}" {including}) PARTITION BY RANGE ("{column}")')
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{primary_key}" PRIMARY KEY (id, "{column}")')
+        cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+        cursor.execute(f'SELECT min("{column}"), max("{column}") FROM "{old}"')
+        first, last = cursor.fetchone()
+        today = datetime.date.today()
+        first = min(first or today, today)
+        last = max(last or today, today)
+        for month in months(first, month_start(last + datetime.timedelta(days=31 * MONTHS_AHEAD))):
+            cursor.execute(
+                f'CREATE TABLE "{partition_name(table, month)}" PARTITION OF "{table}" '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month, next_month(month)],
+            )
+    else:
+        cursor.execute(f'CREATE TABLE "{table}" (LIKE "{old}" {including})')
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{primary_key}" PRIMARY KEY (id)')
+    cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    # Built once over the copied rows, which is faster than maintaining
+    # them row by row during the copy.
+    for definition, _ in indexes:
+        cursor.execute(definition)
+
+    if identity:
+        cursor.execute(
+            f'SELECT setval(pg_get_serial_sequence(%s, %s), coalesce(max(id), 0) + 1, false) FROM "{table}"',
+            [table, 'id'],
+        )
+    elif sequence:
+        # A serial column's sequence belongs to the old table; keep it.
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id')
+    cursor.execute(f'DROP TABLE "{old}"')
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in PARTITIONED:
+            rebuild(cursor, table, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in PARTITIONED:
+            rebuild(cursor, table, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_tenants'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
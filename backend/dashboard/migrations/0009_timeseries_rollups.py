@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:19
+
+import dashboard.tenancy
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_partition_timeseries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecretsHygieneRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('start', models.DateField()),
+                ('samples', models.PositiveIntegerField()),
+                ('secrets_found', models.IntegerField()),
+                ('secrets_found_max', models.IntegerField()),
+                ('secrets_rotated', models.IntegerField()),
+                ('secrets_rotated_max', models.IntegerField()),
+                ('exposed', models.IntegerField()),
+                ('tenant', models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'start', 'period'), name='secretsrollup_tenant_start')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SecurityAnomalyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('start', models.DateField()),
+                ('samples', models.PositiveIntegerField()),
+                ('anomaly_type', models.CharField(max_length=100)),
+                ('count', models.IntegerField()),
+                ('count_max', models.IntegerField()),
+                ('tenant', models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'start'], name='anomalyrollup_tenant_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'anomaly_type', 'start', 'period'), name='anomalyrollup_tenant_type_start')],
+            },
+        ),
+    ]
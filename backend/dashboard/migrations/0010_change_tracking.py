@@ -0,0 +1,111 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:27
+
+import dashboard.tenancy
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_timeseries_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cloudmisconfiguration',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddField(
+            model_name='compliancescore',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddField(
+            model_name='iamrisk',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddField(
+            model_name='packagehealth',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddField(
+            model_name='packagevetting',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddField(
+            model_name='riskoverview',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddField(
+            model_name='secretshygiene',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddField(
+            model_name='securityanomaly',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddField(
+            model_name='shadowit',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddIndex(
+            model_name='cloudmisconfiguration',
+            index=models.Index(fields=['tenant', 'updated_at'], name='cloudmisconfig_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compliancescore',
+            index=models.Index(fields=['tenant', 'updated_at'], name='compliancescore_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iamrisk',
+            index=models.Index(fields=['tenant', 'updated_at'], name='iamrisk_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagehealth',
+            index=models.Index(fields=['tenant', 'updated_at'], name='packagehealth_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagevetting',
+            index=models.Index(fields=['tenant', 'updated_at'], name='packagevetting_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='secretshygiene',
+            index=models.Index(fields=['tenant', 'updated_at'], name='secretshygiene_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='securityanomaly',
+            index=models.Index(fields=['tenant', 'updated_at'], name='anomaly_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shadowit',
+            index=models.Index(fields=['tenant', 'updated_at'], name='shadowit_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=dashboard.tenancy.current_tenant_id, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['tenant', 'deleted_at'], name='tombstone_tenant_deleted_idx'),
+        ),
+    ]
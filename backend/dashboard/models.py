@@ -1,42 +1,261 @@
 from django.db import models
+from django.db.models.functions import Now
 
-class RiskOverview(models.Model):
+from .tenancy import TenantManager, current_tenant_id
+
+class Tenant(models.Model):
+    slug = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+
+class TenantModel(models.Model):
+    """A row owned by one tenant; see ``dashboard.tenancy``."""
+    # Each table's own indexes lead with the tenant, so the column needs none.
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.CASCADE, default=current_tenant_id, db_index=False, related_name='+',
+    )
+
+    objects = TenantManager()
+
+    class Meta:
+        abstract = True
+
+class TrackedModel(TenantModel):
+    """A row served by ``/api/changes/``; see ``dashboard.changes``."""
+    # The database default covers raw inserts (populate_db's COPY).
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+    class Meta:
+        abstract = True
+
+class RiskOverview(TrackedModel):
     total_issues = models.IntegerField()
     high_risk_roles = models.IntegerField()
     exposed_secrets = models.IntegerField()
 
-class CloudMisconfiguration(models.Model):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant'], name='riskoverview_tenant'),
+        ]
+
+class CloudMisconfiguration(TrackedModel):
     category = models.CharField(max_length=100)
     value = models.IntegerField()
 
-class PackageVetting(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at'], name='cloudmisconfig_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'category'], name='cloudmisconfiguration_tenant_category'),
+        ]
+
+class PackageVetting(TrackedModel):
     repository = models.CharField(max_length=100)
     vulnerable_packages = models.IntegerField()
     license_violations = models.IntegerField()
 
-class PackageHealth(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at'], name='packagevetting_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'repository'], name='packagevetting_tenant_repository'),
+        ]
+
+class PackageHealth(TrackedModel):
     label = models.CharField(max_length=100)
     value = models.IntegerField()
 
-class SecretsHygiene(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at'], name='packagehealth_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'label'], name='packagehealth_tenant_label'),
+        ]
+
+class SecretsHygiene(TrackedModel):
     date = models.DateField()
     secrets_found = models.IntegerField()
     secrets_rotated = models.IntegerField()
 
-class IamRisk(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'date', 'id'], name='secretshygiene_tenant_date_idx'),
+            models.Index(fields=['tenant', 'updated_at'], name='secretshygiene_updated_idx'),
+        ]
+
+class IamRisk(TrackedModel):
     role = models.CharField(max_length=100)
     privileges = models.CharField(max_length=100)
     mfa_enabled = models.BooleanField()
 
-class SecurityAnomaly(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at'], name='iamrisk_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'role'], name='iamrisk_tenant_role'),
+        ]
+
+class SecurityAnomaly(TrackedModel):
     date = models.DateField()
     anomaly_type = models.CharField(max_length=100)
     count = models.IntegerField()
 
-class ComplianceScore(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'date', 'id'], name='anomaly_tenant_date_idx'),
+            models.Index(fields=['tenant', 'anomaly_type', 'date', 'id'], name='anomaly_tenant_type_date_idx'),
+            models.Index(fields=['tenant', 'updated_at'], name='anomaly_updated_idx'),
+        ]
+
+class ComplianceScore(TrackedModel):
     owner = models.CharField(max_length=100)
     score = models.IntegerField()
 
-class ShadowIT(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at'], name='compliancescore_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'owner'], name='compliancescore_tenant_owner'),
+        ]
+
+class ShadowIT(TrackedModel):
     item = models.CharField(max_length=100)
     detected_on = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'detected_on', 'id'], name='shadowit_tenant_detected_idx'),
+            models.Index(fields=['tenant', 'updated_at'], name='shadowit_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'item'], name='shadowit_tenant_item'),
+        ]
+
+class SearchEntry(TenantModel):
+    resource = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=100)
+    text = models.CharField(max_length=100)
+    term = models.CharField(max_length=100)
+    position = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'object_id'], name='searchentry_object_idx'),
+        ]
+
+class Job(TenantModel):
+    """A queued task (see ``dashboard.jobs``), owned by the tenant that queued it."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=dict)
+    dedup_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True)
+    result = models.JSONField(null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+            models.Index(fields=['tenant', 'id'], name='job_tenant_idx'),
+        ]
+        constraints = [
+            # At most one queued job per task and arguments.
+            models.UniqueConstraint(
+                fields=['dedup_key'], condition=models.Q(status='queued'), name='job_queued_dedup_key',
+            ),
+        ]
+
+class ComplianceScoreEvent(TenantModel):
+    owner = models.CharField(max_length=100)
+    # None records that the owner's score was removed.
+    score = models.IntegerField(null=True)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'recorded_at', 'id'], name='compliance_tenant_time_idx'),
+            models.Index(fields=['tenant', 'owner', 'recorded_at'], name='compliance_tenant_owner_idx'),
+        ]
+
+class ComplianceScoreSnapshot(TenantModel):
+    taken_at = models.DateTimeField()
+    owner = models.CharField(max_length=100)
+    score = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'taken_at', 'owner'], name='compliance_snapshot_tenant_owner'),
+        ]
+
+class TimeSeriesRollup(TenantModel):
+    """
+    Raw time-series rows folded together by ``dashboard.compaction``: each
+    value field holds the sum, and ``<field>_max`` the maximum, over the
+    ``samples`` raw rows of the period starting on ``start``.
+    """
+    WEEK = 'week'
+    MONTH = 'month'
+    PERIOD_CHOICES = [(WEEK, 'Week'), (MONTH, 'Month')]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    start = models.DateField()
+    samples = models.PositiveIntegerField()
+
+    class Meta:
+        abstract = True
+
+class SecretsHygieneRollup(TimeSeriesRollup):
+    secrets_found = models.IntegerField()
+    secrets_found_max = models.IntegerField()
+    secrets_rotated = models.IntegerField()
+    secrets_rotated_max = models.IntegerField()
+    # Sum of each raw row's unrotated secrets, for the risk overview.
+    exposed = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'start', 'period'], name='secretsrollup_tenant_start'),
+        ]
+
+class SecurityAnomalyRollup(TimeSeriesRollup):
+    anomaly_type = models.CharField(max_length=100)
+    count = models.IntegerField()
+    count_max = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'start'], name='anomalyrollup_tenant_start_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant', 'anomaly_type', 'start', 'period'], name='anomalyrollup_tenant_type_start',
+            ),
+        ]
+
+class Tombstone(TenantModel):
+    """A deleted row of a tracked model, for ``/api/changes/``; see ``dashboard.changes``."""
+    resource = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'deleted_at'], name='tombstone_tenant_deleted_idx'),
+        ]
@@ -0,0 +1,141 @@
+"""
+Incremental maintenance of the materialized ``RiskOverview`` rows, one per
+tenant.
+
+Every source model contributes a fixed amount to each overview counter.
+Writes go through ``apply_delta`` with the difference between a row's
+contribution before and after the write, so reading the overview stays a
+single-row lookup no matter how large the source tables grow. A row only
+counts towards its own tenant's overview. Paths that
+bypass model signals (``bulk_create``, ``QuerySet.update``) must either
+apply their own delta or call ``rebuild``.
+"""
+from django.db import connection, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import caching, tenancy
+from .models import (
+    RiskOverview,
+    CloudMisconfiguration,
+    PackageVetting,
+    SecretsHygiene,
+    SecretsHygieneRollup,
+    IamRisk,
+)
+
+FIELDS = ('total_issues', 'high_risk_roles', 'exposed_secrets')
+
+
+def _iam_risk(instance):
+    high_risk = 0 if instance.mfa_enabled else 1
+    return {'total_issues': high_risk, 'high_risk_roles': high_risk, 'exposed_secrets': 0}
+
+
+def _secrets_hygiene(instance):
+    exposed = max(instance.secrets_found - instance.secrets_rotated, 0)
+    return {'total_issues': exposed, 'high_risk_roles': 0, 'exposed_secrets': exposed}
+
+
+def _cloud_misconfiguration(instance):
+    return {'total_issues': instance.value, 'high_risk_roles': 0, 'exposed_secrets': 0}
+
+
+def _package_vetting(instance):
+    issues = instance.vulnerable_packages + instance.license_violations
+    return {'total_issues': issues, 'high_risk_roles': 0, 'exposed_secrets': 0}
+
+
+SOURCES = {
+    IamRisk: _iam_risk,
+    SecretsHygiene: _secrets_hygiene,
+    CloudMisconfiguration: _cloud_misconfiguration,
+    PackageVetting: _package_vetting,
+}
+
+EMPTY = dict.fromkeys(FIELDS, 0)
+
+
+def contribution(instance):
+    return SOURCES[type(instance)](instance)
+
+
+def difference(after, before):
+    return {field: after[field] - before[field] for field in FIELDS}
+
+
+def totals(instances):
+    """The summed contribution of ``instances``, by tenant id."""
+    result = {}
+    for instance in instances:
+        tenant_total = result.setdefault(instance.tenant_id, dict(EMPTY))
+        for field, value in contribution(instance).items():
+            tenant_total[field] += value
+    return result
+
+
+def apply_delta(delta, tenant_id):
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+    updated = RiskOverview._base_manager.filter(tenant_id=tenant_id).update(
+        updated_at=timezone.now(), **{field: F(field) + value for field, value in delta.items()}
+    )
+    if not updated:
+        schedule_rebuild(tenant_id)
+        return
+    caching.bump_version_on_commit(RiskOverview)
+
+
+class _Rebuild:
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+
+    def __call__(self):
+        rebuild_tenant(self.tenant_id)
+
+
+def schedule_rebuild(tenant_id):
+    """
+    Recompute ``tenant_id``'s overview once the current transaction commits.
+
+    A missing row can't absorb a delta, and rebuilding immediately would
+    double-count writes whose signals haven't fired yet (a bulk delete sends
+    ``post_delete`` only after every row is gone), so the rebuild waits for
+    the commit and is queued at most once per tenant and transaction.
+    """
+    if any(isinstance(func, _Rebuild) and func.tenant_id == tenant_id for _, func, _ in connection.run_on_commit):
+        return
+    transaction.on_commit(_Rebuild(tenant_id))
+
+
+def compute():
+    """Derive the current tenant's counters from scratch with one aggregate per source."""
+    high_risk_roles = IamRisk.objects.filter(mfa_enabled=False).count()
+    exposed_secrets = SecretsHygiene.objects.aggregate(
+        total=Sum(Greatest(F('secrets_found') - F('secrets_rotated'), Value(0)))
+    )['total'] or 0
+    # Rows folded away by dashboard.compaction.
+    exposed_secrets += SecretsHygieneRollup.objects.aggregate(total=Sum('exposed'))['total'] or 0
+    misconfigurations = CloudMisconfiguration.objects.aggregate(total=Sum('value'))['total'] or 0
+    package_issues = PackageVetting.objects.aggregate(
+        total=Sum(F('vulnerable_packages') + F('license_violations'))
+    )['total'] or 0
+    return {
+        'total_issues': high_risk_roles + exposed_secrets + misconfigurations + package_issues,
+        'high_risk_roles': high_risk_roles,
+        'exposed_secrets': exposed_secrets,
+    }
+
+
+def rebuild_tenant(tenant_id):
+    with tenancy.use_tenant(tenant_id), transaction.atomic():
+        overview, _ = RiskOverview.objects.update_or_create(tenant_id=tenant_id, defaults=compute())
+        caching.bump_version_on_commit(RiskOverview)
+    return overview
+
+
+def rebuild():
+    """Rebuild every tenant's overview; returns the rows."""
+    return [rebuild_tenant(tenant_id) for tenant_id in tenancy.tenant_ids()]
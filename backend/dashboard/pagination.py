@@ -0,0 +1,115 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek-based pagination over a two-column ordering such as ``(date, id)``.
+
+    Each page is fetched with ``WHERE (date, id) > (last_date, last_id)`` so
+    the cost of a request depends on the page size, not on how deep into the
+    table the client has paged.
+    """
+
+    ordering = ('date', 'id')
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request, view)))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """The lazy queryset for the requested page, with one look-ahead row."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        first, second = self.ordering
+
+        queryset = queryset.order_by(first, second)
+        position = self.decode_cursor(request)
+        if position is not None:
+            value, pk = position
+            try:
+                value = queryset.model._meta.get_field(first).to_python(value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            # The redundant range bound lets the planner seek the index
+            # instead of evaluating the OR for every row.
+            queryset = queryset.filter(**{f'{first}__gte': value}).filter(
+                Q(**{f'{first}__gt': value}) | Q(**{first: value, f'{second}__gt': pk})
+            )
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        """Trim the fetched rows to the page and remember where it ended."""
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        first, second = self.ordering
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(
+            self._value(self.last, first), self._value(self.last, second)
+        ))
+
+    def encode_cursor(self, value, pk):
+        raw = json.dumps([str(value), pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            value, pk = json.loads(raw)
+            return value, int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _value(row, field):
+        if isinstance(row, dict):
+            return row[field]
+        return getattr(row, field)
+
+
+class JobPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 100
@@ -0,0 +1,115 @@
+"""
+Monthly range partitions for the time-series tables on PostgreSQL.
+
+Migration 0008 turns the tables in ``PARTITIONED`` into tables partitioned
+by month of their date column, with a ``DEFAULT`` partition for rows
+outside every month. The model's tenant-leading indexes are declared on
+the parent, so every partition carries them: a tenant's date-range query
+is pruned to the months it covers and reads only that tenant's entries in
+each. A month is removed by dropping its partition, with no ``DELETE`` and
+no vacuum debt. ``manage.py partition_timeseries`` creates months ahead of
+time and drops old ones.
+
+Other databases keep plain tables; ``is_partitioned`` tells them apart.
+"""
+import datetime
+
+from django.db import connection, transaction
+
+# Table name: partition column. Their primary keys become (id, column),
+# since PostgreSQL requires unique constraints to include the partition key.
+PARTITIONED = {
+    'dashboard_secretshygiene': 'date',
+    'dashboard_securityanomaly': 'date',
+}
+MONTHS_AHEAD = 3
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(month):
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def months(first, last):
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def is_partitioned(table, using=connection):
+    if using.vendor != 'postgresql':
+        return False
+    with using.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+        return cursor.fetchone() is not None
+
+
+def partitions(cursor, table):
+    """``{month: name}`` of ``table``'s monthly partitions."""
+    cursor.execute(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE pg_inherits.inhparent = %s::regclass',
+        [table],
+    )
+    prefix = f'{table}_p'
+    result = {}
+    for (name,) in cursor.fetchall():
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            result[datetime.date(int(suffix[:4]), int(suffix[4:]), 1)] = name
+    return result
+
+
+def create_partition(cursor, table, month):
+    """
+    Add ``month``'s partition, moving its rows out of the default partition
+    first: attaching a range that the default partition still holds rows
+    for is an error.
+    """
+    column = PARTITIONED[table]
+    name = f'"{partition_name(table, month)}"'
+    bounds = [month, next_month(month)]
+    cursor.execute(f'CREATE TABLE {name} (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{table}_default" WHERE "{column}" >= %s AND "{column}" < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        bounds,
+    )
+    cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', bounds)
+
+
+def ensure(table, first, last, using=connection):
+    """Create the missing monthly partitions of ``table`` from ``first`` to ``last``; returns their names."""
+    created = []
+    with transaction.atomic(using=using), using.cursor() as cursor:
+        existing = partitions(cursor, table)
+        for month in months(first, last):
+            if month not in existing:
+                create_partition(cursor, table, month)
+                created.append(partition_name(table, month))
+    return created
+
+
+def drop_before(table, month, using=connection, before_drop=None):
+    """
+    Drop ``table``'s partitions for months before ``month``; returns their
+    names. ``before_drop(cursor, name)`` is called first for each one.
+    """
+    dropped = []
+    with transaction.atomic(using=using), using.cursor() as cursor:
+        for start, name in sorted(partitions(cursor, table).items()):
+            if start < month:
+                if before_drop is not None:
+                    before_drop(cursor, name)
+                cursor.execute(f'DROP TABLE "{name}"')
+                dropped.append(name)
+    return dropped
@@ -0,0 +1,77 @@
+"""
+Response renderers for the dashboard API, chosen by the ``Accept`` header.
+
+* ``application/json`` (default): the usual payload, encoded with orjson
+  when it is installed. The bytes match DRF's ``JSONRenderer``, including
+  its escaping of U+2028 and U+2029, except that orjson spells exponents
+  without a plus sign or leading zero (``1e16``, not ``1e+16``) and writes
+  NaN and infinities as ``null`` where DRF would fail.
+* ``application/vnd.safeside.columnar+json``: every list of rows becomes
+  one array per field, so keys are sent once instead of once per row.
+* ``application/msgpack``: the usual payload as MessagePack; only offered
+  when ``msgpack`` is installed.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Dates and times go through DRF's encoder so their format doesn't change.
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+# orjson writes these raw; DRF escapes them so the JSON is valid JavaScript.
+LINE_SEPARATORS = (('\u2028'.encode(), b'\\u2028'), ('\u2029'.encode(), b'\\u2029'))
+
+
+def columnar(data):
+    """Turn lists of rows, at the top level or one level down, into columns."""
+    if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+        columns = dict.fromkeys(key for row in data for key in row)
+        return {column: [row.get(column) for row in data] for column in columns}
+    if isinstance(data, dict):
+        return {
+            key: columnar(value) if isinstance(value, list) else value
+            for key, value in data.items()
+        }
+    return data
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        for raw, escaped in LINE_SEPARATORS:
+            content = content.replace(raw, escaped)
+        return content
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    media_type = 'application/vnd.safeside.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(columnar(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
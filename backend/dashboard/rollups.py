@@ -0,0 +1,109 @@
+import operator
+
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from rest_framework.exceptions import ValidationError
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+AGGREGATES = {
+    'sum': Sum,
+    'max': Max,
+}
+
+COMBINE = {
+    'sum': operator.add,
+    'max': max,
+}
+
+
+def parse_rollup_params(query_params):
+    bucket = query_params.get('bucket', 'day')
+    agg = query_params.get('agg', 'sum')
+    errors = {}
+    if bucket not in BUCKETS:
+        errors['bucket'] = f"Expected one of: {', '.join(BUCKETS)}."
+    if agg not in AGGREGATES:
+        errors['agg'] = f"Expected one of: {', '.join(AGGREGATES)}."
+    if errors:
+        raise ValidationError(errors)
+    return bucket, agg
+
+
+def grouped(queryset, bucket, date_field, group_by, aggregates):
+    return (
+        queryset
+        .order_by()
+        .annotate(bucket=BUCKETS[bucket](date_field))
+        .values(*group_by)
+        .annotate(**aggregates)
+        .order_by(*group_by)
+    )
+
+
+def combine(rows, more, group_by, value_fields, agg):
+    """Merge two sets of grouped rows, ordered by group."""
+    merged = {tuple(row[key] for key in group_by): row for row in rows}
+    for row in more:
+        current = merged.setdefault(tuple(row[key] for key in group_by), row)
+        if current is not row:
+            for field in value_fields:
+                current[field] = COMBINE[agg](current[field], row[field])
+    return [merged[key] for key in sorted(merged)]
+
+
+def rollup(queryset, bucket, agg, value_fields, date_field='date', series_field=None, compacted=None):
+    """
+    Aggregate ``queryset`` into time buckets with a single ``GROUP BY`` query.
+
+    The result is columnar: one ``timestamps`` array and, under ``series``,
+    one array per value field aligned with it. When ``series_field`` is given
+    each distinct value of that column becomes its own series (only the first
+    of ``value_fields`` is used) and buckets without rows for it hold 0.
+
+    ``compacted`` is a queryset of the matching rollup rows (see
+    ``dashboard.compaction``); they are bucketed by their ``start`` and
+    merged in, summing their sums and taking the larger of their maxima.
+    """
+    aggregate = AGGREGATES[agg]
+    group_by = ['bucket'] + ([series_field] if series_field else [])
+    rows = grouped(queryset, bucket, date_field, group_by, {field: aggregate(field) for field in value_fields})
+    if compacted is not None:
+        source = '{}' if agg == 'sum' else '{}_max'
+        folded = grouped(
+            compacted, bucket, 'start', group_by,
+            {field: aggregate(source.format(field)) for field in value_fields},
+        )
+        rows = combine(rows, folded, group_by, value_fields, agg)
+
+    timestamps = []
+    series = {}
+    if series_field is None:
+        series = {field: [] for field in value_fields}
+        for row in rows:
+            timestamps.append(row['bucket'].isoformat())
+            for field in value_fields:
+                series[field].append(row[field])
+    else:
+        field = value_fields[0]
+        positions = {}
+        cells = []
+        for row in rows:
+            stamp = row['bucket'].isoformat()
+            if stamp not in positions:
+                positions[stamp] = len(timestamps)
+                timestamps.append(stamp)
+            cells.append((positions[stamp], row[series_field], row[field]))
+        for index, name, value in cells:
+            series.setdefault(name, [0] * len(timestamps))[index] = value
+
+    return {
+        'bucket': bucket,
+        'agg': agg,
+        'timestamps': timestamps,
+        'series': series,
+    }
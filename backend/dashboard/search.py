@@ -0,0 +1,176 @@
+"""
+Search over the named entities of the dashboard.
+
+Every indexed field value is stored in ``SearchEntry``, lowercased. A
+search is then a lookup against a vendor-specific index created by
+migration 0007, led by the tenant so a search only reads the current
+tenant's entries:
+
+* PostgreSQL: a trigram GiST index over the whole values (``position``
+  0), read in word-similarity order, so typos and substrings match too.
+  Only the whole value is stored.
+* Other databases: a B-tree over ``(tenant, term)``, read as a range scan
+  of the terms starting with the query. A value is stored once per word
+  start: ``acme/repo-000123`` under the terms ``acme/repo-000123``,
+  ``repo-000123`` and ``000123``.
+
+Both return a bounded candidate window, which is ranked here. Entries are
+kept up to date by ``dashboard.signals``; ``rebuild()`` recreates them all.
+"""
+import re
+from itertools import islice
+
+from django.db import connection, transaction
+
+from .models import (
+    CloudMisconfiguration,
+    ComplianceScore,
+    IamRisk,
+    PackageVetting,
+    SearchEntry,
+    ShadowIT,
+)
+
+INDEXED = {
+    PackageVetting: ('package-vetting', ('repository',)),
+    IamRisk: ('iam-risk-analyzer', ('role', 'privileges')),
+    ShadowIT: ('shadow-it', ('item',)),
+    ComplianceScore: ('compliance-score', ('owner',)),
+    CloudMisconfiguration: ('cloud-misconfigurations', ('category',)),
+}
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Candidates read from the index per requested result.
+CANDIDATE_FACTOR = 5
+# Word-similarity distance beyond which trigram candidates are dropped.
+MAX_DISTANCE = 0.7
+BATCH_SIZE = 2000
+
+MATCHES = ('exact', 'prefix', 'word', 'similar')
+
+WORD = re.compile(r'[^\W_]+')
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def terms(text):
+    """``(position, term)`` for the whole value and every later word start."""
+    value = normalize(text)
+    if not value:
+        return
+    yield 0, value
+    starts = [match.start() for match in WORD.finditer(value) if match.start()]
+    for position, start in enumerate(starts, start=1):
+        yield position, value[start:]
+
+
+def stored_terms(text):
+    """The ``(position, term)`` entries stored for ``text`` on this database."""
+    if connection.vendor == 'postgresql':
+        # The trigram index reads whole values only.
+        return islice(terms(text), 1)
+    return terms(text)
+
+
+def entries(model, instances):
+    resource, fields = INDEXED[model]
+    for instance in instances:
+        for field in fields:
+            text = getattr(instance, field) or ''
+            for position, term in stored_terms(text):
+                yield SearchEntry(
+                    tenant_id=instance.tenant_id, resource=resource, object_id=instance.pk, field=field,
+                    text=text, term=term, position=position,
+                )
+
+
+def chunks(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def index(model, instances):
+    SearchEntry.objects.bulk_create(entries(model, instances), batch_size=BATCH_SIZE)
+
+
+def unindex(model, pks):
+    resource, _ = INDEXED[model]
+    for chunk in chunks(pks):
+        # _raw_delete skips the collector: dashboard-wide delete receivers
+        # would otherwise load and signal every entry one by one.
+        queryset = SearchEntry.objects.filter(resource=resource, object_id__in=chunk)
+        queryset._raw_delete(queryset.db)
+
+
+def reindex(model, instances):
+    instances = list(instances)
+    unindex(model, [instance.pk for instance in instances])
+    index(model, instances)
+
+
+def rebuild():
+    """Recreate every tenant's entries from the source tables; returns the entry count."""
+    with transaction.atomic():
+        SearchEntry._base_manager.all()._raw_delete(SearchEntry.objects.db)
+        for model, (_, fields) in INDEXED.items():
+            rows = model._base_manager.only('pk', 'tenant', *fields).order_by().iterator(chunk_size=BATCH_SIZE)
+            for chunk in chunks(rows):
+                index(model, chunk)
+    return SearchEntry._base_manager.count()
+
+
+def candidates(query, count):
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordDistance
+
+        return (
+            SearchEntry.objects.filter(position=0)
+            .annotate(distance=TrigramWordDistance(query, 'term'))
+            .filter(distance__lte=MAX_DISTANCE)
+            .order_by('distance')
+            .values('resource', 'object_id', 'field', 'text', 'distance')[:count]
+        )
+    # chr(0x10FFFF) sorts after every character, bounding the prefix range.
+    return (
+        SearchEntry.objects.filter(term__gte=query, term__lt=query + chr(0x10FFFF))
+        .order_by('term')
+        .values('resource', 'object_id', 'field', 'text')[:count]
+    )
+
+
+def classify(text, query):
+    value = normalize(text)
+    if value == query:
+        return 'exact'
+    if value.startswith(query):
+        return 'prefix'
+    if any(term.startswith(query) for _, term in terms(text)):
+        return 'word'
+    return 'similar'
+
+
+def search(query, limit=DEFAULT_LIMIT):
+    """The ``limit`` best matches for ``query``, best first."""
+    query = normalize(query)
+    ranked = {}
+    for row in candidates(query, limit * CANDIDATE_FACTOR):
+        key = (row['resource'], row['object_id'], row['field'])
+        if key in ranked:
+            continue
+        match = classify(row['text'], query)
+        ranked[key] = (
+            (MATCHES.index(match), row.get('distance', 0), len(row['text']), row['text']),
+            {
+                'resource': row['resource'],
+                'id': row['object_id'],
+                'field': row['field'],
+                'text': row['text'],
+                'match': match,
+            },
+        )
+    return [result for _, result in sorted(ranked.values(), key=lambda item: item[0])[:limit]]
@@ -1,4 +1,6 @@
+from django.db.models import UniqueConstraint
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from .models import (
     RiskOverview,
     CloudMisconfiguration,
@@ -9,49 +11,86 @@ from .models import (
     SecurityAnomaly,
     ComplianceScore,
     ShadowIT,
+    Job,
 )
 
-class RiskOverviewSerializer(serializers.ModelSerializer):
+def unique_per_tenant(model):
+    """Fields that ``model`` keeps unique within each tenant."""
+    return {
+        constraint.fields[1]
+        for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.condition is None
+        and len(constraint.fields) == 2 and constraint.fields[0] == 'tenant'
+    }
+
+class TenantModelSerializer(serializers.ModelSerializer):
+    """
+    The tenant comes from the request, so it is neither shown nor accepted,
+    and fields unique per tenant are checked against the current tenant's
+    rows (serializers are built per request, inside its tenant).
+    """
+
+    def build_standard_field(self, field_name, model_field):
+        field_class, field_kwargs = super().build_standard_field(field_name, model_field)
+        if field_name in unique_per_tenant(self.Meta.model):
+            validator = UniqueValidator(queryset=self.Meta.model._default_manager.all())
+            field_kwargs['validators'] = [*field_kwargs.get('validators', []), validator]
+        return field_class, field_kwargs
+
+class RiskOverviewSerializer(TenantModelSerializer):
     class Meta:
         model = RiskOverview
-        fields = '__all__'
+        exclude = ['tenant']
 
-class CloudMisconfigurationSerializer(serializers.ModelSerializer):
+class CloudMisconfigurationSerializer(TenantModelSerializer):
     class Meta:
         model = CloudMisconfiguration
-        fields = '__all__'
+        exclude = ['tenant']
 
-class PackageVettingSerializer(serializers.ModelSerializer):
+class PackageVettingSerializer(TenantModelSerializer):
     class Meta:
         model = PackageVetting
-        fields = '__all__'
+        exclude = ['tenant']
 
-class PackageHealthSerializer(serializers.ModelSerializer):
+class PackageHealthSerializer(TenantModelSerializer):
     class Meta:
         model = PackageHealth
-        fields = '__all__'
+        exclude = ['tenant']
 
-class SecretsHygieneSerializer(serializers.ModelSerializer):
+class SecretsHygieneSerializer(TenantModelSerializer):
     class Meta:
         model = SecretsHygiene
-        fields = '__all__'
+        exclude = ['tenant']
 
-class IamRiskSerializer(serializers.ModelSerializer):
+class IamRiskSerializer(TenantModelSerializer):
     class Meta:
         model = IamRisk
-        fields = '__all__'
+        exclude = ['tenant']
 
-class SecurityAnomalySerializer(serializers.ModelSerializer):
+class SecurityAnomalySerializer(TenantModelSerializer):
     class Meta:
         model = SecurityAnomaly
-        fields = '__all__'
+        exclude = ['tenant']
 
-class ComplianceScoreSerializer(serializers.ModelSerializer):
+class ComplianceScoreSerializer(TenantModelSerializer):
     class Meta:
         model = ComplianceScore
-        fields = '__all__'
+        exclude = ['tenant']
 
-class ShadowITSerializer(serializers.ModelSerializer):
+class ShadowITSerializer(TenantModelSerializer):
     class Meta:
         model = ShadowIT
-        fields = '__all__'
+        exclude = ['tenant']
+
+class JobSerializer(serializers.ModelSerializer):
+    # The last line of the traceback: the full one stays in the database and
+    # the worker's log, and the arguments can hold whole request bodies.
+    error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        exclude = ['tenant', 'args', 'dedup_key', 'last_error']
+
+    def get_error(self, job):
+        lines = [line for line in job.last_error.splitlines() if line.strip()]
+        return lines[-1].strip()[:200] if lines else ''
@@ -0,0 +1,168 @@
+from itertools import chain
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal
+
+from . import caching, changes, events, history, metrics, overview, search, tenancy
+from .models import ComplianceScore, Tenant
+
+# Sent inside the writing transaction by bulk paths that bypass per-row model
+# signals, with the ``created`` and ``updated`` instances and ``previous``
+# copies of the updated rows as they were before the write.
+bulk_written = Signal()
+
+
+def deleting_tenant(origin):
+    """True when ``origin``, a ``post_delete`` origin, is a tenant whose rows cascade."""
+    return isinstance(origin, Tenant) or getattr(origin, 'model', None) is Tenant
+
+
+def bump_cache_version(sender, raw=False, **kwargs):
+    if raw or sender._meta.app_label != 'dashboard':
+        return
+    caching.bump_version_on_commit(sender)
+
+
+def remember_risk_contribution(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        instance._risk_contribution = overview.EMPTY
+        return
+    previous = sender._default_manager.filter(pk=instance.pk).first()
+    instance._risk_contribution = overview.contribution(previous) if previous else overview.EMPTY
+
+
+def apply_risk_contribution(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_risk_contribution', overview.EMPTY)
+    after = overview.contribution(instance)
+    overview.apply_delta(overview.difference(after, before), instance.tenant_id)
+    instance._risk_contribution = after
+
+
+def withdraw_risk_contribution(sender, instance, origin=None, **kwargs):
+    # The tenant's overview goes with it; a rebuild would recreate it.
+    if deleting_tenant(origin):
+        return
+    overview.apply_delta(overview.difference(overview.EMPTY, overview.contribution(instance)), instance.tenant_id)
+
+
+def publish_created_event(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        events.publish_on_commit([instance])
+
+
+def publish_bulk_created_events(sender, created=(), **kwargs):
+    if sender in events.STREAMS:
+        events.publish_on_commit(created)
+
+
+def apply_bulk_risk_contribution(sender, created=(), updated=(), previous=(), **kwargs):
+    if sender not in overview.SOURCES:
+        return
+    after = overview.totals(chain(created, updated))
+    before = overview.totals(previous)
+    for tenant_id in after.keys() | before.keys():
+        overview.apply_delta(
+            overview.difference(after.get(tenant_id, overview.EMPTY), before.get(tenant_id, overview.EMPTY)),
+            tenant_id,
+        )
+
+
+def update_search_entries(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        search.index(sender, [instance])
+    else:
+        search.reindex(sender, [instance])
+
+
+def remove_search_entries(sender, instance, **kwargs):
+    search.unindex(sender, [instance.pk])
+
+
+def update_bulk_search_entries(sender, created=(), updated=(), **kwargs):
+    if sender not in search.INDEXED:
+        return
+    search.unindex(sender, [instance.pk for instance in updated])
+    search.index(sender, chain(created, updated))
+
+
+def remember_compliance_owner(sender, instance, raw=False, **kwargs):
+    previous = None
+    if not raw and not instance._state.adding and instance.pk is not None:
+        previous = sender._default_manager.filter(pk=instance.pk).values_list('owner', flat=True).first()
+    instance._previous_owner = previous
+
+
+def record_compliance_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changes = [(instance.tenant_id, instance.owner, instance.score)]
+    previous = getattr(instance, '_previous_owner', None)
+    if previous is not None and previous != instance.owner:
+        changes.insert(0, (instance.tenant_id, previous, None))
+    history.record(changes)
+    instance._previous_owner = instance.owner
+
+
+def record_compliance_removal(sender, instance, origin=None, **kwargs):
+    if deleting_tenant(origin):
+        return
+    history.record([(instance.tenant_id, instance.owner, None)])
+
+
+def record_bulk_compliance_changes(sender, created=(), updated=(), **kwargs):
+    if sender is ComplianceScore:
+        history.record(
+            (instance.tenant_id, instance.owner, instance.score) for instance in chain(created, updated)
+        )
+
+
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    # A deleted tenant takes its tombstones with it.
+    if deleting_tenant(origin):
+        return
+    changes.bury(sender, [instance])
+
+
+def forget_tenants(sender, **kwargs):
+    tenancy.forget()
+
+
+def bump_bulk_cache_version(sender, **kwargs):
+    caching.bump_version_on_commit(sender)
+
+
+for model in overview.SOURCES:
+    pre_save.connect(remember_risk_contribution, sender=model, dispatch_uid=f'risk-before-{model.__name__}')
+    post_save.connect(apply_risk_contribution, sender=model, dispatch_uid=f'risk-after-{model.__name__}')
+    post_delete.connect(withdraw_risk_contribution, sender=model, dispatch_uid=f'risk-delete-{model.__name__}')
+
+for model in events.STREAMS:
+    post_save.connect(publish_created_event, sender=model, dispatch_uid=f'events-{model.__name__}')
+
+for model in search.INDEXED:
+    post_save.connect(update_search_entries, sender=model, dispatch_uid=f'search-{model.__name__}')
+    post_delete.connect(remove_search_entries, sender=model, dispatch_uid=f'search-delete-{model.__name__}')
+
+pre_save.connect(remember_compliance_owner, sender=ComplianceScore, dispatch_uid='compliance-history-before')
+post_save.connect(record_compliance_change, sender=ComplianceScore, dispatch_uid='compliance-history')
+post_delete.connect(record_compliance_removal, sender=ComplianceScore, dispatch_uid='compliance-history-delete')
+bulk_written.connect(record_bulk_compliance_changes, dispatch_uid='compliance-history-bulk')
+
+for model in changes.TRACKED:
+    post_delete.connect(record_tombstone, sender=model, dispatch_uid=f'tombstone-{model.__name__}')
+
+post_save.connect(forget_tenants, sender=Tenant, dispatch_uid='tenants-save')
+post_delete.connect(forget_tenants, sender=Tenant, dispatch_uid='tenants-delete')
+
+post_save.connect(bump_cache_version, dispatch_uid='dashboard-cache-save')
+post_delete.connect(bump_cache_version, dispatch_uid='dashboard-cache-delete')
+bulk_written.connect(apply_bulk_risk_contribution, dispatch_uid='risk-bulk')
+bulk_written.connect(bump_bulk_cache_version, dispatch_uid='dashboard-cache-bulk')
+bulk_written.connect(publish_bulk_created_events, dispatch_uid='events-bulk')
+bulk_written.connect(update_bulk_search_entries, dispatch_uid='search-bulk')
+connection_created.connect(metrics.install_query_timer, dispatch_uid='dashboard-query-timer')
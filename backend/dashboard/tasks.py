@@ -0,0 +1,56 @@
+"""Work that runs in ``manage.py run_jobs`` instead of on a request thread."""
+from django.utils.module_loading import import_string
+
+from . import compaction, history, overview, search, tenancy
+from .jobs import task
+
+
+@task
+def rebuild_risk_overview():
+    rows = overview.rebuild()
+    return {
+        'tenants': len(rows),
+        'total_issues': sum(row.total_issues for row in rows),
+        'high_risk_roles': sum(row.high_risk_roles for row in rows),
+        'exposed_secrets': sum(row.exposed_secrets for row in rows),
+    }
+
+
+@task
+def rebuild_search_index():
+    return {'entries': search.rebuild()}
+
+
+@task
+def compact_compliance_history():
+    taken_at = history.compact()
+    return {'taken_at': taken_at}
+
+
+@task
+def compact_timeseries(batch_size=compaction.BATCH_SIZE, weekly_days=None, monthly_days=None, retain_days=None):
+    weekly_before, monthly_before = compaction.horizons(weekly_days=weekly_days, monthly_days=monthly_days)
+    expire_before = compaction.retention_horizon(retain_days=retain_days)
+    result = compaction.compact(weekly_before, monthly_before, expire_before, batch_size)
+    if any(expired for _, _, expired in result.values()):
+        overview.rebuild()
+    return {
+        model._meta.model_name: {'compacted': compacted, 'promoted': promoted, 'expired': expired}
+        for model, (compacted, promoted, expired) in result.items()
+    }
+
+
+@task
+def bulk_upsert(viewset, items, batch_size, tenant=tenancy.DEFAULT_TENANT_ID):
+    """
+    Run a ``?background=1`` bulk upsert for the viewset at dotted path
+    ``viewset``, as tenant id ``tenant``. Invalid items end up in the
+    result, not in a retry; other failures are retried, which is safe
+    because the writes are upserts.
+    """
+    view = import_string(viewset)()
+    view.request = None
+    view.format_kwarg = None
+    view.action = 'bulk'
+    with tenancy.use_tenant(tenant):
+        return view.ingest(items, batch_size)
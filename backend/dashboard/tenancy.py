@@ -0,0 +1,78 @@
+"""
+Tenant scoping for the dashboard tables.
+
+Every dashboard row belongs to a ``Tenant``. ``TenantMiddleware`` resolves
+the request's tenant from the ``X-Tenant`` header, which only trusted
+proxies may send (the default tenant when it is absent), and makes it
+current; while a tenant is current, the default manager of every
+tenant-owned model returns only that tenant's rows, and new instances are
+assigned to it. Every table's indexes lead with the
+tenant, so scoped queries read only that tenant's part of the index.
+
+Outside a request (management commands, ``run_jobs``) no tenant is current:
+managers see every tenant and new rows go to the default tenant, unless
+the code enters ``use_tenant()``.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models
+
+HEADER = 'X-Tenant'
+# Created by migration 0007 with a fixed id, so it can be a column default.
+DEFAULT_TENANT_ID = 1
+DEFAULT_TENANT_SLUG = 'default'
+
+current = ContextVar('dashboard_tenant', default=None)
+
+_ids = {}
+
+
+def current_tenant_id():
+    """The current tenant's id, or the default tenant's when none is current."""
+    tenant_id = current.get()
+    return DEFAULT_TENANT_ID if tenant_id is None else tenant_id
+
+
+@contextmanager
+def use_tenant(tenant_id):
+    token = current.set(tenant_id)
+    try:
+        yield
+    finally:
+        current.reset(token)
+
+
+def resolve(slug):
+    """The id of the tenant named ``slug``, or None if there is none."""
+    tenant_id = _ids.get(slug)
+    if tenant_id is None:
+        from .models import Tenant
+
+        tenant_id = Tenant.objects.filter(slug=slug).values_list('pk', flat=True).first()
+        if tenant_id is not None:
+            _ids[slug] = tenant_id
+    return tenant_id
+
+
+def forget():
+    """Drop the cached slug lookups, after tenants change."""
+    _ids.clear()
+
+
+def tenant_ids():
+    from .models import Tenant
+
+    return list(Tenant.objects.order_by('pk').values_list('pk', flat=True))
+
+
+def public_fields(model):
+    """``model``'s concrete fields without the tenant, which the API never exposes."""
+    return [field for field in model._meta.concrete_fields if field.name != 'tenant']
+
+
+class TenantManager(models.Manager):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tenant_id = current.get()
+        return queryset if tenant_id is None else queryset.filter(tenant_id=tenant_id)
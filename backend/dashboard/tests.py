@@ -1,3 +1,1445 @@
-from django.test import TestCase
+import csv
+import datetime
+import decimal
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from . import (
+    async_views,
+    caching,
+    changes,
+    coalescing,
+    compaction,
+    db_router,
+    events,
+    history,
+    jobs,
+    metrics,
+    overview,
+    renderers,
+    search,
+    tenancy,
+    throttling,
+)
+from .encoders import FastListMixin, get_encoder
+from .management.commands.benchmark_api import DEFAULT_BASELINE, get_routes
+from .middleware import ReplicaRoutingMiddleware
+from .models import (
+    CloudMisconfiguration,
+    ComplianceScore,
+    IamRisk,
+    Job,
+    PackageVetting,
+    RiskOverview,
+    SearchEntry,
+    SecretsHygiene,
+    SecretsHygieneRollup,
+    SecurityAnomaly,
+    SecurityAnomalyRollup,
+    ShadowIT,
+    Tenant,
+    Tombstone,
+)
+from .urls import router
+from .views import IamRiskViewSet
+
+END_DATE = datetime.date(2024, 12, 31)
+SINCE = END_DATE - datetime.timedelta(days=30)
+
+# A full table scan: "Seq Scan" on PostgreSQL, "SCAN <table>" without an
+# index on SQLite.
+FULL_SCAN = re.compile(r'Seq Scan|\bSCAN dashboard_\w+$', re.MULTILINE)
+
+
+class QueryPlanTests(TestCase):
+    """The hot API queries are answered from an index at a realistic scale."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'populate_db', scale=3, days=365, seed=0, end_date=END_DATE, stdout=io.StringIO(),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        # As under TenantMiddleware: every API query is scoped to a tenant.
+        token = tenancy.current.set(tenancy.DEFAULT_TENANT_ID)
+        self.addCleanup(tenancy.current.reset, token)
+        if connection.vendor == 'postgresql':
+            # Tables this small can be cheaper to scan; make the planner
+            # show whether an index can serve the query at all.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index=None):
+        plan = queryset.explain()
+        self.assertNotRegex(plan, FULL_SCAN)
+        if index is not None:
+            self.assertIn(index, plan)
+
+    def test_secrets_keyset_page(self):
+        queryset = SecretsHygiene.objects.filter(date__gte=SINCE).order_by('date', 'id')[:101]
+        self.assertUsesIndex(queryset, 'secretshygiene_tenant_date_idx')
+
+    def test_anomalies_keyset_page(self):
+        queryset = SecurityAnomaly.objects.filter(date__gte=SINCE).order_by('date', 'id')[:101]
+        self.assertUsesIndex(queryset, 'anomaly_tenant_date_idx')
+
+    def test_anomalies_by_type(self):
+        queryset = SecurityAnomaly.objects.filter(
+            anomaly_type='brute-force', date__gte=SINCE,
+        ).order_by('date', 'id')[:101]
+        self.assertUsesIndex(queryset, 'anomaly_tenant_type_date_idx')
+
+    def test_shadow_it_by_detection_date(self):
+        queryset = ShadowIT.objects.filter(detected_on__gte=SINCE)
+        self.assertUsesIndex(queryset, 'shadowit_tenant_detected_idx')
+
+    def test_upsert_natural_key_lookup(self):
+        keys = [f'repo-{index:06d}' for index in range(1, 51)]
+        self.assertUsesIndex(PackageVetting.objects.filter(repository__in=keys))
+
+    def test_search_candidates(self):
+        index = (
+            'searchentry_tenant_term_trgm_idx' if connection.vendor == 'postgresql' else 'searchentry_tenant_term_idx'
+        )
+        self.assertUsesIndex(search.candidates('repo-0001', 100), index)
+
+    def test_changes_poll(self):
+        since = timezone.now()
+        queryset = PackageVetting.objects.filter(updated_at__gt=since).order_by('updated_at', 'id')
+        self.assertUsesIndex(queryset, 'packagevetting_updated_idx')
+        self.assertUsesIndex(Tombstone.objects.filter(deleted_at__gt=since), 'tombstone_tenant_deleted_idx')
+
+
+@override_settings(DASHBOARD_THROTTLE_RATES={})
+class QueryCountTests(TestCase):
+    """No route issues more queries than benchmarks/baseline.json records for the default fixtures."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_db', stdout=io.StringIO())
+
+    def test_routes_within_baseline(self):
+        baseline = json.loads(DEFAULT_BASELINE.read_text())['scales']['0']
+        for name, path in get_routes():
+            # The async snapshot queries on its own connections, which can't
+            # see this test's uncommitted fixtures.
+            if name.startswith('async-'):
+                continue
+            if callable(path):
+                path = path()
+                if path is None:
+                    continue
+            with self.subTest(route=name):
+                caching.get_cache().clear()
+                with CaptureQueriesContext(connection) as captured:
+                    response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(captured), baseline[name]['queries'])
+
+
+@override_settings(DASHBOARD_THROTTLE_RATES={})
+class DashboardAPITestCase(APITestCase):
+    """Starts every test with an empty response cache and no rate limits."""
+
+    def setUp(self):
+        caching.get_cache().clear()
+
+
+class KeysetPaginationTests(DashboardAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        days = [END_DATE - datetime.timedelta(days=offset) for offset in (2, 0, 1, 0, 2)]
+        cls.rows = [
+            SecretsHygiene.objects.create(date=day, secrets_found=index, secrets_rotated=0)
+            for index, day in enumerate(days)
+        ]
+
+    def test_pages_follow_date_then_id(self):
+        seen = []
+        url = '/api/secrets-hygiene/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        expected = sorted(self.rows, key=lambda row: (row.date, row.id))
+        self.assertEqual(seen, [row.id for row in expected])
+
+    def test_date_range(self):
+        response = self.client.get('/api/secrets-hygiene/', {'since': END_DATE.isoformat()})
+        self.assertEqual({row['date'] for row in response.data['results']}, {END_DATE.isoformat()})
+        self.assertIsNone(response.data['next'])
+
+    def test_bad_date_range(self):
+        response = self.client.get('/api/secrets-hygiene/', {'until': '31/12/2024'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_cursors(self):
+        for cursor in ('not base64!', 'WyJub3QtYS1kYXRlIiwgMV0', 'WzFd'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/secrets-hygiene/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class RollupTests(DashboardAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for day, anomaly_type, count in [
+            ('2024-12-23', 'login', 3),
+            ('2024-12-30', 'login', 2),
+            ('2024-12-31', 'login', 5),
+            ('2024-12-31', 'scan', 4),
+        ]:
+            SecurityAnomaly.objects.create(
+                date=datetime.date.fromisoformat(day), anomaly_type=anomaly_type, count=count,
+            )
+        for day, found, rotated in [('2024-12-30', 4, 1), ('2024-12-31', 6, 6)]:
+            SecretsHygiene.objects.create(
+                date=datetime.date.fromisoformat(day), secrets_found=found, secrets_rotated=rotated,
+            )
+
+    def test_weekly_sums_per_series(self):
+        response = self.client.get('/api/security-anomalies/rollup/', {'bucket': 'week'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['timestamps'], ['2024-12-23', '2024-12-30'])
+        self.assertEqual(response.data['series'], {'login': [3, 7], 'scan': [0, 4]})
+
+    def test_maximum(self):
+        response = self.client.get('/api/security-anomalies/rollup/', {'bucket': 'week', 'agg': 'max'})
+        self.assertEqual(response.data['series'], {'login': [3, 5], 'scan': [0, 4]})
+
+    def test_filters_apply(self):
+        response = self.client.get(
+            '/api/security-anomalies/rollup/', {'bucket': 'month', 'anomaly_type': 'scan', 'since': '2024-12-24'},
+        )
+        self.assertEqual(response.data['timestamps'], ['2024-12-01'])
+        self.assertEqual(response.data['series'], {'scan': [4]})
+
+    def test_one_series_per_field(self):
+        response = self.client.get('/api/secrets-hygiene/rollup/')
+        self.assertEqual(response.data['timestamps'], ['2024-12-30', '2024-12-31'])
+        self.assertEqual(response.data['series'], {'secrets_found': [4, 6], 'secrets_rotated': [1, 6]})
+
+    def test_bad_parameters(self):
+        response = self.client.get('/api/security-anomalies/rollup/', {'bucket': 'hour', 'agg': 'avg'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'bucket', 'agg'})
+
+
+class RiskOverviewTests(DashboardAPITestCase):
+    """Every write moves the overview by its delta, to what a rebuild would compute."""
+
+    @classmethod
+    def setUpTestData(cls):
+        IamRisk.objects.create(role='admin', privileges='all', mfa_enabled=False)
+        CloudMisconfiguration.objects.create(category='open-buckets', value=3)
+        cls.secrets = SecretsHygiene.objects.create(date=END_DATE, secrets_found=5, secrets_rotated=2)
+        overview.rebuild_tenant(tenancy.DEFAULT_TENANT_ID)
+
+    def assertOverview(self, total_issues, high_risk_roles, exposed_secrets):
+        expected = {
+            'total_issues': total_issues, 'high_risk_roles': high_risk_roles, 'exposed_secrets': exposed_secrets,
+        }
+        row = RiskOverview.objects.values(*overview.FIELDS).get()
+        self.assertEqual(row, expected)
+        self.assertEqual(overview.compute(), expected)
+        [served] = self.client.get('/api/risk-overview/').data
+        self.assertEqual({field: served[field] for field in overview.FIELDS}, expected)
+
+    def test_rebuilt(self):
+        self.assertOverview(7, 1, 3)
+
+    def test_create(self):
+        self.client.get('/api/risk-overview/')
+        with self.captureOnCommitCallbacks(execute=True):
+            IamRisk.objects.create(role='deployer', privileges='write', mfa_enabled=False)
+            PackageVetting.objects.create(repository='repo-1', vulnerable_packages=2, license_violations=1)
+        self.assertOverview(11, 2, 3)
+
+    def test_update(self):
+        self.client.get('/api/risk-overview/')
+        self.secrets.secrets_rotated = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            self.secrets.save()
+            IamRisk.objects.filter(role='admin').get().delete()
+        self.assertOverview(3, 0, 0)
+
+    def test_update_through_api(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/secrets-hygiene/{self.secrets.pk}/', {'secrets_found': 9})
+        self.assertEqual(response.status_code, 200)
+        self.assertOverview(11, 1, 7)
+
+
+class ResponseCacheTests(DashboardAPITestCase):
+    url = '/api/cloud-misconfigurations/'
+
+    @classmethod
+    def setUpTestData(cls):
+        CloudMisconfiguration.objects.create(category='open-buckets', value=3)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_not_modified_when_first_rendered(self):
+        etag = self.client.get(self.url)['ETag']
+        caching.get_cache().clear()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_write_bumps_version(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'category': 'public-ips', 'value': 1})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual({row['category'] for row in response.data}, {'open-buckets', 'public-ips'})
+
+    def test_etag_per_media_type(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(
+            self.url, HTTP_ACCEPT='application/vnd.safeside.columnar+json', HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Accept', response['Vary'])
+
+
+class BulkUpsertTests(DashboardAPITestCase):
+    url = '/api/package-vetting/bulk/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.existing = PackageVetting.objects.create(repository='repo-1', vulnerable_packages=1, license_violations=0)
+        overview.rebuild_tenant(tenancy.DEFAULT_TENANT_ID)
+
+    def test_counts(self):
+        items = [
+            {'repository': 'repo-1', 'vulnerable_packages': 4, 'license_violations': 1},
+            {'repository': 'repo-2', 'vulnerable_packages': 0, 'license_violations': 2},
+            {'repository': 'repo-3', 'vulnerable_packages': 3, 'license_violations': 0},
+        ]
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'created': 2, 'updated': 1})
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.vulnerable_packages, self.existing.license_violations), (4, 1))
+        self.assertEqual(PackageVetting.objects.count(), 3)
+        self.assertEqual(RiskOverview.objects.get().total_issues, 10)
+
+    def test_ndjson(self):
+        body = (
+            '{"repository": "repo-1", "vulnerable_packages": 2, "license_violations": 0}\n'
+            '\n'
+            '{"repository": "repo-2", "vulnerable_packages": 0, "license_violations": 0}\n'
+        )
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.data, {'created': 1, 'updated': 1})
+
+    def test_repeated_key_is_written_once(self):
+        items = [
+            {'repository': 'repo-2', 'vulnerable_packages': 1, 'license_violations': 0},
+            {'repository': 'repo-2', 'vulnerable_packages': 5, 'license_violations': 0},
+        ]
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.data, {'created': 1, 'updated': 0})
+        self.assertEqual(PackageVetting.objects.get(repository='repo-2').vulnerable_packages, 5)
+
+    def test_invalid_batch_stops_the_upload(self):
+        items = [
+            {'repository': 'repo-2', 'vulnerable_packages': 1, 'license_violations': 0},
+            {'repository': 'repo-3', 'vulnerable_packages': 'many', 'license_violations': 0},
+            {'repository': 'repo-4', 'vulnerable_packages': 1, 'license_violations': 0},
+        ]
+        response = self.client.post(f'{self.url}?batch_size=1', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(list(response.data['errors']), [1])
+        self.assertEqual(
+            set(PackageVetting.objects.values_list('repository', flat=True)), {'repo-1', 'repo-2'},
+        )
+
+    def test_update_keeps_the_row(self):
+        before = self.existing.updated_at
+        items = [{'repository': 'repo-1', 'vulnerable_packages': 2, 'license_violations': 0}]
+        self.client.post(self.url, items, format='json')
+        row = PackageVetting.objects.get(repository='repo-1')
+        self.assertEqual(row.pk, self.existing.pk)
+        self.assertGreater(row.updated_at, before)
+
+    def test_not_a_list(self):
+        for body in ('{"repository": "repo-2"}', 'null', '5', '"repo-2"'):
+            with self.subTest(body=body):
+                response = self.client.post(self.url, body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+
+class SearchTests(DashboardAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for repository in ('tools/acme', 'acme-web', 'acme', 'globex'):
+            PackageVetting.objects.create(repository=repository, vulnerable_packages=0, license_violations=0)
+        IamRisk.objects.create(role='acmeadmin', privileges='read', mfa_enabled=True)
+        acme = Tenant.objects.create(slug='acme', name='Acme')
+        with tenancy.use_tenant(acme.pk):
+            PackageVetting.objects.create(repository='acme-secret', vulnerable_packages=0, license_violations=0)
+
+    def found(self, query, tenant_id=tenancy.DEFAULT_TENANT_ID):
+        with tenancy.use_tenant(tenant_id):
+            return [(result['text'], result['match']) for result in search.search(query)]
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.found('ACME'),
+            [('acme', 'exact'), ('acme-web', 'prefix'), ('acmeadmin', 'prefix'), ('tools/acme', 'word')],
+        )
+
+    def test_only_the_current_tenant(self):
+        self.assertNotIn('acme-secret', [text for text, _ in self.found('acme')])
+        self.assertEqual(self.found('acme', Tenant.objects.get(slug='acme').pk), [('acme-secret', 'prefix')])
+
+    def test_index_follows_saves_and_deletes(self):
+        row = PackageVetting.objects.get(repository='globex')
+        row.repository = 'initech'
+        row.save()
+        self.assertEqual(self.found('globex'), [])
+        self.assertEqual(self.found('init'), [('initech', 'prefix')])
+        row.delete()
+        self.assertEqual(self.found('init'), [])
+
+    def test_index_follows_bulk_upserts(self):
+        items = [
+            {'repository': 'globex', 'vulnerable_packages': 1, 'license_violations': 0},
+            {'repository': 'globex-api', 'vulnerable_packages': 0, 'license_violations': 0},
+        ]
+        self.client.post('/api/package-vetting/bulk/', items, format='json')
+        self.assertEqual(self.found('globex'), [('globex', 'exact'), ('globex-api', 'prefix')])
+
+    def test_rebuild(self):
+        expected = self.found('acme')
+        SearchEntry.objects.all().delete()
+        self.assertEqual(self.found('acme'), [])
+        self.assertEqual(search.rebuild(), SearchEntry._base_manager.count())
+        self.assertEqual(self.found('acme'), expected)
+
+    def test_api(self):
+        response = self.client.get('/api/search/', {'q': 'acme', 'limit': 1})
+        self.assertEqual(response.data['results'], [
+            {'resource': 'package-vetting', 'id': PackageVetting.objects.get(repository='acme').pk,
+             'field': 'repository', 'text': 'acme', 'match': 'exact'},
+        ])
+        self.assertEqual(self.client.get('/api/search/', {'q': 'a'}).status_code, 400)
+
+
+async def read_streaming(response):
+    return b''.join([chunk async for chunk in response.streaming_content])
+
+
+class ExportTests(DashboardAPITestCase):
+    url = '/api/iam-risk-analyzer/export/'
+
+    @classmethod
+    def setUpTestData(cls):
+        IamRisk.objects.create(role='admin', privileges='read, "write"\nall', mfa_enabled=True)
+        IamRisk.objects.create(role='auditor', privileges='read', mfa_enabled=False)
+        SecurityAnomaly.objects.bulk_create([
+            SecurityAnomaly(date=SINCE + datetime.timedelta(days=offset % 7), anomaly_type='login', count=offset)
+            for offset in range(20)
+        ])
+        acme = Tenant.objects.create(slug='acme', name='Acme')
+        with tenancy.use_tenant(acme.pk):
+            IamRisk.objects.create(role='intruder', privileges='all', mfa_enabled=False)
+
+    def export(self, output, url=None):
+        response = self.client.get(url or self.url, {'output': output})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_ndjson_rows_match_the_api(self):
+        response = self.export('ndjson', '/api/security-anomalies/export/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="securityanomaly-export.ndjson"')
+        rows = [json.loads(line) for line in response.getvalue().decode().splitlines()]
+        listed = self.client.get('/api/security-anomalies/', {'page_size': 100}).json()['results']
+        self.assertEqual(rows, listed)
+
+    def test_csv_escaping(self):
+        response = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="iamrisk-export.csv"')
+        header, *rows = csv.reader(io.StringIO(response.getvalue().decode(), newline=''))
+        self.assertEqual(header, ['id', 'updated_at', 'role', 'privileges', 'mfa_enabled'])
+        self.assertEqual(
+            [row[2:] for row in rows], [['admin', 'read, "write"\nall', 'True'], ['auditor', 'read', 'False']],
+        )
+
+    def test_only_the_current_tenant(self):
+        roles = [json.loads(line)['role'] for line in self.export('ndjson').getvalue().decode().splitlines()]
+        self.assertEqual(roles, ['admin', 'auditor'])
+
+    def test_unknown_output(self):
+        self.assertEqual(self.client.get(self.url, {'output': 'xml'}).status_code, 400)
+
+    def test_asgi_streams_asynchronously(self):
+        response = async_to_sync(self.async_client.get)(self.url, {'output': 'csv'})
+        self.assertTrue(response.is_async)
+        self.assertEqual(async_to_sync(read_streaming)(response), self.export('csv').getvalue())
+
+
+class EncoderTests(DashboardAPITestCase):
+    """The ``.values()`` encoders produce exactly what the serializers would."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_db', stdout=io.StringIO())
+        cls.viewsets = [viewset for _, viewset, _ in router.registry if issubclass(viewset, FastListMixin)]
+
+    def assertEncodesAsSerializer(self, viewset):
+        model = viewset.queryset.model
+        queryset = model.objects.order_by('pk')
+        self.assertTrue(queryset.exists())
+        encoder = get_encoder(model)
+        self.assertEqual(encoder.encode(encoder.values(queryset)), viewset.serializer_class(queryset, many=True).data)
+
+    def test_every_list_resource(self):
+        for viewset in self.viewsets:
+            with self.subTest(resource=viewset.__name__):
+                self.assertEncodesAsSerializer(viewset)
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_local_time_zone(self):
+        for viewset in self.viewsets:
+            with self.subTest(resource=viewset.__name__):
+                self.assertEncodesAsSerializer(viewset)
+
+    def test_list_endpoint(self):
+        response = self.client.get('/api/iam-risk-analyzer/')
+        queryset = IamRisk.objects.order_by('pk')
+        self.assertEqual(
+            sorted(response.json(), key=lambda row: row['id']),
+            json.loads(json.dumps(IamRiskViewSet.serializer_class(queryset, many=True).data)),
+        )
+
+
+class AsyncViewTests(DashboardAPITestCase):
+    """The async endpoints serve what their sync counterparts serve."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_db', stdout=io.StringIO())
+
+    def test_lists_match(self):
+        for resource in async_views.RESOURCES:
+            for params in ({}, {'page_size': 3}):
+                with self.subTest(resource=resource, params=params):
+                    sync = self.client.get(f'/api/{resource}/', params)
+                    served = self.client.get(f'/api/async/{resource}/', params)
+                    self.assertEqual(served.status_code, 200)
+                    # Only the next link differs, pointing back at its own endpoint.
+                    expected = sync.content.replace(b'/api/', b'/api/async/')
+                    self.assertEqual(served.content, expected)
+                    if expected == sync.content:
+                        self.assertEqual(served['ETag'], sync['ETag'])
+
+    def test_not_modified(self):
+        etag = self.client.get('/api/async/iam-risk-analyzer/')['ETag']
+        response = self.client.get('/api/async/iam-risk-analyzer/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_errors_match(self):
+        for url in ('/api/security-anomalies/', '/api/async/security-anomalies/'):
+            with self.subTest(url=url):
+                response = self.client.get(url, {'cursor': 'garbage'})
+                self.assertEqual((response.status_code, response.json()), (404, {'detail': 'Invalid cursor'}))
+        self.assertEqual(self.client.get('/api/async/nothing/').status_code, 404)
+
+
+@override_settings(DASHBOARD_THROTTLE_RATES={})
+class AsyncSnapshotTests(TransactionTestCase):
+    """
+    The async snapshot reads each section on its own connection, which only
+    sees committed rows, so its fixtures are committed too.
+    """
+
+    serialized_rollback = True
+
+    def setUp(self):
+        call_command('populate_db', stdout=io.StringIO())
+        caching.get_cache().clear()
+
+    def test_snapshot_matches(self):
+        sync = self.client.get('/api/dashboard-snapshot/')
+        served = self.client.get('/api/async/dashboard-snapshot/')
+        self.assertEqual(served.content, sync.content)
+        self.assertEqual(served['ETag'], sync['ETag'])
+
+
+def parse_message(message):
+    """An SSE message as ``(id, event, data)``."""
+    fields = dict(line.split(': ', 1) for line in message.strip().splitlines())
+    return fields['id'], fields['event'], json.loads(fields['data'])
+
+
+@override_settings(DASHBOARD_EVENTS_COALESCE_WINDOW=0.05, DASHBOARD_EVENTS_HEARTBEAT=0.05)
+class EventStreamTests(DashboardAPITestCase):
+    url = '/api/events/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anomalies = SecurityAnomaly.objects.bulk_create([
+            SecurityAnomaly(date=SINCE, anomaly_type='login', count=count) for count in range(3)
+        ])
+        cls.finding = ShadowIT.objects.create(item='dropbox', detected_on=SINCE)
+        acme = Tenant.objects.create(slug='acme', name='Acme')
+        with tenancy.use_tenant(acme.pk):
+            SecurityAnomaly.objects.create(date=SINCE, anomaly_type='login', count=99)
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(async_views, 'get_broker', return_value=events.InProcessBroker())
+        self.broker = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def poll(self, last_event_id=None, **params):
+        headers = {'HTTP_LAST_EVENT_ID': last_event_id} if last_event_id else {}
+        response = self.client.get(self.url, params, **headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        retry, *messages = response.content.decode().split('\n\n')[:-1]
+        self.assertEqual(retry, 'retry: 5000')
+        return [parse_message(message) for message in messages]
+
+    def test_first_connection_gets_the_cursor(self):
+        [(cursor, event, data)] = self.poll()
+        self.assertEqual((cursor, event, data), (f'{self.anomalies[-1].pk}.{self.finding.pk}', 'ready', {}))
+
+    def test_resume_from_last_event_id(self):
+        [(cursor, event, data)] = self.poll(f'{self.anomalies[0].pk}.0')
+        self.assertEqual(event, 'events')
+        self.assertEqual(cursor, f'{self.anomalies[-1].pk}.{self.finding.pk}')
+        self.assertEqual(
+            [(item['stream'], item['id']) for item in data['events']],
+            [('security-anomalies', anomaly.pk) for anomaly in self.anomalies[1:]] + [('shadow-it', self.finding.pk)],
+        )
+        # Caught up: nothing more, and the other tenant's newer anomaly never shows.
+        self.assertEqual(self.poll(cursor), [(cursor, 'ready', {})])
+
+    def test_resume_one_stream(self):
+        [(_, _, data)] = self.poll('0.0', streams='shadow-it')
+        self.assertEqual([item['id'] for item in data['events']], [self.finding.pk])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(self.url, HTTP_LAST_EVENT_ID='nonsense').status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'streams': 'passwords'}).status_code, 400)
+
+    def live(self, published):
+        """The message after ``ready`` once ``published`` events reach the broker."""
+        async def read():
+            stream = async_views.sse_events(
+                tenancy.DEFAULT_TENANT_ID, set(events.STREAMS.values()), None, window=0.05, heartbeat=0.05,
+            )
+            try:
+                self.assertEqual(parse_message(await anext(stream))[1], 'ready')
+                for event in published:
+                    self.broker.publish(event)
+                return await anext(stream)
+            finally:
+                await stream.aclose()
+        return async_to_sync(read)()
+
+    def test_live_events_are_coalesced(self):
+        published = [events.make_event(anomaly) for anomaly in self.anomalies]
+        cursor, event, data = parse_message(self.live(published))
+        self.assertEqual(event, 'events')
+        self.assertEqual([item['id'] for item in data['events']], [anomaly.pk for anomaly in self.anomalies])
+        self.assertEqual(cursor, f'{self.anomalies[-1].pk}.{self.finding.pk}')
+
+    def test_live_events_of_other_tenants_are_dropped(self):
+        other = {**events.make_event(self.anomalies[0]), 'tenant': tenancy.DEFAULT_TENANT_ID + 1}
+        self.assertEqual(self.live([other]), ': keepalive\n\n')
+
+    def test_asgi_streams(self):
+        # A lost subscription ends the stream, so it can be read to the end.
+        with mock.patch.object(events.InProcessSubscription, 'get', side_effect=events.SubscriptionLost):
+            response = async_to_sync(self.async_client.get)(self.url)
+            content = async_to_sync(read_streaming)(response).decode()
+        self.assertTrue(response.is_async)
+        self.assertEqual([parse_message(message)[1] for message in content.split('\n\n')[:-1]], ['ready'])
+
+
+def rows_of(columns):
+    """Undo ``renderers.columnar`` for one list of rows."""
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+class RendererTests(DashboardAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('populate_db', stdout=io.StringIO())
+        IamRisk.objects.create(role='line\u2028separator', privileges='para\u2029graph', mfa_enabled=False)
+
+    def get(self, url, media_type):
+        response = self.client.get(url, HTTP_ACCEPT=media_type)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], media_type)
+        return response
+
+    def test_json_matches_drf(self):
+        data = {
+            'rows': list(IamRisk.objects.values()),
+            'when': timezone.now(),
+            'day': datetime.date(2024, 2, 29),
+            'ratio': 0.1,
+            'score': decimal.Decimal('12.50'),
+        }
+        content = renderers.FastJSONRenderer().render(data)
+        self.assertEqual(content, JSONRenderer().render(data))
+        self.assertIn(b'line\\u2028separator', content)
+
+    def test_columnar_round_trip(self):
+        for url in ('/api/iam-risk-analyzer/', '/api/security-anomalies/', '/api/dashboard-snapshot/'):
+            with self.subTest(url=url):
+                rows = json.loads(self.get(url, 'application/json').content)
+                columns = json.loads(self.get(url, renderers.ColumnarJSONRenderer.media_type).content)
+                if isinstance(rows, list):
+                    self.assertEqual(rows_of(columns), rows)
+                    continue
+                self.assertEqual(columns.keys(), rows.keys())
+                for key, value in rows.items():
+                    self.assertEqual(rows_of(columns[key]) if isinstance(value, list) else columns[key], value)
+
+    @skipUnless(renderers.msgpack, 'msgpack is not installed')
+    def test_msgpack_round_trip(self):
+        for url in ('/api/iam-risk-analyzer/', '/api/dashboard-snapshot/'):
+            with self.subTest(url=url):
+                expected = json.loads(self.get(url, 'application/json').content)
+                packed = self.get(url, renderers.MessagePackRenderer.media_type).content
+                self.assertEqual(renderers.msgpack.unpackb(packed), expected)
+
+
+# One sample line of Prometheus' text format: name{labels} value.
+SAMPLE = re.compile(r'^[a-z_]+\{(?:[a-z_]+="(?:[^"\\]|\\.)*",?)*\} [0-9.e+-]+$')
+
+
+@override_settings(DASHBOARD_METRICS_ALLOWED_IPS=[], DASHBOARD_METRICS_TOKEN='s3cret')
+class MetricsTests(DashboardAPITestCase):
+    url = '/api/_metrics'
+
+    @classmethod
+    def setUpTestData(cls):
+        IamRisk.objects.create(role='admin', privileges='all', mfa_enabled=True)
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(metrics, 'registry', metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/iam-risk-analyzer/')
+        entries = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+        self.assertEqual(list(entries), ['resolve', 'serialize', 'view', 'render', 'db', 'bytes', 'total'])
+        self.assertIn(f'desc="{len(queries)} queries"', entries['db'])
+        self.assertEqual(entries['bytes'], f'desc="{len(response.content)}"')
+
+    def test_prometheus_text(self):
+        for _ in range(2):
+            self.client.get('/api/iam-risk-analyzer/')
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        lines = response.content.decode().splitlines()
+        for line in lines:
+            if not line.startswith('#'):
+                self.assertRegex(line, SAMPLE)
+        self.assertIn('dashboard_requests_total{route="iamrisk-list",method="GET",status="200"} 2', lines)
+        self.assertIn('dashboard_request_duration_seconds_count{route="iamrisk-list",method="GET"} 2', lines)
+        self.assertIn(
+            'dashboard_request_duration_seconds_bucket{route="iamrisk-list",method="GET",le="+Inf"} 2', lines,
+        )
+        self.assertIn('# TYPE dashboard_db_queries_total counter', lines)
+
+    def test_untrusted_caller_gets_404(self):
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}, {'HTTP_AUTHORIZATION': 's3cret'}):
+            with self.subTest(headers=headers):
+                self.assertEqual(self.client.get(self.url, **headers).status_code, 404)
+
+    def test_token_or_allowed_address(self):
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        with self.settings(DASHBOARD_METRICS_ALLOWED_IPS=['127.0.0.0/8']):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.settings(DASHBOARD_METRICS_ALLOWED_IPS=['10.0.0.1']):
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+@override_settings(DASHBOARD_READ_REPLICAS={'replica1': 2, 'replica2': 1})
+class ReplicaRoutingTests(DashboardAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.pool = db_router.ReplicaPool()
+        patcher = mock.patch.object(db_router, 'replicas', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        check = mock.patch.object(self.pool, 'check', return_value=True)
+        check.start()
+        self.addCleanup(check.stop)
+        self.router = db_router.ReplicaRouter()
+
+    def in_safe_request(self):
+        for variable, value in ((db_router.read_from_replica, True), (db_router.wrote_in_request, False)):
+            token = variable.set(value)
+            self.addCleanup(variable.reset, token)
+
+    def test_weighted_round_robin(self):
+        self.assertEqual([self.pool.choose() for _ in range(6)], ['replica1', 'replica2', 'replica1'] * 2)
+
+    def test_unhealthy_replica_skipped(self):
+        self.pool.mark_unhealthy('replica1')
+        self.assertEqual({self.pool.choose() for _ in range(3)}, {'replica2'})
+        self.pool.mark_unhealthy('replica2')
+        self.assertIsNone(self.pool.choose())
+
+    def test_failed_connection_marks_the_replica(self):
+        # replica2's error left its connection usable: a query error, not an outage.
+        failed = mock.Mock(alias='replica1', errors_occurred=True, connection=None)
+        erred = mock.Mock(alias='replica2', errors_occurred=True)
+        erred.is_usable.return_value = True
+        with mock.patch.object(db_router.connections, 'all', return_value=[failed, erred]):
+            with self.assertLogs('dashboard.db_router', 'WARNING'):
+                self.pool.report_failures()
+        self.assertEqual({self.pool.choose() for _ in range(3)}, {'replica2'})
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(IamRisk), 'default')
+
+    def test_reads_after_a_write_use_the_primary(self):
+        self.in_safe_request()
+        self.assertEqual(self.router.db_for_read(IamRisk), 'replica1')
+        self.assertEqual(self.router.db_for_write(IamRisk), 'default')
+        self.assertEqual(self.router.db_for_read(IamRisk), 'default')
+
+    def test_other_apps_not_routed(self):
+        self.in_safe_request()
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertIsNone(self.router.db_for_write(User))
+
+    def test_write_pins_the_client(self):
+        # The test database has no replicas to read from.
+        for alias in ('replica1', 'replica2'):
+            self.pool.mark_unhealthy(alias)
+        response = self.client.get('/api/iam-risk-analyzer/')
+        self.assertNotIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+        response = self.client.post(
+            '/api/iam-risk-analyzer/', {'role': 'admin', 'privileges': 'all', 'mfa_enabled': True},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(ReplicaRoutingMiddleware.cookie_name, response.cookies)
+
+
+failures = []
+
+
+@jobs.task(name='dashboard.tests.flaky', max_attempts=2)
+def flaky(fail_times):
+    """Fails its first ``fail_times`` runs."""
+    if len(failures) < fail_times:
+        failures.append(fail_times)
+        raise RuntimeError('scanner unavailable')
+    return {'runs': len(failures) + 1}
+
+
+class JobQueueTests(DashboardAPITestCase):
+    def setUp(self):
+        super().setUp()
+        failures.clear()
+
+    def test_identical_queued_job_is_reused(self):
+        job = flaky.enqueue(fail_times=0)
+        self.assertEqual(flaky.enqueue(fail_times=0), job)
+        self.assertNotEqual(flaky.enqueue(fail_times=1), job)
+
+    def test_identical_job_of_another_tenant_is_queued(self):
+        job = flaky.enqueue(fail_times=0)
+        acme = Tenant.objects.create(slug='acme', name='Acme')
+        with tenancy.use_tenant(acme.pk):
+            other = flaky.enqueue(fail_times=0)
+            self.assertEqual(flaky.enqueue(fail_times=0), other)
+        self.assertNotEqual(other.pk, job.pk)
+        self.assertEqual(other.tenant_id, acme.pk)
+
+    def test_claim(self):
+        job = flaky.enqueue(fail_times=0)
+        flaky.enqueue(delay=60, fail_times=1)
+        claimed = jobs.claim('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.attempts, claimed.locked_by), (Job.RUNNING, 1, 'worker-1'))
+        # The other job isn't due yet.
+        self.assertIsNone(jobs.claim('worker-2'))
+
+    def test_success(self):
+        job = flaky.enqueue(fail_times=0)
+        self.assertEqual(jobs.run(jobs.claim('worker')), Job.DONE)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'runs': 1})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retry_then_fail(self):
+        job = flaky.enqueue(fail_times=2)
+        with self.assertLogs('dashboard.jobs', 'WARNING'):
+            self.assertEqual(jobs.run(jobs.claim('worker')), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('scanner unavailable', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('dashboard.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(jobs.claim('worker')), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_retry_succeeds(self):
+        job = flaky.enqueue(fail_times=1)
+        with self.assertLogs('dashboard.jobs', 'WARNING'):
+            jobs.run(jobs.claim('worker'))
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(jobs.run(jobs.claim('worker')), Job.DONE)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'runs': 2})
+
+    def test_stale_job_requeued(self):
+        job = flaky.enqueue(fail_times=0)
+        jobs.claim('lost-worker')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(jobs.recover_stale(), 1)
+        self.assertEqual(jobs.claim('worker').pk, job.pk)
+
+    def test_purge(self):
+        flaky.enqueue(fail_times=0)
+        jobs.run(jobs.claim('worker'))
+        queued = flaky.enqueue(fail_times=1)
+        Job.objects.update(finished_at=timezone.now() - datetime.timedelta(days=30))
+        with mock.patch.object(jobs, 'BATCH_SIZE', 1):
+            self.assertEqual(jobs.purge(7), 1)
+        self.assertEqual(list(Job.objects.values_list('pk', flat=True)), [queued.pk])
+
+    def test_background_bulk_upsert(self):
+        items = [{'repository': 'repo-1', 'vulnerable_packages': 1, 'license_violations': 0}]
+        response = self.client.post('/api/package-vetting/bulk/?background=1', items, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(jobs.run(jobs.claim('worker')), Job.DONE)
+        self.assertTrue(PackageVetting.objects.filter(repository='repo-1').exists())
+
+        response = self.client.get(f"/api/jobs/{response.data['job']}/")
+        self.assertEqual(response.data['status'], Job.DONE)
+        self.assertEqual(response.data['result'], {'created': 1, 'updated': 0})
+        self.assertNotIn('args', response.data)
+
+    def test_error_summary(self):
+        job = flaky.enqueue(fail_times=2)
+        with self.assertLogs('dashboard.jobs', 'WARNING'):
+            jobs.run(jobs.claim('worker'))
+        response = self.client.get(f'/api/jobs/{job.pk}/')
+        self.assertEqual(response.data['error'], 'RuntimeError: scanner unavailable')
+        self.assertNotIn('last_error', response.data)
+
+
+def moment(day, hour):
+    return datetime.datetime(2024, 12, day, hour, tzinfo=datetime.timezone.utc)
+
+
+class ComplianceHistoryTests(DashboardAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with mock.patch('django.utils.timezone.now', return_value=moment(1, 9)):
+            alpha = ComplianceScore.objects.create(owner='Team A', score=50)
+            beta = ComplianceScore.objects.create(owner='Team B', score=70)
+        with mock.patch('django.utils.timezone.now', return_value=moment(2, 9)):
+            alpha.score = 60
+            alpha.save()
+        with mock.patch('django.utils.timezone.now', return_value=moment(3, 9)):
+            beta.delete()
+
+    def as_of(self, value):
+        response = self.client.get('/api/compliance-score/', {'as_of': value})
+        self.assertEqual(response.status_code, 200)
+        return {row['owner']: row['score'] for row in response.data}
+
+    def assertTimeline(self):
+        self.assertEqual(self.as_of('2024-11-30'), {})
+        self.assertEqual(self.as_of(moment(1, 9).isoformat()), {'Team A': 50, 'Team B': 70})
+        self.assertEqual(self.as_of('2024-12-02T08:59:59Z'), {'Team A': 50, 'Team B': 70})
+        self.assertEqual(self.as_of('2024-12-02'), {'Team A': 60, 'Team B': 70})
+        self.assertEqual(self.as_of('2024-12-03'), {'Team A': 60})
+
+    def test_as_of(self):
+        self.assertTimeline()
+
+    def test_as_of_after_compaction(self):
+        self.assertEqual(history.compact(until=moment(2, 12)), moment(2, 12))
+        self.assertIsNone(history.compact(until=moment(2, 12)))
+        self.assertTimeline()
+
+    def test_bad_as_of(self):
+        response = self.client.get('/api/compliance-score/', {'as_of': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_owner_history(self):
+        response = self.client.get('/api/compliance-score/history/', {'owner': 'Team B'})
+        self.assertEqual(
+            [(row['recorded_at'], row['score']) for row in response.json()],
+            [('2024-12-01T09:00:00Z', 70), ('2024-12-03T09:00:00Z', None)],
+        )
+        response = self.client.get('/api/compliance-score/history/', {'owner': 'Team A', 'since': '2024-12-02'})
+        self.assertEqual(response.json(), [])
+        response = self.client.get('/api/compliance-score/history/', {'owner': 'Team A', 'since': '2024-12-01T12:00Z'})
+        self.assertEqual([row['score'] for row in response.json()], [60])
+
+    def test_owner_required(self):
+        response = self.client.get('/api/compliance-score/history/')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(DASHBOARD_TENANT_TRUSTED_PROXIES=['127.0.0.1'])
+class TenantIsolationTests(DashboardAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = Tenant.objects.create(slug='acme', name='Acme')
+        cls.ours = PackageVetting.objects.create(repository='repo-1', vulnerable_packages=1, license_violations=0)
+        with tenancy.use_tenant(cls.acme.pk):
+            cls.theirs = PackageVetting.objects.create(
+                repository='repo-1', vulnerable_packages=9, license_violations=9,
+            )
+
+    def get(self, path, tenant=None, **extra):
+        if tenant is not None:
+            extra['HTTP_X_TENANT'] = tenant
+        return self.client.get(path, **extra)
+
+    def test_lists_are_scoped(self):
+        # Same URL, so the cached response for one tenant mustn't be served to the other.
+        self.assertEqual([row['id'] for row in self.get('/api/package-vetting/').data], [self.ours.pk])
+        self.assertEqual([row['id'] for row in self.get('/api/package-vetting/', 'acme').data], [self.theirs.pk])
+        self.assertEqual([row['id'] for row in self.get('/api/package-vetting/', 'default').data], [self.ours.pk])
+
+    def test_other_tenants_rows_are_not_found(self):
+        self.assertEqual(self.get(f'/api/package-vetting/{self.theirs.pk}/').status_code, 404)
+        self.assertEqual(self.get(f'/api/package-vetting/{self.theirs.pk}/', 'acme').status_code, 200)
+
+    def test_writes_go_to_the_tenant(self):
+        response = self.client.post(
+            '/api/package-vetting/', {'repository': 'repo-2', 'vulnerable_packages': 0, 'license_violations': 0},
+            HTTP_X_TENANT='acme',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('tenant', response.data)
+        self.assertEqual(PackageVetting.objects.get(pk=response.data['id']).tenant_id, self.acme.pk)
+
+    def test_unique_per_tenant(self):
+        response = self.client.post(
+            '/api/package-vetting/', {'repository': 'repo-1', 'vulnerable_packages': 0, 'license_violations': 0},
+            HTTP_X_TENANT='acme',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('repository', response.data)
+
+    def test_jobs_are_scoped(self):
+        with tenancy.use_tenant(self.acme.pk):
+            job = jobs.enqueue('dashboard.tasks.rebuild_search_index')
+        self.assertEqual(self.get('/api/jobs/').data['results'], [])
+        self.assertEqual([row['id'] for row in self.get('/api/jobs/', 'acme').data['results']], [job.pk])
+
+    def test_unknown_tenant(self):
+        self.assertEqual(self.get('/api/package-vetting/', 'nobody').status_code, 404)
+
+    @override_settings(DASHBOARD_TENANT_TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_header_only_from_trusted_proxies(self):
+        self.assertEqual(self.get('/api/package-vetting/', 'acme').status_code, 403)
+        self.assertEqual(self.get('/api/package-vetting/', 'acme', REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(self.get('/api/package-vetting/').status_code, 200)
+
+
+class CompactionTests(DashboardAPITestCase):
+    """Folding raw rows into rollups changes neither the rollups served nor the risk overview."""
+
+    @classmethod
+    def setUpTestData(cls):
+        days = [datetime.date(2024, 1, 1) + datetime.timedelta(days=offset) for offset in range(366)]
+        SecurityAnomaly.objects.bulk_create(
+            [SecurityAnomaly(date=day, anomaly_type='login', count=day.toordinal() % 7 + 1) for day in days]
+            + [SecurityAnomaly(date=day, anomaly_type='scan', count=day.day) for day in days[::3]]
+        )
+        SecretsHygiene.objects.bulk_create([
+            SecretsHygiene(date=day, secrets_found=day.toordinal() % 5 + 2, secrets_rotated=day.toordinal() % 3)
+            for day in days
+        ])
+        overview.rebuild_tenant(tenancy.DEFAULT_TENANT_ID)
+
+    def rollups(self, bucket, **params):
+        served = {}
+        for url in ('/api/security-anomalies/rollup/', '/api/secrets-hygiene/rollup/'):
+            for agg in ('sum', 'max'):
+                served[url, agg] = self.client.get(url, {'bucket': bucket, 'agg': agg, **params}).data
+        return served
+
+    def test_totals_unchanged(self):
+        months, weeks = self.rollups('month'), self.rollups('week', since='2024-07-01')
+        risk = overview.compute()
+
+        # A small batch size makes each table take several batches.
+        compaction.compact(datetime.date(2024, 10, 1), datetime.date(2024, 4, 1), batch_size=50)
+        # A later monthly horizon folds weekly rollups again, including the split week of July 29.
+        compaction.compact(datetime.date(2024, 10, 1), datetime.date(2024, 7, 1), batch_size=50)
+
+        self.assertFalse(SecurityAnomaly.objects.filter(date__lt=datetime.date(2024, 10, 1)).exists())
+        self.assertEqual(
+            set(SecurityAnomalyRollup.objects.values_list('period', flat=True).distinct()),
+            {compaction.WEEK, compaction.MONTH},
+        )
+        self.assertFalse(SecretsHygieneRollup.objects.filter(
+            period=compaction.WEEK, start__lt=datetime.date(2024, 7, 1),
+        ).exists())
+        self.assertEqual(self.rollups('month'), months)
+        self.assertEqual(self.rollups('week', since='2024-07-01'), weeks)
+        self.assertEqual(overview.compute(), risk)
+        self.assertEqual(RiskOverview.objects.values(*overview.FIELDS).get(), risk)
+
+    def test_rerun_folds_nothing(self):
+        compaction.compact(datetime.date(2024, 10, 1), datetime.date(2024, 7, 1))
+        result = compaction.compact(datetime.date(2024, 10, 1), datetime.date(2024, 7, 1))
+        self.assertEqual(set(result.values()), {(0, 0, 0)})
+
+    def test_compacted_rows_leave_tombstones(self):
+        before = set(SecretsHygiene.objects.filter(date__lt=datetime.date(2024, 2, 1)).values_list('pk', flat=True))
+        compaction.compact(datetime.date(2024, 2, 1), datetime.date(2024, 2, 1))
+        buried = Tombstone.objects.filter(resource='secrets-hygiene').values_list('object_id', flat=True)
+        self.assertEqual(set(buried), before)
+
+    def test_expiry(self):
+        compaction.compact(
+            datetime.date(2024, 10, 1), datetime.date(2024, 7, 1), expire_before=datetime.date(2024, 3, 1),
+        )
+        self.assertEqual(
+            self.client.get('/api/security-anomalies/rollup/', {'bucket': 'month'}).data['timestamps'][0],
+            '2024-03-01',
+        )
+
+    def test_background_keeps_the_options(self):
+        options = ['--weekly-after-days=30', '--monthly-after-days=60']
+        call_command('compact_timeseries', '--background', '--retain-days=400', *options, stdout=io.StringIO())
+        job = Job.objects.get()
+        self.assertEqual(
+            job.args, {'batch_size': compaction.BATCH_SIZE, 'weekly_days': 30, 'monthly_days': 60, 'retain_days': 400},
+        )
+        self.assertEqual(jobs.run(jobs.claim('worker')), Job.DONE)
+        # Every row is older than the retention period, so its rollups are gone too.
+        self.assertFalse(SecurityAnomaly.objects.exists())
+        self.assertFalse(SecurityAnomalyRollup.objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command('compact_timeseries', '--background', '--retain-days=30', *options)
+
+
+# Runs in a fresh interpreter under core.settings_api: a few requests through
+# the API-only entry point, printed as JSON.
+API_PROBE = '''
+import json
+from importlib import import_module
+import_module('core.wsgi_api')
+from django.conf import settings
+from django.test import Client
+from django.test.utils import setup_test_environment
+setup_test_environment()
+client = Client()
+vetting = {'repository': 'probe', 'vulnerable_packages': 1, 'license_violations': 0}
+responses = {
+    'create': client.post('/api/package-vetting/', vetting, content_type='application/json'),
+    'list': client.get('/api/package-vetting/'),
+    'snapshot': client.get('/api/dashboard-snapshot/', HTTP_ACCEPT='application/vnd.safeside.columnar+json'),
+    'admin': client.get('/admin/'),
+}
+print(json.dumps({
+    'apps': settings.INSTALLED_APPS,
+    'responses': {name: [response.status_code, response['Content-Type']] for name, response in responses.items()},
+    'listed': [row['repository'] for row in responses['list'].json()],
+}))
+'''
+
+
+class APISettingsTests(SimpleTestCase):
+    """core.settings_api, in subprocesses against a scratch SQLite database."""
+
+    def run_python(self, *args, settings_module):
+        completed = subprocess.run(
+            [sys.executable, *args], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**self.env, 'DJANGO_SETTINGS_MODULE': settings_module},
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        return completed.stdout
+
+    def test_serves_the_api(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.env = {**os.environ, 'DB_ENGINE': 'sqlite', 'DB_NAME': os.path.join(directory, 'db.sqlite3')}
+            # Migrations run with the full settings; the API only needs the dashboard's.
+            self.run_python('manage.py', 'migrate', 'dashboard', settings_module='core.settings')
+            output = self.run_python('-c', API_PROBE, settings_module='core.settings_api')
+
+        result = json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(result['apps'], ['dashboard', 'corsheaders'])
+        self.assertEqual(result['responses'], {
+            'create': [201, 'application/json'],
+            'list': [200, 'application/json'],
+            'snapshot': [200, 'application/vnd.safeside.columnar+json'],
+            'admin': [404, 'text/html; charset=utf-8'],
+        })
+        self.assertEqual(result['listed'], ['probe'])
+
+
+@override_settings(DASHBOARD_CHANGES_SAFETY_WINDOW=0)
+class ChangesTests(DashboardAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.repositories = [
+            PackageVetting.objects.create(repository=f'repo-{index}', vulnerable_packages=index, license_violations=0)
+            for index in range(5)
+        ]
+        IamRisk.objects.create(role='admin', privileges='all', mfa_enabled=True)
+
+    def poll(self, token=None):
+        response = self.client.get('/api/changes/', {'since': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def sync(self, token=None):
+        """Poll until ``has_more`` is false; returns the upserted ids, deleted ids and the last token."""
+        upserted, deleted = {}, {}
+        while True:
+            data = self.poll(token)
+            token = data['token']
+            for resource, change in data['changes'].items():
+                if change['upserted']:
+                    upserted.setdefault(resource, []).extend(row['id'] for row in change['upserted'])
+                if change['deleted']:
+                    deleted.setdefault(resource, []).extend(change['deleted'])
+            if not data['has_more']:
+                return upserted, deleted, token
+
+    def test_first_sync(self):
+        data = self.poll()
+        self.assertFalse(data['has_more'])
+        self.assertEqual(
+            [row['id'] for row in data['changes']['package-vetting']['upserted']],
+            [row.pk for row in self.repositories],
+        )
+        self.assertEqual(len(data['changes']['iam-risk-analyzer']['upserted']), 1)
+
+    @override_settings(DASHBOARD_CHANGES_LIMIT=2)
+    def test_pages(self):
+        upserted, deleted, _ = self.sync()
+        self.assertEqual(upserted['package-vetting'], [row.pk for row in self.repositories])
+        self.assertEqual(len(upserted['iam-risk-analyzer']), 1)
+        self.assertEqual(deleted, {})
+
+    def test_quiet_poll(self):
+        token = self.poll()['token']
+        data = self.poll(token)
+        self.assertEqual(data['changes'], {})
+        self.assertFalse(data['has_more'])
+
+    def test_updates_and_tombstones(self):
+        token = self.poll()['token']
+        changed, removed = self.repositories[1], self.repositories[3]
+        removed_pk = removed.pk
+        changed.vulnerable_packages = 50
+        changed.save()
+        removed.delete()
+        data = self.poll(token)
+        self.assertEqual(list(data['changes']), ['package-vetting'])
+        [row] = data['changes']['package-vetting']['upserted']
+        self.assertEqual((row['id'], row['vulnerable_packages']), (changed.pk, 50))
+        self.assertEqual(data['changes']['package-vetting']['deleted'], [removed_pk])
+
+    @override_settings(DASHBOARD_CHANGES_LIMIT=1)
+    def test_paged_delta(self):
+        token = self.sync()[2]
+        removed = [row.pk for row in self.repositories[:2]]
+        for row in self.repositories[:2]:
+            row.delete()
+        self.repositories[4].save()
+        upserted, deleted, token = self.sync(token)
+        self.assertEqual(upserted, {'package-vetting': [self.repositories[4].pk]})
+        self.assertEqual(deleted, {'package-vetting': removed})
+        self.assertEqual(self.poll(token)['changes'], {})
+
+    def test_invalid_token(self):
+        for token in ('garbage', changes.encode_token(changes.Cursor(stream=3))):
+            with self.subTest(token=token):
+                response = self.client.get('/api/changes/', {'since': token})
+                self.assertEqual(response.status_code, 400)
+
+    def test_expired_token(self):
+        token = changes.encode_token(changes.Cursor(since=timezone.now() - datetime.timedelta(days=30)))
+        self.assertEqual(self.client.get('/api/changes/', {'since': token}).status_code, 410)
+
+    def test_purge(self):
+        self.repositories[0].delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - datetime.timedelta(days=30))
+        kept = self.repositories[1].pk
+        self.repositories[1].delete()
+        self.assertEqual(changes.purge(), 1)
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [kept])
+
+    def test_purge_in_batches(self):
+        for repository in self.repositories:
+            repository.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - datetime.timedelta(days=30))
+        with mock.patch.object(changes, 'BATCH_SIZE', 1):
+            self.assertEqual(changes.purge(), len(self.repositories))
+        self.assertFalse(Tombstone.objects.exists())
+
+
+class ThrottlingTests(DashboardAPITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(throttling, '_store', throttling.LocalBucketStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(DASHBOARD_THROTTLE_RATES={'dashboard-snapshot': ('1/m', 2)})
+    def test_burst_then_rate(self):
+        statuses = [self.client.get('/api/dashboard-snapshot/').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        response = self.client.get('/api/dashboard-snapshot/')
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(int(response['Retry-After']), 60)
+        # Other routes and other clients have buckets of their own.
+        self.assertEqual(self.client.get('/api/shadow-it/').status_code, 200)
+        self.assertEqual(self.client.get('/api/dashboard-snapshot/', REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    @override_settings(DASHBOARD_THROTTLE_RATES={'*-export': ('6/m', 1), '*': ('1/m', 1)})
+    def test_first_matching_pattern(self):
+        self.assertEqual(throttling.route_rate('securityanomaly-export'), (0.1, 1))
+        self.assertEqual(throttling.route_rate('shadowit-list'), (1 / 60, 1))
+
+    def test_refill(self):
+        store = throttling.LocalBucketStore()
+        with mock.patch('time.monotonic', return_value=100.0):
+            self.assertEqual([store.take('client', 2, 2) for _ in range(3)], [0, 0, 0.5])
+        with mock.patch('time.monotonic', return_value=100.5):
+            self.assertEqual(store.take('client', 2, 2), 0)
+            self.assertEqual(store.take('client', 2, 2), 0.5)
+
+
+class WatchedEvent(threading.Event):
+    """An event that records when someone starts waiting on it."""
+
+    def __init__(self):
+        super().__init__()
+        self.waiting = threading.Event()
+
+    def wait(self, timeout=None):
+        self.waiting.set()
+        return super().wait(timeout)
+
+
+class WatchedCall(coalescing.Call):
+    def __init__(self):
+        super().__init__()
+        self.done = WatchedEvent()
+
+
+@override_settings(DASHBOARD_COALESCE_TIMEOUT=0.2)
+class CoalescingTests(DashboardAPITestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = coalescing.SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def build():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'built'
+
+        with mock.patch.object(coalescing, 'Call', WatchedCall):
+            leader = threading.Thread(target=lambda: results.append(flight.do('key', build, 5)))
+            leader.start()
+            started.wait(5)
+            follower = threading.Thread(target=lambda: results.append(flight.do('key', build, 5)))
+            follower.start()
+            # Release the leader only once the follower waits on its call.
+            flight._calls['key'].done.waiting.wait(5)
+            release.set()
+            leader.join(5)
+            follower.join(5)
+        self.assertEqual(results, ['built', 'built'])
+        self.assertEqual(len(calls), 1)
+
+    def test_waits_for_another_process(self):
+        cache = caching.get_cache()
+        cache.add(coalescing.lock_key('key'), 1)
+
+        def leader_stores(seconds):
+            cache.set('key', 'stored')
+
+        with mock.patch('time.sleep', side_effect=leader_stores) as sleep:
+            self.assertEqual(coalescing.fill(cache, 'key', lambda: 'built'), 'stored')
+        sleep.assert_called_once()
+
+    def test_wait_is_bounded(self):
+        cache = caching.get_cache()
+        cache.add(coalescing.lock_key('key'), 1)
+        started = time.monotonic()
+        self.assertEqual(coalescing.fill(cache, 'key', lambda: 'built'), 'built')
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_no_wait(self):
+        cache = caching.get_cache()
+        cache.add(coalescing.lock_key('key'), 1)
+        with mock.patch('time.sleep') as sleep:
+            self.assertEqual(coalescing.fill(cache, 'key', lambda: 'built', wait=False), 'built')
+        sleep.assert_not_called()
+
+    def test_sync_views_under_asgi_do_not_wait(self):
+        with mock.patch.object(coalescing, 'fill', wraps=coalescing.fill) as fill:
+            self.client.get('/api/shadow-it/')
+            self.assertIs(fill.call_args.kwargs['wait'], True)
+            caching.get_cache().clear()
+            async_to_sync(self.async_client.get)('/api/shadow-it/')
+            self.assertIs(fill.call_args.kwargs['wait'], False)
@@ -0,0 +1,126 @@
+"""
+Per-client token-bucket throttling for the API.
+
+Every client (``BaseThrottle.get_ident``: the address, or the
+``X-Forwarded-For`` entry chosen by DRF's ``NUM_PROXIES``) has one bucket
+per route. A bucket holds up to ``burst`` tokens and refills at the route's
+rate; each request takes a token, and a request that finds the bucket empty
+gets a 429 with a ``Retry-After`` of when the next token arrives. So a
+client can load a whole dashboard at once, then settles to the rate.
+
+``DASHBOARD_THROTTLE_RATES`` maps URL names, or ``fnmatch`` patterns of
+them, to ``(rate, burst)``; the first match applies and routes matching
+none are not throttled. Rates are written as DRF's are: ``'20/s'``,
+``'30/m'``. Buckets live in the store named by ``DASHBOARD_THROTTLE_STORE``:
+``LocalBucketStore`` keeps them in process, so each worker limits on its
+own; ``RedisBucketStore`` shares them between workers through
+``DASHBOARD_THROTTLE_REDIS_URL``. Any class with the same ``take`` method
+can be plugged in.
+"""
+import threading
+import time
+from fnmatch import fnmatchcase
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Tokens per second in a rate like ``'20/s'``."""
+    count, period = rate.split('/')
+    return int(count) / PERIODS[period[0]]
+
+
+def route_rate(url_name):
+    """``(tokens per second, burst)`` for the route named ``url_name``, or None."""
+    for pattern, (rate, burst) in getattr(settings, 'DASHBOARD_THROTTLE_RATES', {}).items():
+        if fnmatchcase(url_name, pattern):
+            return parse_rate(rate), burst
+    return None
+
+
+def refill(tokens, elapsed, rate, burst):
+    """``(tokens left, seconds to wait)`` after taking one token from a bucket refilled for ``elapsed``."""
+    tokens = min(burst, tokens + max(elapsed, 0) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    """Buckets in this process's memory."""
+
+    # Past this many buckets, full ones are dropped: a missing bucket is a full one.
+    MAX_BUCKETS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, rate, burst):
+        """Take a token from ``key``'s bucket; returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp, _ = self._buckets.get(key, (burst, now, now))
+            tokens, wait = refill(tokens, now - stamp, rate, burst)
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            if len(self._buckets) > self.MAX_BUCKETS:
+                self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        return wait
+
+
+class RedisBucketStore:
+    """Buckets shared through Redis; each take is one atomic script call, timed by the Redis clock."""
+
+    SCRIPT = '''
+    local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+    local tokens = math.min(burst, (tonumber(bucket[1]) or burst) + math.max(now - (tonumber(bucket[2]) or now), 0) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+    return tostring(wait)
+    '''
+
+    def __init__(self):
+        import redis
+
+        self.client = redis.Redis.from_url(settings.DASHBOARD_THROTTLE_REDIS_URL)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    def take(self, key, rate, burst):
+        return float(self.script(keys=[f'dashboard:throttle:{key}'], args=[rate, burst]))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = getattr(settings, 'DASHBOARD_THROTTLE_STORE', 'dashboard.throttling.LocalBucketStore')
+                _store = import_string(path)()
+    return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        match = request.resolver_match
+        limit = match and match.url_name and route_rate(match.url_name)
+        if not limit:
+            return True
+        rate, burst = limit
+        self.delay = get_store().take(f'{match.url_name}:{self.get_ident(request)}', rate, burst)
+        return self.delay == 0
+
+    def wait(self):
+        return self.delay
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     RiskOverviewViewSet,
     CloudMisconfigurationViewSet,
@@ -10,6 +11,11 @@ from .views import (
     SecurityAnomalyViewSet,
     ComplianceScoreViewSet,
     ShadowITViewSet,
+    JobViewSet,
+    DashboardSnapshotView,
+    SearchView,
+    ChangesView,
+    metrics_view,
 )
 
 router = DefaultRouter()
@@ -22,7 +28,15 @@ router.register(r'iam-risk-analyzer', IamRiskViewSet)
 router.register(r'security-anomalies', SecurityAnomalyViewSet)
 router.register(r'compliance-score', ComplianceScoreViewSet)
 router.register(r'shadow-it', ShadowITViewSet)
+router.register(r'jobs', JobViewSet)
 
 urlpatterns = [
+    path('dashboard-snapshot/', DashboardSnapshotView.as_view(), name='dashboard-snapshot'),
+    path('_metrics', metrics_view, name='metrics'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('changes/', ChangesView.as_view(), name='changes'),
+    path('async/dashboard-snapshot/', async_views.dashboard_snapshot, name='async-dashboard-snapshot'),
+    path('events/', async_views.event_stream, name='event-stream'),
+    path('async/<slug:resource>/', async_views.resource_list, name='async-resource-list'),
     path('', include(router.urls)),
 ]
@@ -1,14 +1,27 @@
-from rest_framework import viewsets
+import datetime
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from .models import (
     RiskOverview,
     CloudMisconfiguration,
     PackageVetting,
     PackageHealth,
     SecretsHygiene,
+    SecretsHygieneRollup,
     IamRisk,
     SecurityAnomaly,
+    SecurityAnomalyRollup,
     ComplianceScore,
     ShadowIT,
+    Job,
 )
 from .serializers import (
     RiskOverviewSerializer,
@@ -20,40 +33,283 @@ from .serializers import (
     SecurityAnomalySerializer,
     ComplianceScoreSerializer,
     ShadowITSerializer,
+    JobSerializer,
 )
+from . import access, changes, history, metrics, search
+from .bulk import BulkUpsertMixin
+from .caching import VersionedCacheMixin
+from .db_router import read_from_replica
+from .encoders import FastListMixin, get_encoder
+from .exports import StreamingExportMixin
+from .pagination import JobPagination, KeysetPagination
+from .rollups import parse_rollup_params, rollup
+
+
+def parse_moment(query_params, param):
+    """``param`` as an aware datetime; a bare date means the end of that day (UTC)."""
+    value = query_params.get(param, '')
+    try:
+        # A date first: parse_datetime would read it as the start of the day.
+        day = parse_date(value)
+        moment = datetime.datetime.combine(day, datetime.time.max) if day else parse_datetime(value)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({param: 'Expected an ISO 8601 date or datetime.'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, datetime.timezone.utc)
+    return moment
+
+
+class DateRangeFilterMixin:
+    """Narrows a time-series queryset with ``?since=`` / ``?until=`` (inclusive ISO dates)."""
+
+    date_field = 'date'
+
+    def get_queryset(self):
+        return self.filter_dates(super().get_queryset(), self.date_field)
+
+    def filter_dates(self, queryset, date_field):
+        for param, lookup in (('since', 'gte'), ('until', 'lte')):
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                parsed = parse_date(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise ValidationError({param: 'Expected a date in YYYY-MM-DD format.'})
+            queryset = queryset.filter(**{f'{date_field}__{lookup}': parsed})
+        return queryset
+
+class TenantQuerysetMixin:
+    """Scope the viewset to the request's tenant; see ``dashboard.tenancy``."""
+
+    def get_queryset(self):
+        # The class-level queryset was built at import time, outside any
+        # tenant; ask the manager again now that one is current.
+        return self.queryset.model._default_manager.all()
 
-class RiskOverviewViewSet(viewsets.ModelViewSet):
+class DashboardViewSet(VersionedCacheMixin, FastListMixin, TenantQuerysetMixin, viewsets.ModelViewSet):
+    """Read-heavy dashboard resource: cached, with the fast list encoder."""
+
+class ReadOnlyDashboardViewSet(
+    VersionedCacheMixin, FastListMixin, TenantQuerysetMixin, viewsets.ReadOnlyModelViewSet,
+):
+    """As ``DashboardViewSet``, for resources derived from other tables."""
+
+class RiskOverviewViewSet(ReadOnlyDashboardViewSet):
+    # Derived from the other dashboard tables; see dashboard.overview.
     queryset = RiskOverview.objects.all()
     serializer_class = RiskOverviewSerializer
 
-class CloudMisconfigurationViewSet(viewsets.ModelViewSet):
+class CloudMisconfigurationViewSet(DashboardViewSet):
     queryset = CloudMisconfiguration.objects.all()
     serializer_class = CloudMisconfigurationSerializer
 
-class PackageVettingViewSet(viewsets.ModelViewSet):
+class PackageVettingViewSet(BulkUpsertMixin, DashboardViewSet):
     queryset = PackageVetting.objects.all()
     serializer_class = PackageVettingSerializer
+    natural_key = 'repository'
 
-class PackageHealthViewSet(viewsets.ModelViewSet):
+class PackageHealthViewSet(DashboardViewSet):
     queryset = PackageHealth.objects.all()
     serializer_class = PackageHealthSerializer
 
-class SecretsHygieneViewSet(viewsets.ModelViewSet):
+class SecretsHygieneViewSet(StreamingExportMixin, DateRangeFilterMixin, DashboardViewSet):
     queryset = SecretsHygiene.objects.all()
     serializer_class = SecretsHygieneSerializer
+    pagination_class = KeysetPagination
+    export_ordering = ('date', 'id')
+    cache_models = (SecretsHygiene, SecretsHygieneRollup)
+
+    @action(detail=False, methods=['get'])
+    def rollup(self, request):
+        return self.cached_response(self.build_rollup, request)
 
-class IamRiskViewSet(viewsets.ModelViewSet):
+    def build_rollup(self, request):
+        bucket, agg = parse_rollup_params(request.query_params)
+        queryset = self.filter_queryset(self.get_queryset())
+        compacted = self.filter_dates(SecretsHygieneRollup.objects.all(), 'start')
+        return Response(rollup(queryset, bucket, agg, ['secrets_found', 'secrets_rotated'], compacted=compacted))
+
+class IamRiskViewSet(StreamingExportMixin, BulkUpsertMixin, DashboardViewSet):
     queryset = IamRisk.objects.all()
     serializer_class = IamRiskSerializer
+    natural_key = 'role'
 
-class SecurityAnomalyViewSet(viewsets.ModelViewSet):
+class SecurityAnomalyViewSet(StreamingExportMixin, DateRangeFilterMixin, DashboardViewSet):
     queryset = SecurityAnomaly.objects.all()
     serializer_class = SecurityAnomalySerializer
+    pagination_class = KeysetPagination
+    export_ordering = ('date', 'id')
+    cache_models = (SecurityAnomaly, SecurityAnomalyRollup)
+
+    def get_queryset(self):
+        return self.filter_type(super().get_queryset())
 
-class ComplianceScoreViewSet(viewsets.ModelViewSet):
+    def filter_type(self, queryset):
+        anomaly_type = self.request.query_params.get('anomaly_type')
+        if anomaly_type:
+            queryset = queryset.filter(anomaly_type=anomaly_type)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def rollup(self, request):
+        return self.cached_response(self.build_rollup, request)
+
+    def build_rollup(self, request):
+        bucket, agg = parse_rollup_params(request.query_params)
+        queryset = self.filter_queryset(self.get_queryset())
+        compacted = self.filter_type(self.filter_dates(SecurityAnomalyRollup.objects.all(), 'start'))
+        return Response(rollup(queryset, bucket, agg, ['count'], series_field='anomaly_type', compacted=compacted))
+
+class ComplianceScoreViewSet(DashboardViewSet):
     queryset = ComplianceScore.objects.all()
     serializer_class = ComplianceScoreSerializer
 
-class ShadowITViewSet(viewsets.ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        if 'as_of' in request.query_params:
+            return self.cached_response(self.build_as_of, request)
+        return super().list(request, *args, **kwargs)
+
+    def build_as_of(self, request):
+        moment = parse_moment(request.query_params, 'as_of')
+        return Response(history.as_of(moment))
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        return self.cached_response(self.build_history, request)
+
+    def build_history(self, request):
+        owner = request.query_params.get('owner')
+        if not owner:
+            raise ValidationError({'owner': 'This parameter is required.'})
+        since = parse_moment(request.query_params, 'since') if 'since' in request.query_params else None
+        return Response(history.owner_history(owner, since))
+
+class ShadowITViewSet(BulkUpsertMixin, DateRangeFilterMixin, DashboardViewSet):
     queryset = ShadowIT.objects.all()
     serializer_class = ShadowITSerializer
+    natural_key = 'item'
+    date_field = 'detected_on'
+
+class JobViewSet(TenantQuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    """The tenant's background jobs, newest first; see ``dashboard.jobs``. Not cached: workers update rows directly."""
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    pagination_class = JobPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        job_status = self.request.query_params.get('status')
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        return queryset
+
+class DashboardSnapshotView(VersionedCacheMixin, APIView):
+    """
+    Every widget's payload in a single response, one query per section.
+    Time-series sections (those with keyset pagination) hold only their
+    last ``DASHBOARD_SNAPSHOT_DAYS`` days, at most a full keyset page of
+    the newest rows; their list endpoints page through the rest.
+    """
+
+    sections = (
+        ('risk-overview', RiskOverviewViewSet),
+        ('cloud-misconfigurations', CloudMisconfigurationViewSet),
+        ('package-vetting', PackageVettingViewSet),
+        ('package-health', PackageHealthViewSet),
+        ('secrets-hygiene', SecretsHygieneViewSet),
+        ('iam-risk-analyzer', IamRiskViewSet),
+        ('security-anomalies', SecurityAnomalyViewSet),
+        ('compliance-score', ComplianceScoreViewSet),
+        ('shadow-it', ShadowITViewSet),
+    )
+
+    def get_cache_models(self):
+        return tuple(viewset.queryset.model for _, viewset in self.sections)
+
+    def get(self, request, format=None):
+        return self.cached_response(self.build_snapshot, request)
+
+    def build_snapshot(self, request):
+        return Response({key: self.section(viewset) for key, viewset in self.sections})
+
+    @staticmethod
+    def section(viewset):
+        """The encoded rows of ``viewset``'s section."""
+        model = viewset.queryset.model
+        encoder = get_encoder(model)
+        queryset = encoder.values(model._default_manager.all())
+        if viewset.pagination_class is not KeysetPagination:
+            return encoder.encode(queryset)
+        days = getattr(settings, 'DASHBOARD_SNAPSHOT_DAYS', 30)
+        first, second = KeysetPagination.ordering
+        recent = queryset.filter(**{
+            f'{first}__gte': datetime.date.today() - datetime.timedelta(days=days),
+        }).order_by(f'-{first}', f'-{second}')[:KeysetPagination.max_page_size]
+        # Read newest first to keep the newest rows; return them in list order.
+        return encoder.encode(reversed(list(recent)))
+
+class SearchView(VersionedCacheMixin, APIView):
+    """Ranked matches for ``?q=`` across the named entities; see ``dashboard.search``."""
+
+    cache_models = tuple(search.INDEXED)
+
+    def get(self, request, format=None):
+        return self.cached_response(self.build_results, request)
+
+    def build_results(self, request):
+        query = request.query_params.get('q', '')
+        if len(search.normalize(query)) < search.MIN_QUERY_LENGTH:
+            raise ValidationError({'q': f'Expected at least {search.MIN_QUERY_LENGTH} characters.'})
+        try:
+            limit = int(request.query_params.get('limit', search.DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+        limit = max(1, min(limit, search.MAX_LIMIT))
+        return Response({'results': search.search(query, limit)})
+
+class TokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'This token is too old to account for every deletion; sync again without since.'
+    default_code = 'token_expired'
+
+class ChangesView(APIView):
+    """
+    What changed since ``?since=<token>`` across the dashboard, at most
+    ``DASHBOARD_CHANGES_LIMIT`` rows per poll, and the token for the next
+    poll; while ``has_more`` is true the client polls again right away. See
+    ``dashboard.changes``. Not cached, as every poll carries a new token.
+    """
+
+    def get(self, request, format=None):
+        # A replica lagging more than the safety window would hide writes
+        # from before the token; the index range reads are cheap on the primary.
+        read_from_replica.set(False)
+        now = timezone.now()
+        cursor = changes.Cursor()
+        token = request.query_params.get('since')
+        if token:
+            try:
+                cursor = changes.decode_token(token)
+            except ValueError:
+                raise ValidationError({'since': 'Invalid token.'})
+            if changes.is_expired(cursor, now):
+                raise TokenExpired()
+        result, cursor, has_more = changes.collect(cursor, now)
+        return Response({'token': changes.encode_token(cursor), 'has_more': has_more, 'changes': result})
+
+def metrics_view(request):
+    """
+    Request metrics for this worker in Prometheus' text format, for the
+    addresses and token configured in settings only; a 404 for anyone else.
+    """
+    if not (
+        access.address_in(request, getattr(settings, 'DASHBOARD_METRICS_ALLOWED_IPS', ()))
+        or access.bearer_token_matches(request, getattr(settings, 'DASHBOARD_METRICS_TOKEN', None))
+    ):
+        raise Http404
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
@@ -1,18 +1,59 @@
-import React from "react";
-import { Container, Form, Button } from "react-bootstrap";
+import React, { useState } from "react";
+import { Container, Form, Button, ListGroup, Badge } from "react-bootstrap";
+import axios from "axios";
 
 const SearchBar = () => {
+  const [query, setQuery] = useState("");
+  const [results, setResults] = useState(null);
+
+  const handleSubmit = (event) => {
+    event.preventDefault();
+    if (query.trim().length < 2) {
+      setResults(null);
+      return;
+    }
+    axios
+      .get("http://localhost:8000/api/search/", { params: { q: query } })
+      .then((response) => setResults(response.data.results))
+      .catch((error) => {
+        console.error("Error searching:", error);
+        setResults([]);
+      });
+  };
+
   return (
     <Container className="mt-3 mb-2">
       <div className="d-flex justify-content-end">
-        <Form className="d-flex" style={{ maxWidth: "400px", width: "100%" }}>
-          <Form.Control
-            type="search"
-            placeholder="Search..."
-            className="me-2"
-          />
-          <Button variant="primary">Go</Button>
-        </Form>
+        <div style={{ maxWidth: "400px", width: "100%" }}>
+          <Form className="d-flex" onSubmit={handleSubmit}>
+            <Form.Control
+              type="search"
+              placeholder="Search..."
+              className="me-2"
+              value={query}
+              onChange={(event) => setQuery(event.target.value)}
+            />
+            <Button variant="primary" type="submit">
+              Go
+            </Button>
+          </Form>
+          {results && (
+            <ListGroup className="mt-2">
+              {results.length === 0 && (
+                <ListGroup.Item>No matches</ListGroup.Item>
+              )}
+              {results.map((result) => (
+                <ListGroup.Item
+                  key={`${result.resource}-${result.id}-${result.field}`}
+                  className="d-flex justify-content-between align-items-center"
+                >
+                  {result.text}
+                  <Badge bg="secondary">{result.resource}</Badge>
+                </ListGroup.Item>
+              ))}
+            </ListGroup>
+          )}
+        </div>
       </div>
     </Container>
   );
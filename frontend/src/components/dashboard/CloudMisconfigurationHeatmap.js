@@ -36,11 +36,12 @@ const CloudMisconfigurationHeatmap = () => {
 
   useEffect(() => {
     axios
-      .get("http://localhost:8000/api/cloud-misconfigurations/")
+      .get("http://localhost:8000/api/cloud-misconfigurations/", {
+        headers: { Accept: "application/vnd.safeside.columnar+json" },
+      })
       .then((response) => {
-        const data = response.data;
-        const labels = data.map((item) => item.category);
-        const values = data.map((item) => item.value);
+        const labels = response.data.category || [];
+        const values = response.data.value || [];
 
         setChartData({
           labels: labels,
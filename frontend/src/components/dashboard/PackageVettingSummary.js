@@ -36,14 +36,15 @@ const PackageVettingSummary = () => {
   useEffect(() => {
     Promise.all([
       axios.get("http://localhost:8000/api/package-vetting/"),
-      axios.get("http://localhost:8000/api/package-health/"),
+      axios.get("http://localhost:8000/api/package-health/", {
+        headers: { Accept: "application/vnd.safeside.columnar+json" },
+      }),
     ])
       .then(([vettingResponse, healthResponse]) => {
         setTableData(vettingResponse.data);
 
-        const data = healthResponse.data;
-        const labels = data.map((item) => item.label);
-        const values = data.map((item) => item.value);
+        const labels = healthResponse.data.label || [];
+        const values = healthResponse.data.value || [];
 
         setPieData({
           labels: labels,
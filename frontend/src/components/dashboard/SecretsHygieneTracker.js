@@ -46,12 +46,14 @@ const SecretsHygieneTracker = () => {
 
   useEffect(() => {
     axios
-      .get("http://localhost:8000/api/secrets-hygiene/")
+      .get("http://localhost:8000/api/secrets-hygiene/", {
+        headers: { Accept: "application/vnd.safeside.columnar+json" },
+      })
       .then((response) => {
-        const data = response.data;
-        const labels = data.map((item) => item.date);
-        const secretsFound = data.map((item) => item.secrets_found);
-        const secretsRotated = data.map((item) => item.secrets_rotated);
+        const data = response.data.results;
+        const labels = data.date || [];
+        const secretsFound = data.secrets_found || [];
+        const secretsRotated = data.secrets_rotated || [];
 
         // Calculate summary statistics
         const totalFound = secretsFound.reduce((sum, val) => sum + val, 0);
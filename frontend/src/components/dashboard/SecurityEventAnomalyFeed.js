@@ -54,7 +54,7 @@ const SecurityEventAnomalyFeed = () => {
     axios
       .get("http://localhost:8000/api/security-anomalies/")
       .then((response) => {
-        const data = response.data;
+        const data = response.data.results;
         const labels = data.map((item) => item.date);
         const counts = data.map((item) => item.count);
         const types = [...new Set(data.map((item) => item.anomaly_type))];